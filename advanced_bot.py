@@ -3,10 +3,10 @@ Advanced Telegram News Bot с автоматическим scheduler
 Дополнительные возможности: статистика, логирование, обработка ошибок
 """
 
-import asyncio
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 import logging
+import time
 from datetime import datetime
 
 # Импортируем основной класс из news_bot.py
@@ -21,23 +21,16 @@ class AdvancedNewsBot:
     def __init__(self, bot_instance):
         self.bot = bot_instance
         self.scheduler = AsyncIOScheduler()
-        self.stats = {
-            'fetches': 0,
-            'news_posted': 0,
-            'errors': 0,
-            'last_fetch': None
-        }
+        # Счётчики - в общем реестре метрик бота (/metrics, сохраняются в БД)
+        self.metrics = bot_instance.metrics
+        self._job_failures = self.metrics.counter(
+            'news_fetch_job_failures_total', 'Падения задачи планировщика fetch_news_job')
 
     def setup_schedule(self):
         """Настроить расписание автоматического получения новостей"""
         
-        # Получение новостей каждые 30 минут
-        self.scheduler.add_job(
-            self.fetch_news_job,
-            CronTrigger(minute='*/30'),
-            id='fetch_every_30min',
-            name='Fetch news every 30 minutes'
-        )
+        # Регулярный опрос - у каждого источника свой интервал: self.bot.poller
+        # (poll_scheduler) вызывает NewsBot.run_fetch_cycle, а не общий cron раз в 30 минут
         
         # Получение новостей в 9:00, 13:00 и 18:00 каждый день
         self.scheduler.add_job(
@@ -58,65 +51,44 @@ class AdvancedNewsBot:
         logger.info("✅ Scheduler настроен")
 
     async def fetch_news_job(self):
-        """Задача для автоматического получения новостей"""
+        """Задача для автоматического получения новостей из всех источников"""
         try:
             logger.info(f"🔄 Начало получения новостей в {datetime.now()}")
             
-            sources = self.bot.db.get_active_sources()
-            news_count = 0
-            
-            for source in sources:
-                articles = []
-                
-                try:
-                    if source['type'] == 'rss':
-                        articles = await self.bot.parser.parse_rss(source['url'])
-                    elif source['type'] == 'zen':
-                        articles = await self.bot.parser.parse_zen(source['url'])
-                    elif source['type'] == 'twitter':
-                        articles = await self.bot.parser.parse_twitter_rss(source['url'])
-                    
-                    for article in articles:
-                        if not self.bot.db.is_news_published(article['link']):
-                            await self.bot._post_news_to_channels(article, source)
-                            self.bot.db.add_published_news(
-                                source['id'], 
-                                article['title'],
-                                article['link'], 
-                                datetime.now()
-                            )
-                            news_count += 1
-                            await asyncio.sleep(0.5)  # Задержка между постами
-                
-                except Exception as e:
-                    logger.error(f"❌ Ошибка при получении новостей из {source['name']}: {e}")
-                    self.stats['errors'] += 1
-            
-            self.stats['fetches'] += 1
-            self.stats['news_posted'] += news_count
-            self.stats['last_fetch'] = datetime.now()
-            
-            logger.info(f"✅ Получено и опубликовано новостей: {news_count}")
+            result = await self.bot.run_fetch_cycle(reason='schedule')
+            # Циклы, новости и ошибки считает сам цикл (NewsBot._fetch_cycle)
+            logger.info(f"✅ Получено и опубликовано новостей: {result['published']}")
+            return result
         
         except Exception as e:
             logger.error(f"❌ Критическая ошибка в fetch_news_job: {e}")
-            self.stats['errors'] += 1
+            self._job_failures.inc()
 
     async def send_weekly_report(self):
         """Отправить еженедельный отчет администратору"""
         try:
+            # Приросты счётчиков с прошлого отчёта (отметка хранится в БД вместе со счётчиками)
+            period = self.metrics.since_mark
+            send = self.metrics.get('telegram_send_seconds').summary()
+            last_fetch = self.metrics.get('news_last_fetch_timestamp_seconds').value()
+            queue = await self.bot.db.get_outbox_stats()
             report_text = f"""
 📊 <b>Еженедельный отчет новостного бота</b>
 
 📈 Статистика:
-• Количество запросов: {self.stats['fetches']}
-• Опубликовано новостей: {self.stats['news_posted']}
-• Ошибок: {self.stats['errors']}
-• Последний запрос: {self.stats['last_fetch'].strftime('%Y-%m-%d %H:%M:%S') if self.stats['last_fetch'] else 'N/A'}
-
-👥 Активные источники: {len(self.bot.db.get_active_sources())}
-
-⏰ Период: последние 7 дней
+• Циклов получения: {period('news_fetch_cycles_total'):.0f}
+• Поставлено в очередь новостей: {period('news_enqueued_total'):.0f}
+• Отправлено сообщений: {period('news_outbox_attempts_total', result='sent'):.0f}
+• Отсеяно дублей: {period('news_duplicates_total', kind='url'):.0f} по ссылке, {period('news_duplicates_total', kind='near'):.0f} перепечаток
+• Ошибок источников: {period('news_fetch_cycle_errors_total'):.0f}
+• Ответов 429: {period('telegram_retry_after_total'):.0f}
+• Средняя задержка отправки: {f"{send['avg'] * 1000:.0f} мс" if send['avg'] is not None else 'N/A'}
+• В очереди outbox: {queue.get('pending', 0)}
+• Последний запрос: {datetime.fromtimestamp(last_fetch).strftime('%Y-%m-%d %H:%M:%S') if last_fetch else 'N/A'}
+
+👥 Активные источники: {len(await self.bot.db.get_active_sources())}
+
+⏰ Период: с прошлого отчета
             """
             
             # Отправить администратору
@@ -129,30 +101,46 @@ class AdvancedNewsBot:
                     parse_mode="HTML"
                 )
                 logger.info("📊 Еженедельный отчет отправлен администратору")
+            self.metrics.mark()
+            await self.bot.save_metrics()
         
         except Exception as e:
             logger.error(f"❌ Ошибка при отправке отчета: {e}")
 
     async def get_stats(self):
         """Получить текущую статистику"""
+        def counter(name):
+            return self.metrics.get(name).total()
+
+        last_fetch = self.metrics.get('news_last_fetch_timestamp_seconds').value()
+        started = self.metrics.get('news_bot_start_time_seconds').value()
         return {
-            'fetches': self.stats['fetches'],
-            'news_posted': self.stats['news_posted'],
-            'errors': self.stats['errors'],
-            'last_fetch': self.stats['last_fetch'].isoformat() if self.stats['last_fetch'] else None,
-            'active_sources': len(self.bot.db.get_active_sources()),
-            'uptime_seconds': (datetime.now() - datetime.now()).total_seconds()
+            'fetches': counter('news_fetch_cycles_total'),
+            'news_posted': counter('news_enqueued_total'),
+            'errors': counter('news_fetch_cycle_errors_total') + counter('news_fetch_job_failures_total'),
+            'last_fetch': datetime.fromtimestamp(last_fetch).isoformat() if last_fetch else None,
+            'active_sources': len(await self.bot.db.get_active_sources()),
+            'uptime_seconds': round(time.time() - started, 1),
+            'url_cache': self.bot.db.url_cache.get_stats() if self.bot.db.url_cache else None,
+            'polling': self.bot.poller.get_stats(),
+            'fetch_cycles': self.bot.fetches.get_stats(),
+            'source_health': self.bot.health.get_stats(),
+            'nitter': self.bot.nitter.get_stats(),
+            'tracing': self.bot.tracer.get_stats(),
+            'outbox': await self.bot.db.get_outbox_stats()
         }
 
     def start(self):
         """Запустить планировщик"""
         self.setup_schedule()
         self.scheduler.start()
+        self.bot.poller.start()
         logger.info("🚀 Scheduler запущен")
 
     def stop(self):
         """Остановить планировщик"""
         self.scheduler.shutdown()
+        # Адаптивный опрос останавливается в NewsBot.close()
         logger.info("⛔ Scheduler остановлен")
 
 
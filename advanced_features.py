@@ -3,42 +3,72 @@
 Фильтрация, сортировка, интеграция с другими сервисами
 """
 
+from article import article_text
+from keyword_matcher import KeywordMatcher, normalize
+
+
 # ==================== ФИЛЬТРАЦИЯ ПО КЛЮЧЕВЫМ СЛОВАМ ====================
 
 class NewsFilter:
-    """Фильтрация новостей по ключевым словам"""
+    """
+    Фильтрация новостей по ключевым словам.
+    Все слова собраны в один автомат (keyword_matcher), текст проверяется
+    за один проход при любом числе слов. По умолчанию - поиск подстрок,
+    как и раньше ("биткоин" найдётся в "биткоина"); whole_words=True -
+    только целые слова, "крипт*" - слова с этим началом.
+    """
     
-    def __init__(self):
+    def __init__(self, whole_words: bool = False):
         self.include_keywords = []  # Включить если содержит
         self.exclude_keywords = []  # Исключить если содержит
+        self.include_categories = set()  # Включить если есть категория
+        self.exclude_categories = set()  # Исключить если есть категория
+        self.whole_words = whole_words
+        self._matcher = KeywordMatcher()
     
     def set_include(self, keywords: list):
         """Добавить ключевые слова для включения"""
-        self.include_keywords = [k.lower() for k in keywords]
+        self.include_keywords = list(keywords)
+        self._compile()
     
     def set_exclude(self, keywords: list):
         """Добавить ключевые слова для исключения"""
-        self.exclude_keywords = [k.lower() for k in keywords]
+        self.exclude_keywords = list(keywords)
+        self._compile()
+    
+    def set_categories(self, include: list = (), exclude: list = ()):
+        """Фильтр по article['categories'] (теги feed'а и категоризатор)"""
+        self.include_categories = {normalize(c) for c in include}
+        self.exclude_categories = {normalize(c) for c in exclude}
+    
+    def _compile(self):
+        """Пересобрать автомат (только при изменении списков)"""
+        self._matcher = KeywordMatcher(
+            [(k, False) for k in self.include_keywords] + [(k, True) for k in self.exclude_keywords],
+            whole_words=self.whole_words,
+        )
     
     def should_post(self, article: dict) -> bool:
         """Проверить должна ли новость быть опубликована"""
-        title = article.get('title', '').lower()
-        summary = article.get('summary', '').lower()
-        full_text = f"{title} {summary}".lower()
-        
-        # Проверка ИСКЛЮЧЕНИЙ (высший приоритет)
-        for keyword in self.exclude_keywords:
-            if keyword in full_text:
+        if self.include_categories or self.exclude_categories:
+            categories = {normalize(c) for c in article.get('categories', ()) if c}
+            if categories & self.exclude_categories:
+                return False
+            if self.include_categories and not categories & self.include_categories:
                 return False
+        if not self.include_keywords and not self.exclude_keywords:
+            return True
+        full_text = article_text(article)
         
-        # Если есть include_keywords, проверяем их
-        if self.include_keywords:
-            for keyword in self.include_keywords:
-                if keyword in full_text:
-                    return True
-            return False
+        included = False
+        for excluded, _, _ in self._matcher.iter_matches(full_text):
+            # Исключения - высший приоритет
+            if excluded:
+                return False
+            included = True
         
-        return True
+        # Если есть include_keywords, нужно хотя бы одно совпадение
+        return included or not self.include_keywords
 
 
 # ==================== РАСШИРЕННОЕ ЛОГИРОВАНИЕ ====================
@@ -86,12 +116,10 @@ def setup_logging(log_dir: str = "logs"):
 """
 Если вы хотите публиковать в Discord канал одновременно:
 
-import aiohttp
-from aiohttp import FormData
-
 class DiscordPoster:
-    def __init__(self, webhook_url: str):
+    def __init__(self, webhook_url: str, http):
         self.webhook_url = webhook_url
+        self.http = http  # Общий HttpClient бота (bot.http), без своей сессии
     
     async def post_news(self, article: dict, source: dict):
         '''Отправить новость в Discord webhook'''
@@ -118,12 +146,11 @@ class DiscordPoster:
         
         payload = {"embeds": [embed]}
         
-        async with aiohttp.ClientSession() as session:
-            async with session.post(self.webhook_url, json=payload) as resp:
-                return resp.status == 204
+        async with self.http.post(self.webhook_url, json=payload) as resp:
+            return resp.status == 204
 
 # Использование в main news_bot:
-# discord_poster = DiscordPoster("YOUR_DISCORD_WEBHOOK_URL")
+# discord_poster = DiscordPoster("YOUR_DISCORD_WEBHOOK_URL", bot.http)
 # await discord_poster.post_news(article, source)
 """
 
@@ -146,7 +173,7 @@ current_bot = None
 async def add_source(name: str, url: str, source_type: str):
     '''API для добавления источника'''
     try:
-        added = current_bot.db.add_source(name, url, source_type)
+        added = await current_bot.db.add_source(name, url, source_type)
         if added:
             return {"status": "success", "message": f"Source {name} added"}
         else:
@@ -157,7 +184,7 @@ async def add_source(name: str, url: str, source_type: str):
 @app.get("/api/sources")
 async def get_sources():
     '''Получить список источников'''
-    sources = current_bot.db.get_active_sources()
+    sources = await current_bot.db.get_active_sources()
     return {"sources": sources}
 
 @app.post("/api/fetch")
@@ -179,36 +206,30 @@ async def get_stats():
 # ==================== АНАЛИЗ НОВОСТЕЙ (NLP) ====================
 
 """
-Добавляем категоризацию и анализ тональности (требует textblob):
+Категоризация встроена в NewsBot.publish_articles (categorizer.BatchCategorizer):
+вся пачка новых статей классифицируется за раз - термины хешируются в корзины
+и умножаются на разреженную матрицу "термин -> категория" в NumPy.
+Категории дописываются в article['categories'] рядом с тегами feed'а,
+их видят правила /add_route ... category=ai и NewsFilter.set_categories.
+
+Настройка через .env:
+CATEGORIZER_ENABLED=1
+CATEGORIES_FILE=categories.json   # {"ai": ["нейросет*", "машинное обучение"], ...}
+
+from categorizer import BatchCategorizer, DEFAULT_CATEGORIES
+
+categorizer = BatchCategorizer(DEFAULT_CATEGORIES)
+categorizer.categorize(articles)  # [['security', 'crypto'], ['general'], ...]
+
+Анализ тональности (требует textblob):
 
 pip install textblob
 
 from textblob import TextBlob
-from collections import Counter
 
 class NewsAnalyzer:
     '''Анализ новостей с помощью NLP'''
     
-    KEYWORDS_MAPPING = {
-        'positive': ['хорошо', 'успех', 'рост', 'выигрыш', 'улучшение'],
-        'negative': ['плохо', 'падение', 'убыток', 'проблема', 'ошибка'],
-        'security': ['уязвимость', 'безопасность', 'взлом', 'хак'],
-        'crypto': ['криптовалюта', 'блокчейн', 'NFT', 'DeFi'],
-        'ai': ['ИИ', 'нейросеть', 'машинное обучение', 'ChatGPT'],
-    }
-    
-    @staticmethod
-    def categorize(article: dict) -> list:
-        '''Определить категории новости'''
-        text = f"{article['title']} {article['summary']}".lower()
-        categories = []
-        
-        for category, keywords in NewsAnalyzer.KEYWORDS_MAPPING.items():
-            if any(keyword in text for keyword in keywords):
-                categories.append(category)
-        
-        return categories or ['general']
-    
     @staticmethod
     def sentiment(text: str) -> str:
         '''Определить тональность (positive/neutral/negative)'''
@@ -223,7 +244,6 @@ class NewsAnalyzer:
             return 'neutral'
 
 # Использование:
-# categories = NewsAnalyzer.categorize(article)
 # sentiment = NewsAnalyzer.sentiment(article['title'])
 """
 
@@ -267,37 +287,23 @@ class TimezonedScheduler:
 # ==================== ДЕДУПЛИКАЦИЯ РАСШИРЕННАЯ ====================
 
 """
-Умная дедупликация - проверка не только по URL, но и по содержимому:
+Умная дедупликация - проверка не только по URL, но и по содержимому.
+Встроена в NewsBot.publish_articles (near_dup.NearDuplicateDetector):
+SimHash заголовка и анонса + LSH индекс за скользящее окно вместо
+попарного сравнения difflib со всеми последними новостями.
 
-import hashlib
-from difflib import SequenceMatcher
+Настройка через .env:
+NEAR_DUP_ENABLED=1
+NEAR_DUP_DISTANCE=4        # Сколько бит из 64 могут отличаться
+NEAR_DUP_WINDOW_HOURS=72
 
-class SmartDeduplicator:
-    def __init__(self, db):
-        self.db = db
-    
-    @staticmethod
-    def hash_title(title: str) -> str:
-        '''Хеш заголовка для сравнения'''
-        return hashlib.md5(title.lower().strip().encode()).hexdigest()
-    
-    @staticmethod
-    def similarity(str1: str, str2: str) -> float:
-        '''Процент схожести двух строк'''
-        return SequenceMatcher(None, str1.lower(), str2.lower()).ratio()
-    
-    async def is_duplicate(self, article: dict, threshold: float = 0.8) -> bool:
-        '''Проверить является ли дубликатом (по заголовку)'''
-        
-        # Сначала проверяем URL
-        if self.db.is_news_published(article['link']):
-            return True
-        
-        # Потом проверяем схожесть заголовков
-        # ... (запрос всех последних новостей)
-        # и сравнение с threshold
-        
-        return False
+Проверить пару текстов вручную:
+
+from near_dup import simhash
+
+a = simhash("Bitcoin обновил максимум года на фоне притока в ETF")
+b = simhash("Bitcoin обновил максимум года на фоне притока средств в ETF")
+print((a ^ b).bit_count())  # Расстояние Хэмминга; <= NEAR_DUP_DISTANCE - перепечатка
 """
 
 
@@ -359,10 +365,9 @@ async def advanced_news_processor(bot, article, source):
         logger.info(f"Статья отфильтрована: {article['title']}")
         return
     
-    # 2. Анализ
-    # categories = NewsAnalyzer.categorize(article)
+    # 2. Анализ (article['categories'] уже заполнены категоризатором)
     # sentiment = NewsAnalyzer.sentiment(article['title'])
-    # logger.info(f"Categories: {categories}, Sentiment: {sentiment}")
+    # logger.info(f"Categories: {article['categories']}, Sentiment: {sentiment}")
     
     # 3. Публикация
     await bot._post_news_to_channels(article, source)
@@ -0,0 +1,162 @@
+"""
+Статья feed'а
+Неизменяемый объект со __slots__ вместо словаря на каждую запись: меньше
+памяти на статью, имя источника интернируется (одна строка на все статьи
+источника). Производные поля - канонический URL, url_key, текст для поиска,
+SimHash, текст сообщения - считаются при первом обращении и запоминаются.
+Чтение по ключу (article['title'], article.get('summary')) оставлено для
+кода, который работает и со словарями (фильтры, маршрутизация, замеры).
+"""
+
+import sys
+from typing import Dict, Iterable, Optional
+
+from keyword_matcher import normalize
+from near_dup import simhash
+from url_canon import canonical_url, url_key
+
+FIELDS = ('title', 'link', 'summary', 'published', 'published_ts', 'source', 'categories')
+
+
+class Article:
+    """Статья feed'а (неизменяемая)"""
+
+    __slots__ = FIELDS + ('_url_key', '_canonical_url', '_text', '_simhash', '_rendered')
+
+    def __init__(self, title: str, link: str, summary: str = '', published: str = '',
+                 published_ts: Optional[int] = None, source: str = 'Unknown',
+                 categories: Iterable[str] = (), url_key: Optional[int] = None):
+        init = object.__setattr__
+        init(self, 'title', title)
+        init(self, 'link', link)
+        init(self, 'summary', summary)
+        init(self, 'published', published)
+        init(self, 'published_ts', published_ts)
+        init(self, 'source', sys.intern(source))
+        init(self, 'categories', tuple(categories))
+        if url_key is not None:
+            init(self, '_url_key', url_key)
+        # Производные слоты не заполняются до первого обращения
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Article неизменяема - используйте replace()")
+
+    def __delattr__(self, name):
+        raise AttributeError("Article неизменяема")
+
+    def __reduce__(self):
+        # Пул процессов разбора возвращает статьи через pickle
+        return (Article, tuple(getattr(self, field) for field in FIELDS)
+                + (getattr(self, '_url_key', None),))
+
+    def __repr__(self) -> str:
+        return f"Article({self.title!r}, {self.link!r}, source={self.source!r})"
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Article):
+            return NotImplemented
+        return all(getattr(self, f) == getattr(other, f) for f in FIELDS)
+
+    __hash__ = None  # Сравнение по значению, ключом словаря служит url_key
+
+    # ---------- доступ как к словарю ----------
+
+    def __getitem__(self, key: str):
+        if key in FIELDS or key == 'url_key':
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __contains__(self, key: str) -> bool:
+        return key in FIELDS or key == 'url_key'
+
+    def get(self, key: str, default=None):
+        return getattr(self, key) if key in self else default
+
+    # ---------- производные поля ----------
+
+    @property
+    def canonical_url(self) -> str:
+        value = getattr(self, '_canonical_url', None)
+        if value is None:
+            value = canonical_url(self.link)
+            object.__setattr__(self, '_canonical_url', value)
+        return value
+
+    @property
+    def url_key(self) -> int:
+        """Ключ дедупликации канонического URL (см. url_canon)"""
+        value = getattr(self, '_url_key', None)
+        if value is None:
+            value = url_key(self.link)
+            object.__setattr__(self, '_url_key', value)
+        return value
+
+    @property
+    def text(self) -> str:
+        """Заголовок и анонс - для фильтров, маршрутизации, категорий и SimHash"""
+        value = getattr(self, '_text', None)
+        if value is None:
+            value = f"{self.title} {self.summary}"
+            object.__setattr__(self, '_text', value)
+        return value
+
+    @property
+    def simhash(self) -> int:
+        value = getattr(self, '_simhash', None)
+        if value is None:
+            value = simhash(self.text)
+            object.__setattr__(self, '_simhash', value)
+        return value
+
+    def render(self, category: str) -> str:
+        """Текст сообщения в Telegram (HTML); для нескольких каналов считается один раз"""
+        rendered = getattr(self, '_rendered', None)
+        if rendered is None or rendered[0] != category:
+            text = f"""
+📰 <b>{self.title}</b>
+
+ℹ️ Источник: {self.source}
+🏷️ Категория: {category}
+
+{self.summary}
+
+🔗 <a href="{self.link}">Читать далее</a>
+        """
+            object.__setattr__(self, '_rendered', (category, text))
+        return self._rendered[1]
+
+    # ---------- изменения - новой статьёй ----------
+
+    def replace(self, **changes) -> 'Article':
+        """Копия с изменёнными полями (производные поля считаются заново)"""
+        values = {field: getattr(self, field) for field in FIELDS}
+        values.update(changes)
+        if 'link' not in changes:
+            values['url_key'] = getattr(self, '_url_key', None)
+        return Article(**values)
+
+    def with_categories(self, labels: Iterable[str]) -> 'Article':
+        """Добавить категории, которых ещё нет (без учёта регистра)"""
+        seen = {normalize(c) for c in self.categories}
+        extra = tuple(c for c in labels if normalize(c) not in seen)
+        return self.replace(categories=self.categories + extra) if extra else self
+
+    # ---------- сериализация (outbox) ----------
+
+    def to_dict(self) -> Dict:
+        data = {field: getattr(self, field) for field in FIELDS}
+        data['categories'] = list(self.categories)
+        data['url_key'] = self.url_key
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Article':
+        """Статья из payload outbox (лишние ключи старых записей игнорируются)"""
+        return cls(**{key: data[key] for key in FIELDS + ('url_key',) if key in data})
+
+
+def article_text(article) -> str:
+    """Заголовок и анонс статьи - Article или словаря"""
+    if isinstance(article, Article):
+        return article.text
+    return f"{article.get('title', '')} {article.get('summary', '')}"
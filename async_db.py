@@ -0,0 +1,260 @@
+"""
+Асинхронный доступ к NewsDatabase
+Чтения выполняются в пуле потоков, все записи - в одном потоке-писателе,
+который объединяет подряд идущие вставки в один commit
+"""
+
+import asyncio
+import logging
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import time
+from typing import Dict, List, Optional
+
+from url_cache import PublishedUrlCache
+from url_canon import url_key
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()  # Сигнал остановки потока-писателя
+
+
+class AsyncNewsDatabase:
+    """Асинхронный фасад над NewsDatabase: event loop не ждёт commit и fsync"""
+
+    # Записи, которые писатель склеивает в одну транзакцию: метод -> пакетный метод
+    COALESCE = {
+        'add_published_news': 'add_published_news_batch',
+    }
+
+    def __init__(self, db, read_workers: int = 4, max_batch: int = 500,
+                 url_cache: Optional[PublishedUrlCache] = None):
+        self.sync = db
+        self.url_cache = url_cache
+        self.max_batch = max_batch
+        self.stats = {'writes': 0, 'commits': 0}
+        self._readers = ThreadPoolExecutor(max_workers=read_workers,
+                                           thread_name_prefix="db-read")
+        self._queue: "queue.Queue" = queue.Queue()
+        self._writer = threading.Thread(target=self._writer_loop,
+                                        name="db-writer", daemon=True)
+        self._writer.start()
+
+    # ---------- механика ----------
+
+    async def _read(self, method: str, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._readers, getattr(self.sync, method), *args)
+
+    async def _write(self, method: str, *args):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._queue.put((method, args, loop, future))
+        return await future
+
+    @staticmethod
+    def _resolve(loop, future, result=None, error=None):
+        def apply():
+            if future.cancelled():
+                return
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+        loop.call_soon_threadsafe(apply)
+
+    def _writer_loop(self):
+        pending = None
+        while True:
+            item = pending if pending is not None else self._queue.get()
+            pending = None
+            if item is _STOP:
+                break
+
+            method, args, loop, future = item
+            if method not in self.COALESCE:
+                try:
+                    self._resolve(loop, future, getattr(self.sync, method)(*args))
+                except Exception as e:
+                    self._resolve(loop, future, error=e)
+                self.stats['writes'] += 1
+                self.stats['commits'] += 1
+                continue
+
+            # Забираем из очереди все такие же вставки и пишем их одним commit
+            batch = [item]
+            while len(batch) < self.max_batch:
+                try:
+                    next_item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if next_item is not _STOP and next_item[0] == method:
+                    batch.append(next_item)
+                else:
+                    pending = next_item
+                    break
+
+            try:
+                getattr(self.sync, self.COALESCE[method])([entry[1] for entry in batch])
+                for _, _, entry_loop, entry_future in batch:
+                    self._resolve(entry_loop, entry_future)
+            except Exception as e:
+                logger.error(f"Ошибка групповой записи в БД ({len(batch)} строк): {e}")
+                for _, _, entry_loop, entry_future in batch:
+                    self._resolve(entry_loop, entry_future, error=e)
+            self.stats['writes'] += len(batch)
+            self.stats['commits'] += 1
+
+    async def close(self):
+        """Дописать очередь, остановить потоки и закрыть соединения"""
+        self._queue.put(_STOP)
+        # Ожидание потоков и закрытие соединений - вне event loop
+        await asyncio.to_thread(self._writer.join)
+        await asyncio.to_thread(self._readers.shutdown, wait=True)
+        await asyncio.to_thread(self.sync.close)
+        logger.info(f"БД закрыта: {self.stats['writes']} записей за {self.stats['commits']} commit")
+
+    # ---------- кэш опубликованных URL ----------
+
+    async def load_url_cache(self, capacity: int):
+        """Построить Bloom фильтр по published_news (в потоке чтения)"""
+        if self.url_cache is None:
+            return
+        cache = self.url_cache
+        cache.begin_load()
+        started = time.monotonic()
+
+        def build():
+            count = self.sync.count_published()
+            return cache.build_bloom(self.sync.iter_published_keys(),
+                                     max(capacity, count * 2), cache.fp_rate)
+
+        loop = asyncio.get_running_loop()
+        bloom = await loop.run_in_executor(self._readers, build)
+        cache.finish_load(bloom, time.monotonic() - started)
+        logger.info(f"Кэш URL загружен: {cache.get_stats()}")
+
+    # ---------- чтение ----------
+
+    async def get_active_sources(self) -> List[Dict]:
+        return await self._read('get_active_sources')
+
+    async def is_news_published(self, url: str) -> bool:
+        key = url_key(url)
+        return key in await self.get_published_keys([key])
+
+    async def get_published_keys(self, keys: List[int]) -> set:
+        """Какие из ключей url_hash (url_canon.url_key) уже опубликованы"""
+        if self.url_cache is None:
+            return await self._read('get_published_keys', keys)
+        published, _, unknown = self.url_cache.split(keys)
+        if unknown:
+            found = await self._read('get_published_keys', unknown)
+            self.url_cache.record_db_result(unknown, found)
+            published |= found
+        return published
+
+    async def filter_unpublished(self, urls: List[str]) -> List[str]:
+        keys = [url_key(url) for url in urls]
+        published = await self.get_published_keys(keys)
+        return [url for url, key in zip(urls, keys) if key not in published]
+
+    async def get_source_validators(self) -> Dict[int, Dict]:
+        return await self._read('get_source_validators')
+
+    async def get_source_schedule(self) -> Dict[int, Dict]:
+        return await self._read('get_source_schedule')
+
+    async def get_source_health(self) -> Dict[int, Dict]:
+        return await self._read('get_source_health')
+
+    async def get_due_outbox(self, now: float, limit: int = 50) -> List[Dict]:
+        return await self._read('get_due_outbox', now, limit)
+
+    async def get_outbox_stats(self) -> Dict[str, int]:
+        return await self._read('get_outbox_stats')
+
+    async def get_routing_rules(self) -> List[Dict]:
+        return await self._read('get_routing_rules')
+
+    async def load_fingerprints(self, since: float) -> List[tuple]:
+        return await self._read('load_fingerprints', since)
+
+    async def get_storage_stats(self, count_rows: bool = False) -> Dict:
+        return await self._read('get_storage_stats', count_rows)
+
+    async def probe_query_latency(self) -> Dict[str, float]:
+        return await self._read('probe_query_latency')
+
+    # ---------- запись ----------
+
+    async def add_source(self, name: str, url: str, source_type: str = "rss") -> bool:
+        return await self._write('add_source', name, url, source_type)
+
+    async def remove_source(self, name: str) -> bool:
+        return await self._write('remove_source', name)
+
+    def _cache_published(self, keys: List[int]):
+        # Только после успешного commit: иначе несохранённый URL до рестарта
+        # считался бы опубликованным и статья терялась
+        if self.url_cache is not None:
+            for key in keys:
+                self.url_cache.add(key)
+
+    async def add_published_news(self, source_id: int, title: str, url: str,
+                                 published_at: datetime):
+        result = await self._write('add_published_news', source_id, title, url, published_at)
+        self._cache_published([url_key(url)])
+        return result
+
+    async def add_published_news_batch(self, rows: List[tuple]) -> int:
+        result = await self._write('add_published_news_batch', rows)
+        self._cache_published([url_key(row[2]) for row in rows])
+        return result
+
+    async def enqueue_news(self, rows: List[Dict], channels: Optional[List] = None) -> int:
+        result = await self._write('enqueue_news', rows, channels)
+        self._cache_published([row['url_hash'] if row.get('url_hash') is not None
+                               else url_key(row['url']) for row in rows])
+        return result
+
+    async def add_routing_rule(self, channel_id: str, source_id: Optional[int] = None,
+                               category: Optional[str] = None,
+                               keywords: Optional[List[str]] = None) -> int:
+        return await self._write('add_routing_rule', channel_id, source_id, category, keywords)
+
+    async def remove_routing_rule(self, rule_id: int) -> bool:
+        return await self._write('remove_routing_rule', rule_id)
+
+    async def update_outbox(self, results: List[Dict]):
+        return await self._write('update_outbox', results)
+
+    async def save_source_validators(self, validators: List[Dict]):
+        return await self._write('save_source_validators', validators)
+
+    async def save_source_schedule(self, states: List[Dict]):
+        return await self._write('save_source_schedule', states)
+
+    async def save_source_health(self, states: List[Dict]):
+        return await self._write('save_source_health', states)
+
+    async def save_metric_counters(self, rows: List[Dict]):
+        return await self._write('save_metric_counters', rows)
+
+    async def prune_published(self, older_than_days: float, batch_size: int = 1000,
+                              archive_file: Optional[str] = None) -> int:
+        return await self._write('prune_published', older_than_days, batch_size, archive_file)
+
+    async def prune_fingerprints(self, before: float) -> int:
+        return await self._write('prune_fingerprints', before)
+
+    async def prune_outbox(self, older_than_days: float, batch_size: int = 1000) -> int:
+        return await self._write('prune_outbox', older_than_days, batch_size)
+
+    async def incremental_vacuum(self, pages: int = 1000) -> int:
+        return await self._write('incremental_vacuum', pages)
+
+    async def convert_to_incremental_vacuum(self):
+        return await self._write('convert_to_incremental_vacuum')
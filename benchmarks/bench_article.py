@@ -0,0 +1,111 @@
+"""
+Память на статью: словарь против Article (__slots__, интернированный источник)
+
+Имитируется буфер из --articles статей: разборы feed'ов по 100 записей,
+строка с названием источника у каждого разбора своя (как после декодирования
+XML). Строки заголовков, ссылок и анонсов общие для обоих вариантов и в замер
+не входят - считается только то, что добавляет представление статьи.
+Отдельно - проход "конвейера": текст для фильтра, маршрутизации и SimHash
+(у словаря f-строка на каждой стадии, у Article - один раз).
+
+Запуск:
+    python benchmarks/bench_article.py --articles 100000
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from article import Article, article_text  # noqa: E402
+
+PER_FEED = 100
+SOURCES = ['Habr', 'Хабр Безопасность', 'CoinDesk', 'Яндекс.Дзен', 'GitHub Blog']
+
+
+def raw_entries(count: int) -> list:
+    return [{
+        'title': f"Новость {i}: выпуск новой версии библиотеки",
+        'link': f"https://example.com/news/{i}?utm_source=rss",
+        'url_key': i * 2654435761 % (1 << 63),
+        'categories': ['dev'],
+        'summary': f"Анонс новости номер {i} " * 8,
+        'published': 'Mon, 01 Jan 2024 10:00:00 +0000',
+        'published_ts': 1704103200 + i,
+    } for i in range(count)]
+
+
+def build(entries: list, make) -> list:
+    articles = []
+    for start in range(0, len(entries), PER_FEED):
+        # Новый объект строки на каждый разбор feed'а
+        source = ''.join(SOURCES[start // PER_FEED % len(SOURCES)])
+        source = (source + ' ')[:-1]
+        articles += [make(entry, source) for entry in entries[start:start + PER_FEED]]
+    return articles
+
+
+def as_dict(entry: dict, source: str) -> dict:
+    return {'title': entry['title'], 'link': entry['link'], 'url_key': entry['url_key'],
+            'categories': list(entry['categories']), 'summary': entry['summary'],
+            'published': entry['published'], 'published_ts': entry['published_ts'],
+            'source': source}
+
+
+def as_article(entry: dict, source: str) -> Article:
+    return Article(title=entry['title'], link=entry['link'], url_key=entry['url_key'],
+                   categories=entry['categories'], summary=entry['summary'],
+                   published=entry['published'], published_ts=entry['published_ts'],
+                   source=source)
+
+
+def measure(entries: list, make) -> dict:
+    gc.collect()
+    started = time.perf_counter()
+    build(entries, make)
+    elapsed = time.perf_counter() - started  # Время - без накладных расходов tracemalloc
+    gc.collect()
+    tracemalloc.start()
+    articles = build(entries, make)
+    snapshot = tracemalloc.take_snapshot()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    blocks = sum(stat.count for stat in snapshot.statistics('filename'))
+
+    # Три стадии читают заголовок и анонс одной строкой (фильтр, маршрутизация, SimHash)
+    started = time.perf_counter()
+    for _ in range(3):
+        for article in articles:
+            article_text(article)
+    text_elapsed = time.perf_counter() - started
+    return {
+        'build_ms': round(elapsed * 1000, 1),
+        'memory_mb': round(current / 1024 / 1024, 2),
+        'bytes_per_article': round(current / len(articles)),
+        'live_blocks': blocks,
+        'text_3_stages_ms': round(text_elapsed * 1000, 1),
+        'distinct_source_strings': len({id(article['source']) for article in articles}),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--articles", type=int, default=100000)
+    args = parser.parse_args()
+    entries = raw_entries(args.articles)
+    dicts = measure(entries, as_dict)
+    slotted = measure(entries, as_article)
+    print(json.dumps({
+        'articles': args.articles,
+        'dict': dicts,
+        'article': slotted,
+        'memory_saved': round(1 - slotted['memory_mb'] / dicts['memory_mb'], 3),
+    }, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
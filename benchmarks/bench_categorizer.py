@@ -0,0 +1,132 @@
+"""
+Категоризация: пачка статей на разреженной матрице против цикла по статьям
+
+Прежний NewsAnalyzer.categorize проверял каждую статью отдельно:
+для каждой категории - `in` по каждому ключевому слову. BatchCategorizer
+классифицирует всю пачку одним умножением на матрицу "термин -> категория".
+Прогоняется на встроенных категориях и на большом словаре
+(--categories x --terms), статьи - случайные слова с долей терминов.
+Старый цикл искал подстроки ("ии" находилось в "информации"), поэтому
+точность сверяется не с ним, а с KeywordMatcher (целые слова и "слово*").
+На нескольких десятках терминов цикл с `in` быстрее (время пачки - в основном
+разбор текста на слова), зато от размера словаря пачка почти не зависит.
+
+Запуск:
+    python benchmarks/bench_categorizer.py --articles 100000 --categories 50 --terms 200
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from categorizer import DEFAULT_CATEGORIES, BatchCategorizer  # noqa: E402
+from keyword_matcher import KeywordMatcher  # noqa: E402
+
+LETTERS = "абвгдежзийклмнопрстуфхцчшщыэюяabcdefghijklmnopqrstuvwxyz"
+
+
+def legacy_categorize(article: dict, mapping: dict) -> list:
+    """Прежняя реализация: цикл по категориям и ключевым словам для одной статьи"""
+    text = f"{article['title']} {article['summary']}".lower()
+    categories = []
+    for category, keywords in mapping.items():
+        if any(keyword in text for keyword in keywords):
+            categories.append(category)
+    return categories or ['general']
+
+
+def make_word(rng: random.Random) -> str:
+    return "".join(rng.choice(LETTERS) for _ in range(rng.randint(4, 10)))
+
+
+def make_articles(rng: random.Random, count: int, terms: list, hit_rate: float) -> list:
+    vocab = [make_word(rng) for _ in range(50_000)]
+    articles = []
+    for _ in range(count):
+        words = [rng.choice(vocab) for _ in range(70)]
+        for i in range(len(words)):
+            if rng.random() < hit_rate:
+                words[i] = rng.choice(terms)
+        articles.append({"title": " ".join(words[:8]).capitalize(),
+                         "summary": " ".join(words[8:])[:500]})
+    return articles
+
+
+def run(mapping: dict, articles: list, batch: int, legacy_articles: int) -> dict:
+    started = time.perf_counter()
+    categorizer = BatchCategorizer(mapping)
+    build_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    labels = []
+    for i in range(0, len(articles), batch):
+        labels += categorizer.categorize(articles[i:i + batch])
+    batch_s = time.perf_counter() - started
+
+    # Старый цикл знал только точные подстроки - "слово*" превращается в "слово"
+    plain = {c: [t.rstrip('*').lower() for t in terms] for c, terms in mapping.items()}
+    sample = articles[:legacy_articles]
+    started = time.perf_counter()
+    for article in sample:
+        legacy_categorize(article, plain)
+    legacy_s = (time.perf_counter() - started) * len(articles) / len(sample)
+
+    reference = KeywordMatcher([(t, c) for c, terms in mapping.items() for t in terms])
+    mismatches = sum(
+        set(got) - {'general'} != reference.labels(f"{article['title']} {article['summary']}")
+        for got, article in zip(labels, sample))
+
+    return {
+        "categories": len(mapping),
+        "terms": categorizer.terms,
+        "build_s": round(build_s, 3),
+        "batch": {"elapsed_s": round(batch_s, 2),
+                  "articles_per_s": round(len(articles) / batch_s)},
+        "per_article_loop": {"elapsed_s_extrapolated": round(legacy_s, 2),
+                             "articles_per_s": round(len(articles) / legacy_s),
+                             "sample": len(sample)},
+        "speedup": round(legacy_s / batch_s, 1),
+        "mismatches_vs_keyword_matcher": mismatches,
+        "general_share": round(sum(l == ['general'] for l in labels) / len(labels), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--articles", type=int, default=100_000)
+    parser.add_argument("--batch", type=int, default=1000)
+    parser.add_argument("--categories", type=int, default=50)
+    parser.add_argument("--terms", type=int, default=200)
+    parser.add_argument("--legacy-articles", type=int, default=5000)
+    parser.add_argument("--hit-rate", type=float, default=0.02)
+    args = parser.parse_args()
+    rng = random.Random(15)
+
+    # Встроенные категории: подставляются сами термины и их словоформы
+    builtin_terms = [t.rstrip('*') + ('ами' if t.endswith('*') else '')
+                     for terms in DEFAULT_CATEGORIES.values() for t in terms]
+    builtin = run(DEFAULT_CATEGORIES, make_articles(rng, args.articles, builtin_terms, args.hit_rate),
+                  args.batch, args.legacy_articles)
+
+    large_terms = list({make_word(rng) for _ in range(args.categories * args.terms * 2)})
+    rng.shuffle(large_terms)
+    mapping = {f"cat{c}": large_terms[c * args.terms:(c + 1) * args.terms]
+               for c in range(args.categories)}
+    large = run(mapping, make_articles(rng, args.articles, large_terms[:args.categories * args.terms],
+                                       args.hit_rate),
+                args.batch, args.legacy_articles)
+
+    print(json.dumps({
+        "articles": args.articles,
+        "batch_size": args.batch,
+        "builtin": builtin,
+        "large": large,
+    }, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+"""
+Полный цикл NewsBot без внешней сети: fetch -> publish -> отправка
+
+Поднимаются локальный сервер синтетических feed'ов (fake_feeds.py) и
+фейковый Bot API с лимитами и ответами 429 (fake_telegram.py). Настоящий
+NewsBot (своя БД во временном каталоге) выполняет несколько циклов
+получения, между циклами в части feed'ов появляются новые записи; после
+каждого цикла outbox отправляется в фейковый Telegram.
+
+Каждый сценарий запускается в отдельном процессе (пики памяти сценариев не
+смешиваются, константы news_bot читаются из окружения при импорте).
+peak_rss_mb - сумма пиков RSS процесса сценария и всех его потомков
+(forkserver и воркеры пула разбора). Пики разных процессов могут не совпадать
+по времени, а общие страницы (модули, загруженные в forkserver) считаются
+в каждом процессе - это оценка сверху; разбивка - в rss_mb.
+Результат - JSON; с --compare прошлый результат сравнивается с новым.
+
+Запуск:
+    python benchmarks/bench_cycle.py                      # все сценарии
+    python benchmarks/bench_cycle.py --scenario baseline --feeds 200
+    python benchmarks/bench_cycle.py > before.json
+    python benchmarks/bench_cycle.py --compare before.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+# Параметры: feed-сервер, Bot API, лимиты бота, ход замера
+DEFAULTS = {
+    'feeds': 50, 'entries': 20, 'summary_bytes': 300,
+    'latency': 0.05, 'jitter': 0.5, 'error_rate': 0.0, 'etag': True,
+    'rounds': 4, 'update_share': 0.2, 'new_entries': 3,
+    # Все feed'ы на одном локальном хосте; настоящие источники - на разных,
+    # поэтому лимит на хост по умолчанию не меньше общего
+    'fetch_concurrency': 20, 'per_host_limit': 20,
+    'channels': 2, 'tg_global_rate': 200, 'tg_chat_rate': 6000,  # Бот: в секунду / в минуту на чат
+    'api_global_rate': 200, 'api_chat_per_minute': 6000, 'api_latency': 0.005,
+}
+
+SCENARIOS = {
+    # Типичный набор источников с ETag
+    'baseline': {},
+    # Медленные и нестабильные источники
+    'slow_flaky': {'latency': 0.4, 'jitter': 0.8, 'error_rate': 0.1},
+    # Источники без ETag: каждый опрос - полное тело и сравнение хэша
+    'no_etag': {'etag': False},
+    # Крупные feed'ы (~2.5 МБ, потоковый разбор)
+    'large_feeds': {'feeds': 10, 'entries': 2000, 'summary_bytes': 1200},
+    # Много источников
+    'many_feeds': {'feeds': 500, 'latency': 0.1, 'channels': 1},
+    # Все источники на одном хосте с лимитом бота по умолчанию (4 на хост)
+    'single_host': {'per_host_limit': 4},
+    # Bot API строже лимитов бота: ответы 429 и повторы
+    'telegram_429': {'api_global_rate': 60, 'api_chat_per_minute': 1200},
+}
+
+# Ключевые показатели для --compare: (путь, больше - лучше)
+COMPARE = [
+    (('first_cycle', 'cycle_s'), False),
+    (('steady_cycle_s',), False),
+    (('first_cycle', 'articles_per_s'), True),
+    (('send', 'messages_per_s'), True),
+    (('peak_rss_mb',), False),
+    (('loop_lag', 'p99_ms'), False),
+]
+
+
+def _descendants(pid: int) -> list:
+    """PID всех потомков процесса (по /proc/*/stat)"""
+    children = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue  # Процесс уже завершился
+        children.setdefault(ppid, []).append(int(entry))
+    result, stack = [], [pid]
+    while stack:
+        for child_pid in children.get(stack.pop(), ()):
+            result.append(child_pid)
+            stack.append(child_pid)
+    return result
+
+
+def _peak_rss_kb(pid: int) -> int:
+    """VmHWM процесса (пик RSS), КБ; 0 - процесса уже нет"""
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def peak_rss_mb() -> dict:
+    """
+    Пики RSS процесса и его потомков, МБ. Живые потомки (пул разбора ещё
+    работает) - по /proc; уже завершённые - RUSAGE_CHILDREN (ru_maxrss
+    в Linux - килобайты, максимум по одному процессу).
+    """
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    reaped = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    live = sum(_peak_rss_kb(pid) for pid in _descendants(os.getpid())) if os.path.isdir('/proc') else 0
+    return {'self': round(own / 1024, 1), 'children': round((live + reaped) / 1024, 1),
+            'total': round((own + live + reaped) / 1024, 1)}
+
+
+async def measure_lag(stop: asyncio.Event, interval: float = 0.01) -> dict:
+    lags = []
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - started - interval)
+    lags.sort()
+    return {
+        'p50_ms': round(lags[len(lags) // 2] * 1000, 2) if lags else 0.0,
+        'p99_ms': round(lags[int(len(lags) * 0.99)] * 1000, 2) if lags else 0.0,
+        'max_ms': round(lags[-1] * 1000, 2) if lags else 0.0,
+    }
+
+
+async def drain_outbox(bot) -> int:
+    """Отправить всё, что готово к отправке; вернуть число обработанных строк"""
+    processed = 0
+    while True:
+        batch = await bot.outbox.drain_once()
+        if not batch:
+            return processed
+        processed += batch
+
+
+async def run_scenario(params: dict) -> dict:
+    from fake_feeds import FakeFeedServer
+    from fake_telegram import FakeTelegramAPI
+    import news_bot
+
+    # Логи бота (предупреждения о 429 и т.п.) не нужны в выводе замера
+    logging.getLogger().setLevel(logging.ERROR)
+
+    feeds = FakeFeedServer(feeds=params['feeds'], entries=params['entries'],
+                           summary_bytes=params['summary_bytes'], latency=params['latency'],
+                           jitter=params['jitter'], error_rate=params['error_rate'],
+                           etag=params['etag'])
+    api = FakeTelegramAPI(global_rate=params['api_global_rate'],
+                          chat_per_minute=params['api_chat_per_minute'],
+                          latency=params['api_latency'])
+    await feeds.start()
+    await api.start()
+
+    bot = news_bot.NewsBot("123456:FAKE")
+    await bot.bot.session.close()
+    bot.bot = api.make_bot()
+    for n, url in enumerate(feeds.urls()):
+        bot.db.sync.add_source(f"Feed {n}", url, 'rss')
+
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(measure_lag(stop))
+    rounds = []
+    send = {'messages': 0, 'seconds': 0.0}
+    try:
+        for round_no in range(params['rounds']):
+            published_new = feeds.advance(params['update_share'], params['new_entries']) if round_no else None
+            started = time.perf_counter()
+            result = await bot.run_fetch_cycle(reason='bench')
+            cycle_s = time.perf_counter() - started
+            stages = bot.tracer.recent[-1]['stages'] if bot.tracer.recent else {}
+            rounds.append({
+                'cycle_s': round(cycle_s, 3),
+                'sources': result['sources'],
+                'skipped': result['skipped'],
+                'errors': result['errors'],
+                'not_modified': result['cache_hits'],
+                'new_in_feeds': published_new,
+                'enqueued': result['published'],
+                'articles_per_s': round(result['published'] / cycle_s, 1),
+                'stages_s': {stage: round(s['seconds'], 3) for stage, s in stages.items()},
+            })
+            started = time.perf_counter()
+            send['messages'] += await drain_outbox(bot)
+            send['seconds'] += time.perf_counter() - started
+    finally:
+        stop.set()
+        loop_lag = await lag_task
+        memory = peak_rss_mb()  # До bot.close(): воркеры пула ещё живы
+        outbox = await bot.db.get_outbox_stats()
+        await bot.close()
+        await feeds.stop()
+        await api.stop()
+
+    steady = rounds[1:] or rounds
+    return {
+        'params': params,
+        'first_cycle': rounds[0],
+        'steady_cycle_s': round(sum(r['cycle_s'] for r in steady) / len(steady), 3),
+        'rounds': rounds,
+        'send': {
+            'messages': send['messages'],
+            'seconds': round(send['seconds'], 2),
+            'messages_per_s': round(send['messages'] / send['seconds'], 1) if send['seconds'] else 0.0,
+            'api_429': api.stats['rate_limited'],
+            'outbox': outbox,
+        },
+        'feed_server': feeds.stats,
+        'peak_rss_mb': memory['total'],
+        'rss_mb': memory,
+        'loop_lag': loop_lag,
+    }
+
+
+def child(params: dict):
+    """Один сценарий в текущем процессе (каталог и окружение задал родитель)"""
+    print(json.dumps(asyncio.run(run_scenario(params)), ensure_ascii=False))
+
+
+def run_in_subprocess(params: dict) -> dict:
+    channels = [str(-1000000000000 - i) for i in range(params['channels'])]
+    env = {
+        **os.environ,
+        'TELEGRAM_CHANNELS': json.dumps(channels),
+        'TG_GLOBAL_RATE': str(params['tg_global_rate']),
+        'TG_CHAT_RATE': str(params['tg_chat_rate']),
+        'FETCH_CONCURRENCY': str(params['fetch_concurrency']),
+        'FETCH_PER_HOST_LIMIT': str(params['per_host_limit']),
+        'METRICS_PORT': '0',
+        'TRACE_FILE': '',
+        'CATEGORIES_FILE': '',
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--child', json.dumps(params)],
+            cwd=tmp, env=env, capture_output=True, text=True,
+        )
+    if output.returncode != 0:
+        raise RuntimeError(f"Сценарий упал:\n{output.stderr[-3000:]}")
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def pick(result: dict, path: tuple):
+    for key in path:
+        result = result.get(key) if isinstance(result, dict) else None
+    return result
+
+
+def compare(before: dict, after: dict) -> dict:
+    """Отношение новое/старое по ключевым показателям; regression - хуже более чем на 10%"""
+    report = {}
+    for name, result in after.items():
+        if name not in before:
+            continue
+        rows = {}
+        for path, higher_is_better in COMPARE:
+            old, new = pick(before[name], path), pick(result, path)
+            if not old or new is None:
+                continue
+            ratio = new / old
+            worse = ratio < 0.9 if higher_is_better else ratio > 1.1
+            rows['.'.join(path)] = {'before': old, 'after': new, 'ratio': round(ratio, 3),
+                                    'regression': worse}
+        report[name] = rows
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scenario", action='append', choices=sorted(SCENARIOS),
+                        help="Сценарий (можно несколько); по умолчанию - все")
+    parser.add_argument("--compare", help="JSON прошлого запуска для сравнения")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    for key, value in DEFAULTS.items():
+        kind = (lambda v: v.lower() in ('1', 'true', 'yes')) if isinstance(value, bool) else type(value)
+        parser.add_argument(f"--{key.replace('_', '-')}", type=kind,
+                            help=f"Переопределить для всех сценариев (по умолчанию {value})")
+    args = parser.parse_args()
+    if args.child:
+        child(json.loads(args.child))
+        return
+
+    overrides = {key: getattr(args, key) for key in DEFAULTS if getattr(args, key) is not None}
+    results = {}
+    for name in args.scenario or list(SCENARIOS):
+        params = {**DEFAULTS, **SCENARIOS[name], **overrides}
+        results[name] = run_in_subprocess(params)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            before = json.load(f)
+        results = {'results': results, 'compare': compare(before.get('results', before), results)}
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
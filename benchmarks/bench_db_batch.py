@@ -0,0 +1,114 @@
+"""
+Пропускная способность NewsDatabase: по одной статье против пачек
+
+Готовит таблицу published_news на N строк (по умолчанию 1M) и сравнивает:
+  * legacy   - новое соединение и commit на каждый вызов (как было раньше)
+  * single   - постоянное соединение, но по одной статье
+  * batched  - filter_unpublished + add_published_news_batch одной транзакцией
+
+Запуск:
+    python benchmarks/bench_db_batch.py --rows 1000000 --candidates 5000
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from news_bot import NewsDatabase  # noqa: E402
+from url_canon import url_key  # noqa: E402
+
+
+def fill(db_file: str, rows: int):
+    conn = sqlite3.connect(db_file)
+    now = datetime.now().isoformat(" ")
+    with conn:
+        conn.executemany(
+            "INSERT INTO published_news "
+            "(source_id, title, url, url_hash, published_at, posted_to_tg) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            ((i % 200, f"Новость {i}", f"https://example.com/news/{i}",
+              url_key(f"https://example.com/news/{i}"), now, now) for i in range(rows)),
+        )
+    conn.close()
+
+
+def candidates(rows: int, count: int, tag: str):
+    """Половина уже опубликована, половина новые"""
+    seen = [f"https://example.com/news/{rows - 1 - i}" for i in range(count // 2)]
+    fresh = [f"https://example.com/{tag}/{i}" for i in range(count - count // 2)]
+    return seen + fresh
+
+
+def legacy(db_file: str, urls):
+    """Старое поведение: соединение и commit на каждый вызов"""
+    for url in urls:
+        conn = sqlite3.connect(db_file)
+        found = conn.execute("SELECT id FROM published_news WHERE url_hash = ?",
+                             (url_key(url),)).fetchone()
+        conn.close()
+        if found is None:
+            conn = sqlite3.connect(db_file)
+            conn.execute(
+                "INSERT INTO published_news "
+                "(source_id, title, url, url_hash, published_at, posted_to_tg) "
+                "VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)",
+                (1, "t", url, url_key(url), datetime.now()))
+            conn.commit()
+            conn.close()
+
+
+def single(db: NewsDatabase, urls):
+    for url in urls:
+        if not db.is_news_published(url):
+            db.add_published_news(1, "t", url, datetime.now())
+
+
+def batched(db: NewsDatabase, urls):
+    fresh = db.filter_unpublished(urls)
+    db.add_published_news_batch([(1, "t", url, datetime.now()) for url in fresh])
+
+
+def timed(func, *args) -> float:
+    started = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--candidates", type=int, default=5000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = os.path.join(tmp, "bench.db")
+        db = NewsDatabase(db_file)
+        started = time.perf_counter()
+        fill(db_file, args.rows)
+        fill_s = time.perf_counter() - started
+
+        results = {"rows": args.rows, "candidates": args.candidates,
+                   "fill_s": round(fill_s, 2)}
+        for name, func, target in (("legacy", legacy, db_file),
+                                   ("single", single, db),
+                                   ("batched", batched, db)):
+            elapsed = timed(func, target, candidates(args.rows, args.candidates, name))
+            results[name] = {
+                "elapsed_s": round(elapsed, 4),
+                "articles_per_s": round(args.candidates / elapsed),
+            }
+        db.close()
+
+    results["speedup_batched_vs_legacy"] = round(
+        results["legacy"]["elapsed_s"] / results["batched"]["elapsed_s"], 1)
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
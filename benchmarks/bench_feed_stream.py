@@ -0,0 +1,134 @@
+"""
+Большой feed: feedparser против потокового StreamingFeedParser
+
+Генерируется RSS на --mb мегабайт. Каждый вариант запускается в отдельном
+процессе, чтобы пик памяти (ru_maxrss) не смешивался:
+- feedparser: тело целиком в памяти + feedparser.parse, как было в боте;
+- stream_new_source: поток кусками по 64KB, новый источник (первые 10 записей);
+- stream_watermark: поток до watermark (5 новых записей);
+- stream_full_scan: feed от старых к новым - читается до конца, хранятся
+  только 10 самых новых записей.
+
+Запуск:
+    python benchmarks/bench_feed_stream.py --mb 20
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CHUNK = 65536
+
+
+def make_item(i: int) -> str:
+    day, second = divmod(i, 86400)
+    return (f'<item><guid>https://example.com/news/{i}</guid>'
+            f'<title>Новость номер {i} о разработке и безопасности</title>'
+            f'<link>https://example.com/news/{i}?utm_source=rss</link>'
+            f'<category>dev</category>'
+            f'<pubDate>{1 + day % 28:02d} Jan 2024 {second // 3600:02d}:'
+            f'{second // 60 % 60:02d}:{second % 60:02d} +0000</pubDate>'
+            f'<description><![CDATA[<p>{"Текст анонса. " * 55}</p>]]></description>'
+            f'</item>\n')
+
+
+def make_feed(path: str, megabytes: float, ascending: bool = False) -> int:
+    """RSS с записями ~1.5KB (заголовок, ссылка, анонс, дата); возвращает число записей"""
+    count = int(megabytes * 1024 * 1024 / len(make_item(0).encode('utf-8')))
+    order = range(count) if ascending else range(count - 1, -1, -1)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('<?xml version="1.0" encoding="utf-8"?><rss version="2.0"><channel>'
+                '<title>Архив</title>')
+        for i in order:
+            f.write(make_item(i))
+        f.write('</channel></rss>')
+    return count
+
+
+def max_rss_mb() -> float:
+    # ru_maxrss в Linux - килобайты
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_case(case: str, path: str, count: int):
+    import feedparser
+    from feed_stream import StreamingFeedParser
+
+    baseline = max_rss_mb()
+    started = time.perf_counter()
+    read = 0
+    if case == 'feedparser':
+        with open(path, 'rb') as f:
+            content = f.read()
+        read = len(content)
+        feed = feedparser.parse(content)
+        articles = feed.entries[:10]
+    else:
+        watermark = None
+        if case == 'stream_watermark':
+            watermark = {'last_guid': f'https://example.com/news/{count - 6}',
+                         'last_link_hash': None, 'last_published_ts': None}
+        parser = StreamingFeedParser(watermark=watermark, limit=100, initial_limit=10)
+        articles = []
+        with open(path, 'rb') as f:
+            while not parser.done:
+                chunk = f.read(CHUNK)
+                if not chunk:
+                    break
+                read += len(chunk)
+                articles += parser.feed(chunk)
+        articles += parser.close()
+    elapsed = time.perf_counter() - started
+    print(json.dumps({
+        'articles': len(articles),
+        'bytes_read': read,
+        'elapsed_ms': round(elapsed * 1000, 1),
+        'peak_rss_mb': round(max_rss_mb() - baseline, 1),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mb", type=float, default=20)
+    parser.add_argument("--case")  # Внутренний запуск одного варианта
+    parser.add_argument("--path")
+    parser.add_argument("--count", type=int)
+    args = parser.parse_args()
+    if args.case:
+        run_case(args.case, args.path, args.count)
+        return
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        newest_first = os.path.join(tmp, 'newest_first.xml')
+        oldest_first = os.path.join(tmp, 'oldest_first.xml')
+        count = make_feed(newest_first, args.mb)
+        make_feed(oldest_first, args.mb, ascending=True)
+        for case, path in [('feedparser', newest_first),
+                           ('stream_new_source', newest_first),
+                           ('stream_watermark', newest_first),
+                           ('stream_full_scan', oldest_first)]:
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--case', case,
+                 '--path', path, '--count', str(count)],
+                capture_output=True, text=True, check=True,
+            ).stdout
+            results[case] = json.loads(output.strip().splitlines()[-1])
+        size = os.path.getsize(newest_first)
+
+    print(json.dumps({
+        'feed_mb': round(size / 1024 / 1024, 1),
+        'entries': count,
+        **results,
+    }, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+NewsFilter: автомат Ахо-Корасик против проверки каждого слова через `in`
+
+10k ключевых слов (include + exclude), 100k статей с заголовком и анонсом.
+Старый фильтр слишком медленный для всего набора - он прогоняется
+на --legacy-articles статьях, время пересчитывается на весь объём.
+Фильтр по умолчанию ищет подстроки, как и старый - решения сверяются на выборке.
+
+Запуск:
+    python benchmarks/bench_keywords.py --keywords 10000 --articles 100000
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from advanced_features import NewsFilter  # noqa: E402
+
+LETTERS = "абвгдежзийклмнопрстуфхцчшщыэюяabcdefghijklmnopqrstuvwxyz"
+
+
+class LegacyNewsFilter:
+    """Прежняя реализация: lower() и отдельный `in` на каждое слово"""
+
+    def __init__(self, include, exclude):
+        self.include_keywords = [k.lower() for k in include]
+        self.exclude_keywords = [k.lower() for k in exclude]
+
+    def should_post(self, article: dict) -> bool:
+        full_text = f"{article.get('title', '')} {article.get('summary', '')}".lower()
+        for keyword in self.exclude_keywords:
+            if keyword in full_text:
+                return False
+        if self.include_keywords:
+            for keyword in self.include_keywords:
+                if keyword in full_text:
+                    return True
+            return False
+        return True
+
+
+def make_word(rng: random.Random) -> str:
+    return "".join(rng.choice(LETTERS) for _ in range(rng.randint(4, 10)))
+
+
+def make_article(rng: random.Random, vocab: list, keywords: list, hit_rate: float) -> dict:
+    words = [rng.choice(vocab) for _ in range(70)]
+    if rng.random() < hit_rate:  # Часть статей содержит ключевое слово
+        words[rng.randrange(len(words))] = rng.choice(keywords)
+    return {"title": " ".join(words[:8]).capitalize(), "summary": " ".join(words[8:])[:500]}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--keywords", type=int, default=10_000)
+    parser.add_argument("--articles", type=int, default=100_000)
+    parser.add_argument("--legacy-articles", type=int, default=500)
+    parser.add_argument("--exclude-share", type=float, default=0.1)
+    parser.add_argument("--hit-rate", type=float, default=0.2)
+    args = parser.parse_args()
+    rng = random.Random(13)
+
+    keywords = list({make_word(rng) for _ in range(args.keywords * 3)})[:args.keywords]
+    # Фразы из двух слов - как "machine learning"
+    for i in range(0, len(keywords), 10):
+        keywords[i] = f"{keywords[i]} {make_word(rng)}"
+    split = int(len(keywords) * args.exclude_share)
+    exclude, include = keywords[:split], keywords[split:]
+    vocab = [make_word(rng) for _ in range(50_000)]
+    articles = [make_article(rng, vocab, keywords, args.hit_rate) for _ in range(args.articles)]
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    news_filter = NewsFilter()
+    news_filter.set_include(include)
+    news_filter.set_exclude(exclude)
+    build_s = time.perf_counter() - started
+    automaton_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    started = time.perf_counter()
+    posted = sum(news_filter.should_post(article) for article in articles)
+    new_s = time.perf_counter() - started
+
+    # Старый фильтр и сверка решений на выборке
+    sample = articles[:args.legacy_articles]
+    legacy = LegacyNewsFilter(include, exclude)
+    started = time.perf_counter()
+    legacy_decisions = [legacy.should_post(article) for article in sample]
+    legacy_s = (time.perf_counter() - started) * len(articles) / len(sample)
+    mismatches = sum(news_filter.should_post(article) != expected
+                     for article, expected in zip(sample, legacy_decisions))
+
+    print(json.dumps({
+        "keywords": len(keywords),
+        "articles": args.articles,
+        "build_s": round(build_s, 2),
+        "automaton_states": news_filter._matcher.states,
+        "automaton_mb": round(automaton_bytes / 2 ** 20, 1),
+        "aho_corasick": {
+            "elapsed_s": round(new_s, 2),
+            "articles_per_s": round(args.articles / new_s),
+            "posted": posted,
+        },
+        "legacy_in_scan": {
+            "elapsed_s_extrapolated": round(legacy_s, 1),
+            "articles_per_s": round(args.articles / legacy_s),
+            "sample": len(sample),
+        },
+        "speedup": round(legacy_s / new_s, 1),
+        "legacy_mismatches": mismatches,
+    }, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
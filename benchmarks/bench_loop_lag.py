@@ -0,0 +1,115 @@
+"""
+Отзывчивость event loop во время большой загрузки RSS
+
+Поднимает локальный aiohttp сервер с крупными feed'ами, запускает их
+параллельный разбор через NewsParser и параллельно меряет задержку
+"тиков" event loop (так же страдал бы polling aiogram).
+
+Запуск:
+    python benchmarks/bench_loop_lag.py --feeds 20 --entries 3000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+from aiohttp import web
+import feedparser
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from news_bot import NewsParser  # noqa: E402
+
+
+def make_feed(entries: int) -> bytes:
+    items = "".join(
+        f"<item><title>Новость {i}</title><link>https://example.com/n/{i}</link>"
+        f"<description>{'Текст новости. ' * 20}</description>"
+        f"<pubDate>Mon, 06 Jan 2025 10:00:00 GMT</pubDate></item>"
+        for i in range(entries)
+    )
+    return (f'<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel>'
+            f"<title>Bench</title>{items}</channel></rss>").encode()
+
+
+async def start_server(body: bytes):
+    async def handler(request):
+        return web.Response(body=body, content_type="application/rss+xml")
+
+    app = web.Application()
+    app.router.add_get("/feed/{n}", handler)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+async def measure_lag(stop: asyncio.Event, interval: float = 0.01) -> dict:
+    lags = []
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - started - interval)
+    lags.sort()
+    return {
+        "max_lag_ms": round(lags[-1] * 1000, 2) if lags else 0.0,
+        "p99_lag_ms": round(lags[int(len(lags) * 0.99)] * 1000, 2) if lags else 0.0,
+    }
+
+
+async def run_mode(mode: str, base_url: str, feeds: int) -> dict:
+    urls = [f"{base_url}/feed/{i}" for i in range(feeds)]
+    news_parser = NewsParser()
+
+    async def inline(url):
+        # Старое поведение: разбор прямо в event loop
+        resp = await news_parser._download(url)
+        if resp['content'] is None:
+            # Больше FEED_STREAM_THRESHOLD - уже разобран на лету
+            return resp['parsed']['articles'][:10]
+        return feedparser.parse(resp['content']).entries[:10]
+
+    if mode != "inline":
+        NewsParser.shutdown_pool()
+        NewsParser.pool_type = mode
+
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(measure_lag(stop))
+    started = time.perf_counter()
+    fetch = inline if mode == "inline" else news_parser.parse_rss
+    results = await asyncio.gather(*(fetch(url) for url in urls))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    lag = await lag_task
+    await news_parser.http.close()
+    NewsParser.shutdown_pool()
+    return {"mode": mode, "feeds": feeds, "parsed": sum(len(r) for r in results),
+            "elapsed_s": round(elapsed, 3), **lag}
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--feeds", type=int, default=20)
+    parser.add_argument("--entries", type=int, default=3000)
+    parser.add_argument("--max-lag-ms", type=float, default=250.0,
+                        help="Порог задержки для пулов; при превышении код возврата 1")
+    args = parser.parse_args()
+
+    runner, base_url = await start_server(make_feed(args.entries))
+    try:
+        results = [await run_mode(mode, base_url, args.feeds)
+                   for mode in ("inline", "thread", "process")]
+    finally:
+        await runner.cleanup()
+
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+    pooled = [r for r in results if r["mode"] != "inline"]
+    return 0 if all(r["max_lag_ms"] <= args.max_lag_ms for r in pooled) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,145 @@
+"""
+Поиск перепечаток: скорость LSH индекса SimHash при большом окне
+
+Заполняет индекс N fingerprint'ами (по умолчанию 1M), меряет время поиска
+(промах и почти-совпадение), память индекса, загрузку окна из SQLite,
+время SimHash на статью и полноту на синтетических перепечатках.
+Для сравнения - линейный difflib по --difflib-rows заголовкам (старый набросок).
+
+Запуск:
+    python benchmarks/bench_near_dup.py --rows 1000000
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from difflib import SequenceMatcher
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from near_dup import SimHashIndex, simhash, to_signed  # noqa: E402
+from news_bot import NewsDatabase  # noqa: E402
+
+VOCAB = [f"слово{i}" for i in range(5000)]
+
+
+def make_text(rng: random.Random, words: int) -> list:
+    return [rng.choice(VOCAB) for _ in range(words)]
+
+
+def percentile(values: list, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def timed_lookups(index: SimHashIndex, probes: list) -> dict:
+    samples = []
+    for fp in probes:
+        started = time.perf_counter()
+        index.find(fp)
+        samples.append((time.perf_counter() - started) * 1e6)
+    return {"p50_us": round(percentile(samples, 0.5), 1),
+            "p99_us": round(percentile(samples, 0.99), 1),
+            "max_us": round(max(samples), 1)}
+
+
+def flip_bits(rng: random.Random, fp: int, count: int) -> int:
+    for bit in rng.sample(range(64), count):
+        fp ^= 1 << bit
+    return fp
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--probes", type=int, default=20_000)
+    parser.add_argument("--distance", type=int, default=4)
+    parser.add_argument("--articles", type=int, default=2000)
+    parser.add_argument("--difflib-rows", type=int, default=2000)
+    args = parser.parse_args()
+    rng = random.Random(42)
+    now = time.time()
+
+    # Индекс в памяти
+    fingerprints = [rng.getrandbits(64) for _ in range(args.rows)]
+    tracemalloc.start()
+    index = SimHashIndex(args.distance)
+    started = time.perf_counter()
+    for fp in fingerprints:
+        index.add(fp, now)
+    build_s = time.perf_counter() - started
+    index_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    misses = [rng.getrandbits(64) for _ in range(args.probes)]
+    near = [flip_bits(rng, rng.choice(fingerprints), rng.randint(0, args.distance))
+            for _ in range(args.probes)]
+    found = sum(index.find(fp) is not None for fp in near)
+
+    # SimHash и полнота на синтетических перепечатках
+    originals = [make_text(rng, 60) for _ in range(args.articles)]
+    started = time.perf_counter()
+    hashes = [simhash(" ".join(words)) for words in originals]
+    simhash_us = (time.perf_counter() - started) / args.articles * 1e6
+    text_index = SimHashIndex(args.distance)
+    for fp in hashes:
+        text_index.add(fp, now)
+    variants = {
+        "same_text": lambda w: w,
+        "source_suffix": lambda w: w + ["coindesk"],
+        "one_word_changed": lambda w: w[:30] + [rng.choice(VOCAB)] + w[31:],
+    }
+    recall = {}
+    for name, change in variants.items():
+        hits = sum(text_index.find(simhash(" ".join(change(w)))) is not None for w in originals)
+        recall[name] = round(hits / args.articles, 4)
+    unrelated = sum(text_index.find(simhash(" ".join(make_text(rng, 60)))) is not None
+                    for _ in range(args.articles))
+
+    # Окно из SQLite, как при старте бота
+    with tempfile.TemporaryDirectory() as tmp:
+        db = NewsDatabase(os.path.join(tmp, "bench.db"))
+        with db._conn() as conn:
+            conn.executemany(
+                "INSERT INTO news_fingerprints (url, simhash, created_at) VALUES (?, ?, ?)",
+                ((f"https://example.com/{i}", to_signed(fp), now)
+                 for i, fp in enumerate(fingerprints)),
+            )
+        started = time.perf_counter()
+        loaded = SimHashIndex(args.distance)
+        for fp, added_at in db.load_fingerprints(now - 3600):
+            loaded.add(fp & 0xFFFFFFFFFFFFFFFF, added_at)
+        load_s = time.perf_counter() - started
+        db.close()
+
+    # Старый подход: difflib со всеми последними заголовками
+    titles = [" ".join(make_text(rng, 10)) for _ in range(args.difflib_rows)]
+    probe = " ".join(make_text(rng, 10))
+    started = time.perf_counter()
+    for title in titles:
+        SequenceMatcher(None, probe, title).ratio()
+    difflib_ms = (time.perf_counter() - started) * 1000
+
+    print(json.dumps({
+        "rows": args.rows,
+        "max_distance": args.distance,
+        "build_s": round(build_s, 2),
+        "index_mb": round(index_bytes / 2 ** 20, 1),
+        "lookup_miss": timed_lookups(index, misses),
+        "lookup_near": timed_lookups(index, near),
+        "near_found_ratio": round(found / args.probes, 4),
+        "sqlite_load_s": round(load_s, 2),
+        "simhash_us_per_article": round(simhash_us, 1),
+        "recall": recall,
+        "unrelated_false_matches": unrelated,
+        "difflib_ms_per_article": round(difflib_ms, 1),
+        "difflib_rows": args.difflib_rows,
+    }, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
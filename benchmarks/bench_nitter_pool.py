@@ -0,0 +1,163 @@
+"""
+X/Twitter источники: одно зашитое зеркало Nitter против NitterPool
+
+Поднимаются локальные зеркала-заглушки на aiohttp.web с разным поведением:
+перегруженное (как nitter.net в плохой день - медленный хвост и 429),
+быстрое с редкими зависаниями и нестабильное, отдающее под лимитом
+страницу-заглушку вместо RSS. Несколько раундов опроса всех пользователей:
+считаются успешные ответы, задержка p50/p95 и число запросов к зеркалам.
+
+Запуск:
+    python benchmarks/bench_nitter_pool.py --users 50 --rounds 20
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import time
+
+from aiohttp import web
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from http_client import HttpClient  # noqa: E402
+from nitter_pool import NitterPool  # noqa: E402
+
+RSS = ('<?xml version="1.0"?><rss version="2.0"><channel><title>{user}</title>'
+       '<item><title>tweet</title><link>{base}/{user}/status/1#m</link></item>'
+       '</channel></rss>')
+
+# name: (обычная задержка, доля медленных ответов, медленная задержка, доля 429, доля заглушек)
+PROFILES = {
+    'overloaded': (0.08, 0.15, 1.5, 0.25, 0.0),
+    'fast': (0.02, 0.03, 1.5, 0.0, 0.0),
+    'flaky': (0.03, 0.05, 1.0, 0.15, 0.15),
+}
+
+
+class FakeMirror:
+    def __init__(self, name: str, seed: int):
+        self.name = name
+        self.profile = PROFILES[name]
+        self.rng = random.Random(seed)
+        self.stats = {'requests': 0, 'rate_limited': 0, 'stub': 0}
+        self._runner = None
+        self.base_url = ""
+
+    async def handle(self, request: web.Request):
+        self.stats['requests'] += 1
+        latency, slow_share, slow_latency, limited_share, stub_share = self.profile
+        await asyncio.sleep(slow_latency if self.rng.random() < slow_share else latency)
+        roll = self.rng.random()
+        if roll < limited_share:
+            self.stats['rate_limited'] += 1
+            return web.Response(status=429, text="Too Many Requests")
+        if roll < limited_share + stub_share:
+            self.stats['stub'] += 1
+            return web.Response(text="<html>Instance has been rate limited</html>",
+                                content_type='text/html')
+        return web.Response(text=RSS.format(user=request.match_info['user'], base=self.base_url),
+                            content_type='application/rss+xml')
+
+    async def start(self) -> str:
+        app = web.Application()
+        app.router.add_get('/{user}/rss', self.handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://127.0.0.1:{port}"
+        return self.base_url
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+
+async def run(pool: NitterPool, users: list, rounds: int, round_gap: float) -> dict:
+    latencies, failures = [], 0
+
+    async def one(user):
+        nonlocal failures
+        started = time.monotonic()
+        try:
+            await pool.fetch(user)
+            latencies.append(time.monotonic() - started)
+        except Exception:
+            failures += 1
+
+    for _ in range(rounds):
+        await asyncio.gather(*(one(user) for user in users))
+        await asyncio.sleep(round_gap)
+    total = len(users) * rounds
+    latencies.sort()
+    return {
+        'success_rate': round(len(latencies) / total, 3),
+        'latency_p50_ms': round(statistics.median(latencies) * 1000) if latencies else None,
+        'latency_p95_ms': round(latencies[int(len(latencies) * 0.95)] * 1000) if latencies else None,
+        'pool': {k: v for k, v in pool.get_stats().items() if k != 'mirrors'},
+        'mirrors': [{k: m[k] for k in ('base', 'latency_ms', 'error_rate', 'requests', 'wins')}
+                    for m in pool.get_stats()['mirrors']],
+    }
+
+
+async def main_async(args):
+    mirrors = [FakeMirror(name, seed) for seed, name in enumerate(PROFILES)]
+    bases = [await mirror.start() for mirror in mirrors]
+    names = dict(zip(bases, PROFILES))
+    users = [f"user{i}" for i in range(args.users)]
+    http = HttpClient(limit_per_host=args.users)
+    try:
+        # Было: один nitter.net, без hedging и кэша
+        single = NitterPool(http, bases[:1], hedge_after=3600, cache_ttl=0)
+        single_result = await run(single, users, args.rounds, args.round_gap)
+        single_requests = mirrors[0].stats['requests']
+
+        for mirror in mirrors:
+            mirror.stats = dict.fromkeys(mirror.stats, 0)
+        pool = NitterPool(http, bases, hedge_after=args.hedge_after, cache_ttl=0)
+        pool_result = await run(pool, users, args.rounds, args.round_gap)
+        # С кэшем повторный опрос тех же пользователей в пределах TTL не идёт в сеть
+        requests_before = sum(m.stats['requests'] for m in mirrors)
+        pool.cache_ttl = args.cache_ttl
+        await run(pool, users, 2, 0)
+        cached_round_requests = sum(m.stats['requests'] for m in mirrors) - requests_before
+    finally:
+        await http.close()
+        for mirror in mirrors:
+            await mirror.stop()
+
+    for entry in pool_result['mirrors']:
+        entry['base'] = names[entry['base']]
+    single_result['mirrors'][0]['base'] = names[single_result['mirrors'][0]['base']]
+    print(json.dumps({
+        'users': args.users,
+        'rounds': args.rounds,
+        'single_mirror': {**single_result, 'mirror_requests': single_requests},
+        'pool': {**pool_result,
+                 'mirror_requests': sum(m.stats['requests'] for m in mirrors) - cached_round_requests},
+        'cache': {'ttl': args.cache_ttl, 'two_rounds_requests': cached_round_requests,
+                  'cache_hits': pool.stats['cache_hits']},
+    }, ensure_ascii=False, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--round-gap", type=float, default=0.0)
+    parser.add_argument("--hedge-after", type=float, default=0.3)
+    parser.add_argument("--cache-ttl", type=float, default=60.0,
+                        help="Основные раунды идут без кэша; он проверяется двумя раундами в конце")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)  # Без предупреждений о каждом отказе зеркала
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Опрос источников: общий cron раз в 30 минут против адаптивного PollScheduler
+
+Симуляция на виртуальных часах без сети: у каждого источника пуассоновский
+поток публикаций (частые - раз в минуты, обычные - раз в час, тихие - раз
+в сутки), feed отдаёт последние --feed-size записей. Считается число
+запросов, доля пустых (304), задержка от публикации до получения и
+потерянные записи (вытесненные из feed'а между опросами).
+
+Запуск:
+    python benchmarks/bench_polling.py --sources 200 --days 7
+"""
+
+import argparse
+import bisect
+import heapq
+import json
+import os
+import random
+import statistics
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from poll_scheduler import PollScheduler  # noqa: E402
+
+# (доля источников, средний промежуток между публикациями, сек)
+PROFILES = [(0.2, 300), (0.5, 3600), (0.3, 86400)]
+
+
+def make_feeds(rng: random.Random, count: int, horizon: float) -> list:
+    feeds = []
+    for i in range(count):
+        share_point, gap = rng.random(), None
+        for share, profile_gap in PROFILES:
+            if share_point < share:
+                gap = profile_gap
+                break
+            share_point -= share
+        gap = gap or PROFILES[-1][1]
+        times, t = [], -gap * 20  # История до начала симуляции
+        while t < horizon:
+            t += rng.expovariate(1 / gap)
+            times.append(t)
+        feeds.append({'id': i, 'gap': gap, 'times': times})
+    return feeds
+
+
+def simulate(feeds: list, horizon: float, feed_size: int, next_delay) -> dict:
+    """next_delay(feed, outcome, now) -> через сколько опросить снова"""
+    requests = empty = lost = 0
+    delays = []
+    heap = [(random.uniform(0, 60), feed['id']) for feed in feeds]
+    last_poll = {feed['id']: 0.0 for feed in feeds}
+    while heap:
+        now, feed_id = heapq.heappop(heap)
+        if now > horizon:
+            continue
+        feed = feeds[feed_id]
+        requests += 1
+        end = bisect.bisect_right(feed['times'], now)
+        visible = feed['times'][max(0, end - feed_size):end]
+        new = [t for t in visible if t > last_poll[feed_id]]
+        # Записи, вышедшие и вытесненные из feed'а между опросами
+        lost += end - bisect.bisect_right(feed['times'], last_poll[feed_id]) - len(new)
+        delays += [now - t for t in new]
+        if not new:
+            empty += 1
+        last_poll[feed_id] = now
+        outcome = {'source_id': feed_id, 'error': False, 'not_modified': not new,
+                   'published': len(new), 'entry_times': visible}
+        heapq.heappush(heap, (now + next_delay(feed, outcome, now), feed_id))
+    return {
+        'requests': requests,
+        'empty_share': round(empty / requests, 3),
+        'items': len(delays),
+        'lost_items': lost,
+        'delay_p50_min': round(statistics.median(delays) / 60, 1),
+        'delay_p90_min': round(statistics.quantiles(delays, n=10)[-1] / 60, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sources", type=int, default=200)
+    parser.add_argument("--days", type=float, default=7)
+    parser.add_argument("--feed-size", type=int, default=10)
+    args = parser.parse_args()
+    rng = random.Random(16)
+    horizon = args.days * 86400
+    feeds = make_feeds(rng, args.sources, horizon)
+
+    random.seed(1)
+    fixed = simulate(feeds, horizon, args.feed_size, lambda feed, outcome, now: 1800)
+
+    scheduler = PollScheduler(db=None, run_cycle=None)
+    states = {}
+
+    def adaptive(feed, outcome, now):
+        state = states.setdefault(feed['id'], {'interval': scheduler.default_interval,
+                                               'avg_gap': None})
+        state['interval'] = scheduler.next_interval(state, outcome, now)
+        return state['interval'] * (1 + random.uniform(-scheduler.jitter, scheduler.jitter))
+
+    adaptive_result = simulate(feeds, horizon, args.feed_size, adaptive)
+
+    by_profile = {}
+    for _, gap in PROFILES:
+        intervals = [states[f['id']]['interval'] for f in feeds if f['gap'] == gap]
+        if intervals:
+            by_profile[f"gap_{gap // 60}min"] = round(statistics.median(intervals) / 60, 1)
+
+    print(json.dumps({
+        'sources': args.sources,
+        'days': args.days,
+        'cron_30min': fixed,
+        'adaptive': adaptive_result,
+        'adaptive_median_interval_min': by_profile,
+        'requests_saved': round(1 - adaptive_result['requests'] / fixed['requests'], 3),
+    }, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
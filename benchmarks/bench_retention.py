@@ -0,0 +1,72 @@
+"""
+Retention published_news: размер БД и время запросов до и после
+
+Заполняет published_news N строками за последний год, меряет запросы
+по времени/источнику без индексов и с ними, затем выполняет проход
+RetentionWorker (хранение 90 дней) и выводит его отчёт.
+
+Запуск:
+    python benchmarks/bench_retention.py --rows 1000000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from async_db import AsyncNewsDatabase  # noqa: E402
+from news_bot import NewsDatabase  # noqa: E402
+from retention import RetentionWorker  # noqa: E402
+from url_canon import url_key  # noqa: E402
+
+
+def fill(db_file: str, rows: int):
+    conn = sqlite3.connect(db_file)
+    with conn:
+        conn.executemany(
+            "INSERT INTO published_news (source_id, title, url, url_hash, posted_to_tg) "
+            "VALUES (?, ?, ?, ?, datetime('now', ?))",
+            ((i % 200 + 1, f"Новость {i}", f"https://example.com/news/{i}",
+              url_key(f"https://example.com/news/{i}"),
+              f"-{(rows - i) * 365 * 86400 // rows} seconds") for i in range(rows)),
+        )
+    conn.close()
+
+
+def latency_without_indexes(db: NewsDatabase) -> dict:
+    conn = db._conn()
+    conn.execute("DROP INDEX idx_published_posted")
+    conn.execute("DROP INDEX idx_published_source")
+    latency = db.probe_query_latency()
+    db.init_db()  # Вернуть индексы
+    return latency
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--days", type=float, default=90)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = os.path.join(tmp, "bench.db")
+        sync_db = NewsDatabase(db_file)
+        fill(db_file, args.rows)
+        no_index = latency_without_indexes(sync_db)
+
+        db = AsyncNewsDatabase(sync_db)
+        worker = RetentionWorker(db, retention_days=args.days, batch_size=5000, batch_pause=0,
+                                 count_rows=True)
+        report = await worker.run_once()
+        await db.close()
+
+    print(json.dumps({"rows": args.rows, "latency_ms_no_indexes": no_index, **report},
+                     ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,102 @@
+"""
+Пропускная способность публикации в каналы против фейкового Bot API
+
+Сравнивает прежнюю схему (каналы по очереди + фиксированная пауза после
+статьи) с SendScheduler (параллельно по каналам в пределах лимитов).
+Фейковый сервер возвращает 429 так же, как Telegram.
+
+Запуск:
+    python benchmarks/bench_send.py --articles 40 --channels 20 --chat-rate 120
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fake_telegram import FakeTelegramAPI  # noqa: E402
+from send_scheduler import SendScheduler  # noqa: E402
+
+CHANNEL_BASE = -1001000000000
+
+
+async def legacy(bot, channels, articles, delay):
+    """Как было: каналы по очереди, ошибки только логируются, пауза после статьи"""
+    failed = 0
+    for i in range(articles):
+        for channel_id in channels:
+            try:
+                await bot.send_message(chat_id=channel_id, text=f"Новость {i}")
+            except Exception:
+                failed += 1
+        await asyncio.sleep(delay)
+    return failed
+
+
+async def scheduled(bot, channels, articles, scheduler):
+    failed = 0
+
+    async def send_to(channel_id, text):
+        nonlocal failed
+        try:
+            await scheduler.send(channel_id, lambda: bot.send_message(chat_id=channel_id, text=text))
+        except Exception:
+            failed += 1
+
+    for i in range(articles):
+        await asyncio.gather(*(send_to(channel_id, f"Новость {i}") for channel_id in channels))
+    return failed
+
+
+async def run(mode, args):
+    api = FakeTelegramAPI(global_rate=args.global_rate, chat_per_minute=args.chat_rate,
+                          latency=args.latency)
+    await api.start()
+    bot = api.make_bot()
+    channels = [CHANNEL_BASE - i for i in range(args.channels)]
+    started = time.perf_counter()
+    if mode == "legacy":
+        failed = await legacy(bot, channels, args.articles, args.legacy_delay)
+        extra = {}
+    else:
+        scheduler = SendScheduler(global_rate=args.global_rate,
+                                  per_chat_rate=args.chat_rate / 60,
+                                  per_chat_burst=args.chat_burst)
+        failed = await scheduled(bot, channels, args.articles, scheduler)
+        extra = {"scheduler": scheduler.get_stats()}
+    elapsed = time.perf_counter() - started
+    await bot.session.close()
+    await api.stop()
+    total = args.articles * args.channels
+    return {
+        "mode": mode,
+        "messages": total,
+        "delivered": api.stats['sent'],
+        "lost": failed,
+        "http_429": api.stats['rate_limited'],
+        "elapsed_s": round(elapsed, 2),
+        "delivered_per_s": round(api.stats['sent'] / elapsed, 1),
+        **extra,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--articles", type=int, default=40)
+    parser.add_argument("--channels", type=int, default=20)
+    parser.add_argument("--global-rate", type=float, default=30)
+    parser.add_argument("--chat-rate", type=float, default=120, help="Сообщений в минуту на чат")
+    parser.add_argument("--chat-burst", type=float, default=3)
+    parser.add_argument("--latency", type=float, default=0.01, help="Задержка ответа API, сек")
+    parser.add_argument("--legacy-delay", type=float, default=0.5)
+    args = parser.parse_args()
+
+    results = [await run(mode, args) for mode in ("legacy", "scheduler")]
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
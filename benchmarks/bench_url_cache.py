@@ -0,0 +1,81 @@
+"""
+Кэш опубликованных URL: загрузка при старте и качество фильтра
+
+Заполняет published_news N строками (по умолчанию 5M), строит Bloom фильтр
+так же, как при старте бота, и меряет время загрузки, память, реальную долю
+ложных срабатываний и скорость проверок.
+
+Запуск:
+    python benchmarks/bench_url_cache.py --rows 5000000
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from news_bot import NewsDatabase  # noqa: E402
+from url_cache import PublishedUrlCache  # noqa: E402
+from url_canon import url_key  # noqa: E402
+
+
+def fill(db_file: str, rows: int):
+    conn = sqlite3.connect(db_file)
+    with conn:
+        conn.executemany(
+            "INSERT INTO published_news (source_id, title, url, url_hash) VALUES (?, ?, ?, ?)",
+            ((i % 200, "t", f"https://example.com/news/{i}",
+              url_key(f"https://example.com/news/{i}")) for i in range(rows)),
+        )
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    parser.add_argument("--probes", type=int, default=100_000)
+    parser.add_argument("--fp-rate", type=float, default=0.01)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = os.path.join(tmp, "bench.db")
+        db = NewsDatabase(db_file)
+        fill(db_file, args.rows)
+
+        cache = PublishedUrlCache(fp_rate=args.fp_rate)
+        cache.begin_load()
+        started = time.perf_counter()
+        bloom = cache.build_bloom(db.iter_published_keys(), db.count_published(), args.fp_rate)
+        cache.finish_load(bloom, time.perf_counter() - started)
+
+        # Проверки новых URL: идеальный ответ - "нет" без похода в БД
+        fresh = [url_key(f"https://example.com/fresh/{i}") for i in range(args.probes)]
+        started = time.perf_counter()
+        _, _, unknown = cache.split(fresh)
+        split_s = time.perf_counter() - started
+        cache.record_db_result(unknown, db.get_published_keys(unknown))
+
+        # Повторная проверка тех же URL отвечается из LRU/фильтра
+        cache.split(fresh[:cache.lru_size])
+
+        # Для сравнения - те же проверки напрямую в SQLite
+        started = time.perf_counter()
+        db.get_published_keys(fresh)
+        sqlite_s = time.perf_counter() - started
+        db.close()
+
+    stats = cache.get_stats()
+    stats.update({
+        "rows": args.rows,
+        "check_us_cache": round(split_s / args.probes * 1e6, 2),
+        "check_us_sqlite_batched": round(sqlite_s / args.probes * 1e6, 2),
+    })
+    print(json.dumps(stats, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
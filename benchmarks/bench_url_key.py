@@ -0,0 +1,122 @@
+"""
+Ключ дедупликации: UNIQUE(url) по тексту против 64-битного url_hash
+
+Создаёт published_news в старой схеме (UNIQUE по полному URL) на N строк,
+меряет размер индекса и время проверок, затем открывает ту же БД через
+NewsDatabase (миграция на url_hash) и меряет то же самое после.
+
+Запуск:
+    python benchmarks/bench_url_key.py --rows 1000000
+"""
+
+import argparse
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from news_bot import NewsDatabase  # noqa: E402
+from url_canon import url_key  # noqa: E402
+
+OLD_SCHEMA = '''
+    CREATE TABLE published_news (
+        id INTEGER PRIMARY KEY,
+        source_id INTEGER,
+        title TEXT,
+        url TEXT UNIQUE,
+        published_at TIMESTAMP,
+        posted_to_tg TIMESTAMP
+    )
+'''
+
+
+def make_url(i: int) -> str:
+    # Типичная ссылка из RSS: длинный путь и utm-метки
+    return (f"https://habr.com/ru/companies/company{i % 500}/articles/{800000 + i}/"
+            f"?utm_source=habrahabr&utm_medium=rss&utm_campaign={800000 + i}")
+
+
+def index_bytes(conn: sqlite3.Connection) -> dict:
+    return {name: size for name, size in conn.execute(
+        "SELECT name, SUM(pgsize) FROM dbstat GROUP BY name")}
+
+
+def time_lookups(conn: sqlite3.Connection, sql: str, values: list, batch: int = 500) -> dict:
+    started = time.perf_counter()
+    for value in values:
+        conn.execute(sql.format("?"), (value,)).fetchall()
+    single_s = time.perf_counter() - started
+    started = time.perf_counter()
+    for i in range(0, len(values), batch):
+        chunk = values[i:i + batch]
+        conn.execute(sql.format(",".join("?" * len(chunk))), chunk).fetchall()
+    batch_s = time.perf_counter() - started
+    return {"single_us": round(single_s / len(values) * 1e6, 2),
+            "batched_us": round(batch_s / len(values) * 1e6, 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--probes", type=int, default=20_000)
+    args = parser.parse_args()
+    rng = random.Random(7)
+
+    # Половина проверок - уже опубликованные ссылки, половина - новые
+    probes = ([make_url(rng.randrange(args.rows)) for _ in range(args.probes // 2)]
+              + [make_url(args.rows + i) for i in range(args.probes // 2)])
+    rng.shuffle(probes)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = os.path.join(tmp, "bench.db")
+        conn = sqlite3.connect(db_file)
+        conn.execute(OLD_SCHEMA)
+        with conn:
+            conn.executemany(
+                "INSERT INTO published_news (source_id, title, url) VALUES (?, ?, ?)",
+                ((i % 200, f"Новость {i}", make_url(i)) for i in range(args.rows)))
+        conn.execute("VACUUM")
+        before_sizes = index_bytes(conn)
+        before = time_lookups(conn, "SELECT url FROM published_news WHERE url IN ({})", probes)
+        before_file = os.path.getsize(db_file)
+        conn.close()
+
+        started = time.perf_counter()
+        db = NewsDatabase(db_file)
+        migrate_s = time.perf_counter() - started
+        conn = db._conn()
+        conn.execute("VACUUM")
+        after_sizes = index_bytes(conn)
+        started = time.perf_counter()
+        keys = [url_key(url) for url in probes]
+        key_us = (time.perf_counter() - started) / len(probes) * 1e6
+        after = time_lookups(conn, "SELECT url_hash FROM published_news WHERE url_hash IN ({})",
+                             keys)
+        after_file = os.path.getsize(db_file)
+        found = len(db.get_published_keys(keys))
+        db.close()
+
+    print(json.dumps({
+        "rows": args.rows,
+        "before": {
+            "index_mb": round(before_sizes.get("sqlite_autoindex_published_news_1", 0) / 2 ** 20, 1),
+            "file_mb": round(before_file / 2 ** 20, 1),
+            "lookup": before,
+        },
+        "after": {
+            "index_mb": round(after_sizes.get("idx_published_url_hash", 0) / 2 ** 20, 1),
+            "file_mb": round(after_file / 2 ** 20, 1),
+            "lookup": after,
+            "url_key_us": round(key_us, 2),
+            "migrate_s": round(migrate_s, 2),
+        },
+        "found": found,
+    }, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
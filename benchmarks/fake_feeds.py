@@ -0,0 +1,117 @@
+"""
+Локальный сервер синтетических RSS feed'ов для замеров
+
+N feed'ов по адресам /feed/{n}: задержка ответа с разбросом, доля ошибок 503,
+размер (число записей и длина анонса), ETag/Last-Modified и ответ 304 на
+условный GET - всё настраивается. advance() публикует новые записи в части
+feed'ов, как это происходит между опросами. Тексты случайные (с seed),
+чтобы детектор перепечаток не склеивал записи разных feed'ов.
+"""
+
+import asyncio
+import random
+from email.utils import formatdate
+from typing import Dict, List, Optional
+
+from aiohttp import web
+
+WORDS = [f"{stem}{suffix}" for stem in (
+    'релиз', 'ядро', 'сеть', 'токен', 'модель', 'патч', 'сервер', 'кластер', 'биржа', 'ключ',
+    'протокол', 'данные', 'поиск', 'браузер', 'шифр', 'облако', 'датчик', 'рынок', 'чип', 'агент',
+) for suffix in ('', 'а', 'ы', 'ов', 'ом', 'ами', 'ах', 'у', 'е', 'ой')]
+
+
+class FakeFeedServer:
+    def __init__(self, feeds: int = 50, entries: int = 20, summary_bytes: int = 300,
+                 latency: float = 0.05, jitter: float = 0.5, error_rate: float = 0.0,
+                 etag: bool = True, seed: int = 1):
+        self.feeds = feeds
+        self.entries = entries  # Записей в теле feed'а (самые новые)
+        self.summary_bytes = summary_bytes
+        self.latency = latency
+        self.jitter = jitter  # Разброс задержки, доля: latency * (1 ± jitter)
+        self.error_rate = error_rate
+        self.etag = etag  # False - без ETag/Last-Modified (только хэш тела на стороне бота)
+        self.stats = {'requests': 0, 'not_modified': 0, 'errors': 0, 'bytes': 0}
+        self._rng = random.Random(seed)
+        self._items: List[List[str]] = [[] for _ in range(feeds)]  # Новые первыми
+        self._versions = [0] * feeds
+        self._bodies: Dict[int, bytes] = {}
+        self._serial = 0
+        self._time = 1704067200  # Дата первой записи
+        self._runner: Optional[web.AppRunner] = None
+        self.base_url = ""
+        for n in range(feeds):
+            self._publish(n, entries)
+
+    def _text(self, words: int) -> str:
+        return ' '.join(self._rng.choice(WORDS) for _ in range(words))
+
+    def _item(self, n: int) -> str:
+        self._serial += 1
+        self._time += 60
+        link = f"https://feed{n}.example.com/news/{self._serial}"
+        summary = self._text(8)
+        summary = (summary + ' ') * max(1, self.summary_bytes // (len(summary.encode()) + 1))
+        return (f"<item><title>{self._text(8).capitalize()} {self._serial}</title>"
+                f"<link>{link}</link><guid>{link}</guid>"
+                f"<pubDate>{formatdate(self._time, usegmt=True)}</pubDate>"
+                f"<description>{summary.strip()}</description></item>")
+
+    def _publish(self, n: int, count: int):
+        self._items[n][:0] = [self._item(n) for _ in range(count)][::-1]
+        del self._items[n][self.entries:]
+        self._versions[n] += 1
+        self._bodies.pop(n, None)
+
+    def advance(self, share: float = 0.2, new_entries: int = 3) -> int:
+        """Новые записи в доле share feed'ов; возвращает число новых записей"""
+        updated = self._rng.sample(range(self.feeds), round(self.feeds * share))
+        for n in updated:
+            self._publish(n, new_entries)
+        return len(updated) * new_entries
+
+    def _body(self, n: int) -> bytes:
+        if n not in self._bodies:
+            self._bodies[n] = (
+                '<?xml version="1.0" encoding="utf-8"?><rss version="2.0"><channel>'
+                f'<title>Feed {n}</title>{"".join(self._items[n])}</channel></rss>'
+            ).encode('utf-8')
+        return self._bodies[n]
+
+    async def handle(self, request: web.Request):
+        self.stats['requests'] += 1
+        n = int(request.match_info['n'])
+        if self.latency:
+            await asyncio.sleep(self.latency * self._rng.uniform(1 - self.jitter, 1 + self.jitter))
+        if self._rng.random() < self.error_rate:
+            self.stats['errors'] += 1
+            return web.Response(status=503, text="Service Unavailable")
+        headers = {}
+        if self.etag:
+            tag = f'"{n}-{self._versions[n]}"'
+            if request.headers.get('If-None-Match') == tag:
+                self.stats['not_modified'] += 1
+                return web.Response(status=304, headers={'ETag': tag})
+            headers['ETag'] = tag
+        body = self._body(n)
+        self.stats['bytes'] += len(body)
+        return web.Response(body=body, headers=headers, content_type='application/rss+xml')
+
+    def urls(self) -> List[str]:
+        return [f"{self.base_url}/feed/{n}" for n in range(self.feeds)]
+
+    async def start(self) -> str:
+        app = web.Application()
+        app.router.add_get('/feed/{n}', self.handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://127.0.0.1:{port}"
+        return self.base_url
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
@@ -0,0 +1,102 @@
+"""
+Локальный фейковый Telegram Bot API для замеров
+
+Отвечает на sendMessage (и пару служебных методов) и, как настоящий API,
+возвращает 429 с retry_after при превышении общего лимита бота или лимита чата.
+"""
+
+import asyncio
+import time
+from collections import defaultdict, deque
+from typing import Dict, Optional
+
+from aiohttp import web
+
+
+class FakeTelegramAPI:
+    def __init__(self, global_rate: float = 30, chat_per_minute: float = 20,
+                 latency: float = 0.0, retry_after: int = 1):
+        self.global_rate = global_rate
+        self.chat_per_minute = chat_per_minute
+        self.latency = latency
+        self.retry_after = retry_after
+        self.stats = {'requests': 0, 'sent': 0, 'rate_limited': 0}
+        self.messages = defaultdict(list)  # chat_id -> [text, ...]
+        self._global = deque()
+        self._chats: Dict[str, deque] = defaultdict(deque)
+        self._message_id = 0
+        self._runner: Optional[web.AppRunner] = None
+        self.base_url = ""
+
+    @staticmethod
+    def _over_limit(window: deque, limit: float, period: float, now: float) -> bool:
+        while window and now - window[0] >= period:
+            window.popleft()
+        return len(window) >= limit
+
+    def _too_many(self):
+        self.stats['rate_limited'] += 1
+        return web.json_response({
+            "ok": False,
+            "error_code": 429,
+            "description": f"Too Many Requests: retry after {self.retry_after}",
+            "parameters": {"retry_after": self.retry_after},
+        }, status=429)
+
+    async def handle(self, request: web.Request):
+        self.stats['requests'] += 1
+        method = request.match_info['method']
+        data = dict(await request.post()) if request.can_read_body else {}
+        if request.content_type == 'application/json':
+            data = await request.json()
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if method == 'getMe':
+            return web.json_response({"ok": True, "result": {
+                "id": 1, "is_bot": True, "first_name": "Fake", "username": "fake_bot"}})
+        if method != 'sendMessage':
+            return web.json_response({"ok": True, "result": True})
+
+        chat_id = str(data.get('chat_id'))
+        now = time.monotonic()
+        if self._over_limit(self._global, self.global_rate, 1.0, now):
+            return self._too_many()
+        if self._over_limit(self._chats[chat_id], self.chat_per_minute, 60.0, now):
+            return self._too_many()
+        self._global.append(now)
+        self._chats[chat_id].append(now)
+
+        self._message_id += 1
+        self.stats['sent'] += 1
+        self.messages[chat_id].append(data.get('text', ''))
+        return web.json_response({"ok": True, "result": {
+            "message_id": self._message_id,
+            "date": int(time.time()),
+            "chat": {"id": int(chat_id), "type": "channel", "title": "Fake"},
+            "text": data.get('text', ''),
+        }})
+
+    async def start(self) -> str:
+        app = web.Application()
+        app.router.add_post('/bot{token}/{method}', self.handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://127.0.0.1:{port}"
+        return self.base_url
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    def make_bot(self, token: str = "123456:FAKE"):
+        """aiogram Bot, направленный на этот сервер"""
+        from aiogram import Bot
+        from aiogram.client.session.aiohttp import AiohttpSession
+        from aiogram.client.telegram import TelegramAPIServer
+
+        session = AiohttpSession(api=TelegramAPIServer.from_base(self.base_url))
+        return Bot(token=token, session=session)
@@ -0,0 +1,201 @@
+"""
+Пакетная категоризация новостей
+Словарь "термин -> категория" хранится как отсортированные 64-битные хеши
+терминов и разреженная матрица (хеш -> веса категорий). Слова всей пачки
+статей переводятся в матрицу кодов символов, хеши слов, их префиксов
+и фраз считаются в NumPy разом, после чего пачка умножается на матрицу
+целиком - без цикла по статьям, категориям и ключевым словам.
+Совпадения - целыми словами, как в keyword_matcher: "крипт*" - слова с этим
+началом, "машинное обучение" - фраза слов, разделённых только пробелами
+("машинное, обучение" и "open-source" фразами "машинное обучение" и
+"open source" не считаются). Термины со знаками внутри ("c++", "open-source")
+не поддерживаются. Отличие от keyword_matcher - только у слов длиннее
+WORD_WIDTH символов.
+"""
+
+import json
+import re
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from article import Article, article_text
+from keyword_matcher import normalize
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+# Слово и первый символ после пробелов за ним: пусто - дальше знак или конец текста
+_TOKEN_RE = re.compile(r"(\w+)\s*(?=(\w?))", re.UNICODE)
+
+WORD_WIDTH = 24  # Символов слова в хеше; длиннее - различаются только первые 24
+
+# Коэффициенты полиномиального хеша (по одному на позицию символа) и соли
+_rng = np.random.default_rng(0x5EED)
+_COEFFS = _rng.integers(1, 2 ** 63, WORD_WIDTH, dtype=np.uint64) | np.uint64(1)
+_PREFIX_SALT = _rng.integers(1, 2 ** 63, WORD_WIDTH + 1, dtype=np.uint64)
+_PHRASE_MUL = np.uint64(0x9E3779B97F4A7C15)
+
+FILTER_BITS = 20  # Размер предфильтра словаря (1 МБ)
+_FILTER_MASK = np.uint64((1 << FILTER_BITS) - 1)
+
+# Категории по умолчанию; свои - JSON файлом в CATEGORIES_FILE
+DEFAULT_CATEGORIES: Dict[str, List[str]] = {
+    'security': ['уязвимост*', 'безопасност*', 'взлом*', 'хакер*', 'утечк*', 'cve', 'exploit*',
+                 'ransomware', 'фишинг*', 'малвар*'],
+    'crypto': ['криптовалют*', 'блокчейн*', 'биткоин*', 'bitcoin', 'btc', 'ethereum', 'эфириум*',
+               'nft', 'defi', 'stablecoin*', 'стейблкоин*', 'майнинг*'],
+    'ai': ['ии', 'ai', 'нейросет*', 'машинное обучение', 'machine learning', 'chatgpt', 'gpt',
+           'llm', 'openai', 'искусственный интеллект', 'deep learning'],
+    'dev': ['python', 'javascript', 'rust', 'golang', 'kubernetes', 'docker', 'linux',
+            'разработчик*', 'программист*', 'фреймворк*', 'open source', 'github'],
+    'business': ['выручк*', 'инвестиц*', 'ipo', 'акци*', 'рынок', 'рынке', 'сделк*', 'стартап*',
+                 'капитализац*', 'прибыл*'],
+}
+
+
+def load_categories(path: Optional[str]) -> Dict[str, List[str]]:
+    """Словарь категорий из JSON файла {категория: [термины]} или встроенный"""
+    if not path:
+        return DEFAULT_CATEGORIES
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _char_codes(words: List[str]) -> np.ndarray:
+    """Слова -> матрица (слова x WORD_WIDTH) кодов символов, хвост нулями"""
+    if not words:
+        return np.zeros((0, WORD_WIDTH), dtype=np.uint32)
+    return np.array(words, dtype=f'<U{WORD_WIDTH}').view(np.uint32).reshape(-1, WORD_WIDTH)
+
+
+def _prefix_hashes(codes: np.ndarray) -> np.ndarray:
+    """Хеши всех префиксов: столбец i - хеш первых i+1 символов (последний - всё слово)"""
+    with np.errstate(over='ignore'):
+        return np.cumsum(codes.astype(np.uint64) * _COEFFS, axis=1, dtype=np.uint64)
+
+
+def _phrase_hashes(word_hashes: np.ndarray, n: int) -> np.ndarray:
+    """Хеши фраз из n подряд идущих слов (позиция i - фраза, начинающаяся с i-го слова)"""
+    with np.errstate(over='ignore'):
+        hashes = word_hashes[:len(word_hashes) - n + 1].copy()
+        for offset in range(1, n):
+            hashes = hashes * _PHRASE_MUL + word_hashes[offset:len(word_hashes) - n + 1 + offset]
+    return hashes
+
+
+class BatchCategorizer:
+    """Категоризатор пачек статей на хешированном словаре"""
+
+    def __init__(self, categories: Dict[str, List[str]], min_score: float = 1.0,
+                 default: Optional[str] = 'general'):
+        self.categories = list(categories)
+        self.min_score = min_score
+        self.default = default
+        self.prefix_lengths: List[int] = []  # Длины префиксов из терминов "слово*"
+        self.phrase_lengths: List[int] = []  # Число слов во фразах
+
+        term_hashes, term_columns = [], []
+        for column, terms in enumerate(categories.values()):
+            for term in terms:
+                term_hashes.append(self._term_hash(normalize(term)))
+                term_columns.append(column)
+
+        # Разреженная матрица в сжатом виде: строка на каждый различный хеш термина
+        self._hashes, rows = np.unique(np.array(term_hashes, dtype=np.uint64), return_inverse=True)
+        self._matrix = np.zeros((len(self._hashes), len(self.categories)), np.float32)
+        self._matrix[rows.reshape(-1), term_columns] = 1.0
+        self.terms = len(self._hashes)
+        # Битовая карта младших бит хешей: большинство слов отсеивается без поиска
+        self._filter = np.zeros(1 << FILTER_BITS, dtype=bool)
+        self._filter[self._hashes & _FILTER_MASK] = True
+
+    def _term_hash(self, term: str) -> int:
+        """Хеш термина словаря - тем же способом, что и у слов статей"""
+        prefix = term.endswith('*')
+        words = _WORD_RE.findall(term.rstrip('*'))
+        if not words:
+            raise ValueError(f"Пустой термин категории: {term!r}")
+        if ' '.join(words) != term.rstrip('*'):
+            raise ValueError(f"Знаки внутри термина не поддерживаются: {term!r}")
+        hashes = _prefix_hashes(_char_codes(words))
+        if prefix:
+            length = min(len(words[0]), WORD_WIDTH)
+            if len(words) > 1:
+                raise ValueError(f"Префикс поддерживается только для одного слова: {term!r}")
+            if length not in self.prefix_lengths:
+                self.prefix_lengths.append(length)
+            with np.errstate(over='ignore'):
+                return int(hashes[0, length - 1] + _PREFIX_SALT[length])
+        if len(words) > 1:
+            if len(words) not in self.phrase_lengths:
+                self.phrase_lengths.append(len(words))
+            return int(_phrase_hashes(hashes[:, -1], len(words))[0])
+        return int(hashes[0, -1])
+
+    def scores(self, articles: List[Dict]) -> np.ndarray:
+        """Матрица (статьи x категории): сколько терминов категории в статье"""
+        # Нормализация одной строкой на всю пачку (как normalize, пробелы не важны)
+        texts = '\x00'.join(map(article_text, articles)).casefold().replace('ё', 'е')
+        words, joined, lengths = [], [], []
+        for text in texts.split('\x00'):
+            tokens = _TOKEN_RE.findall(text)
+            words += [word for word, _ in tokens]
+            joined += [bool(following) for _, following in tokens]
+            lengths.append(len(tokens))
+        doc_index = np.repeat(np.arange(len(articles)), lengths)
+        # joined[i] - между словом i и i+1 только пробелы; у последнего слова
+        # статьи всегда False, так что фраза не переходит в соседнюю статью
+        joined = np.array(joined, dtype=bool)
+        codes = _char_codes(words)
+        prefixes = _prefix_hashes(codes)
+        word_hashes = prefixes[:, -1]
+
+        # Признаки пачки: слова, префиксы нужных длин, фразы без знаков между словами
+        features, feature_docs = [word_hashes], [doc_index]
+        if self.prefix_lengths:
+            columns = np.array(self.prefix_lengths) - 1
+            with np.errstate(over='ignore'):
+                prefix_hashes = prefixes[:, columns] + _PREFIX_SALT[columns + 1]
+            long_enough = codes[:, columns] != 0  # Слово не короче префикса
+            features.append(prefix_hashes[long_enough])
+            feature_docs.append(np.broadcast_to(doc_index[:, None], long_enough.shape)[long_enough])
+        for n in self.phrase_lengths:
+            if len(words) < n:
+                continue
+            chained = joined[:len(words) - n + 1].copy()
+            for offset in range(1, n - 1):
+                chained &= joined[offset:len(words) - n + 1 + offset]
+            features.append(_phrase_hashes(word_hashes, n)[chained])
+            feature_docs.append(doc_index[:len(words) - n + 1][chained])
+        features = np.concatenate(features)
+        docs = np.concatenate(feature_docs)
+
+        # Предфильтр, затем точная проверка двоичным поиском; разреженное
+        # произведение - только по признакам, попавшим в словарь
+        candidates = self._filter[features & _FILTER_MASK]
+        features, docs = features[candidates], docs[candidates]
+        rows = np.searchsorted(self._hashes, features)
+        rows[rows == self.terms] = 0
+        known = self._hashes[rows] == features if self.terms else rows < 0
+        docs, weights = docs[known], self._matrix[rows[known]]
+        result = np.empty((len(articles), len(self.categories)), np.float32)
+        for column in range(len(self.categories)):
+            result[:, column] = np.bincount(docs, weights=weights[:, column],
+                                            minlength=len(articles))
+        return result
+
+    def categorize(self, articles: List[Dict]) -> List[List[str]]:
+        """Категории каждой статьи пачки (по убыванию веса)"""
+        if not articles:
+            return []
+        scores = self.scores(articles)
+        order = np.argsort(-scores, axis=1, kind='stable')
+        result = []
+        for doc_scores, doc_order in zip(scores, order):
+            labels = [self.categories[c] for c in doc_order if doc_scores[c] >= self.min_score]
+            result.append(labels or ([self.default] if self.default else []))
+        return result
+
+    def annotate(self, articles: List[Article]) -> List[Article]:
+        """Статьи с вычисленными категориями после тегов feed'а (Article неизменяема - новые)"""
+        return [article.with_categories(labels)
+                for article, labels in zip(articles, self.categorize(articles))]
@@ -0,0 +1,275 @@
+"""
+Потоковый разбор RSS/Atom для больших feed'ов
+feedparser строит весь документ, даже если нужны несколько новых записей.
+StreamingFeedParser получает тело кусками (expat без дерева элементов),
+отдаёт записи по мере закрытия <item>/<entry> и сообщает done, как только
+дошёл до watermark прошлого опроса или набрал лимит - остаток тела можно
+не скачивать. В памяти держится только текущая запись.
+"""
+
+import calendar
+import html.entities
+import logging
+import time
+from collections import deque
+from datetime import datetime, timezone
+from email.utils import parsedate_tz, mktime_tz
+from typing import Dict, Iterable, Iterator, List, Optional
+from xml.parsers import expat
+
+from article import Article
+from nitter_pool import canonical_tweet_link
+from url_canon import url_key
+
+logger = logging.getLogger(__name__)
+
+WATERMARK_FIELDS = ('last_guid', 'last_link_hash', 'last_published_ts')
+
+# HTML-сущности (&nbsp; и т.п.) без DTD - частая ошибка feed'ов, feedparser их прощает
+HTML_ENTITIES = {name: chr(code) for name, code in html.entities.name2codepoint.items()}
+
+ENTRY_TAGS = {'item', 'entry'}
+CONTAINER_TAGS = {'channel', 'feed', 'RDF'}
+DATE_FIELDS = ('pubDate', 'published', 'updated', 'date', 'issued', 'modified')
+SUMMARY_FIELDS = ('description', 'summary', 'content')
+
+
+class FeedTooLarge(Exception):
+    """Тело feed'а больше допустимого размера"""
+
+
+def is_seen(watermark: Dict, guid: str, key: int, ts: Optional[int]) -> bool:
+    """Запись не новее watermark: та же запись (guid или ссылка) или старше по дате"""
+    if guid == watermark.get('last_guid') or key == watermark.get('last_link_hash'):
+        return True
+    return bool(ts and watermark.get('last_published_ts') and ts < watermark['last_published_ts'])
+
+
+def parse_date(text: str) -> Optional[int]:
+    """Дата RFC 822 (RSS) или ISO 8601 (Atom, dc:date) -> UTC, сек"""
+    text = text.strip()
+    if not text:
+        return None
+    parsed = parsedate_tz(text)
+    if parsed is not None:
+        return mktime_tz(parsed)
+    try:
+        value = datetime.fromisoformat(text.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return calendar.timegm(value.utctimetuple())
+
+
+def _local(tag: str) -> str:
+    """Имя элемента без пространства имён ('http://www.w3.org/2005/Atom link' -> 'link')"""
+    return tag.rsplit(' ', 1)[-1]
+
+
+class StreamingFeedParser:
+    """
+    Инкрементальный разбор одного feed'а.
+    feed(chunk) возвращает записи, готовые к этому моменту (от новых к старым),
+    close() - оставшиеся (Article, как у _parse_feed в news_bot.py).
+    Feed от старых к новым (по датам первых записей) дочитывается до конца:
+    хранятся только limit самых новых.
+    """
+
+    def __init__(self, watermark: Optional[Dict] = None, limit: int = 100,
+                 initial_limit: int = 10, source_name: Optional[str] = None,
+                 tweet_links: bool = False):
+        self.watermark = watermark
+        self.limit = limit if watermark else initial_limit
+        self.initial_limit = initial_limit
+        self.source_name = source_name
+        self.tweet_links = tweet_links
+        self.done = False  # Дальше читать незачем
+        self.truncated = False  # Новых записей больше limit
+        self.new_watermark: Optional[Dict] = None
+        self.entry_times: deque = deque(maxlen=initial_limit)
+        self.feed_title: Optional[str] = None
+        self.ascending: Optional[bool] = None  # Порядок записей, пока не ясен - None
+        self.entries_seen = 0
+        self._held: List[Dict] = []  # Записи до выяснения порядка
+        self._newest: deque = deque(maxlen=self.limit)  # Для feed'а от старых к новым
+        self._emitted = 0
+        self._first_ts: Optional[int] = None
+        self._stack: List[str] = []
+        self._entry: Optional[Dict] = None
+        self._text: List[str] = []
+
+        self._parser = expat.ParserCreate(namespace_separator=' ')
+        self._parser.buffer_text = True
+        self._parser.UseForeignDTD(True)
+        self._parser.SetParamEntityParsing(expat.XML_PARAM_ENTITY_PARSING_NEVER)
+        self._parser.StartElementHandler = self._start
+        self._parser.EndElementHandler = self._end
+        self._parser.CharacterDataHandler = self._data
+        self._parser.SkippedEntityHandler = self._entity
+        self._ready: List[Dict] = []
+
+    # ---------- expat ----------
+
+    def _start(self, tag: str, attrs: Dict):
+        name = _local(tag)
+        self._stack.append(name)
+        self._text = []
+        if name in ENTRY_TAGS:
+            self._entry = {'fields': {}, 'link': None, 'categories': []}
+        elif self._entry is not None:
+            if name == 'link' and 'href' in attrs:
+                # Atom: <link rel="alternate" href="..."/>
+                if attrs.get('rel', 'alternate') == 'alternate' and not self._entry['link']:
+                    self._entry['link'] = attrs['href']
+            elif name == 'category' and attrs.get('term'):
+                self._entry['categories'].append(attrs['term'])
+
+    def _data(self, text: str):
+        self._text.append(text)
+
+    def _entity(self, name: str, is_parameter: bool):
+        if not is_parameter:
+            self._text.append(HTML_ENTITIES.get(name, f'&{name};'))
+
+    def _end(self, tag: str):
+        name = self._stack.pop()
+        text = ''.join(self._text).strip()
+        self._text = []
+        entry = self._entry
+        if name in ENTRY_TAGS and entry is not None:
+            self._entry = None
+            self._finish(entry)
+        elif entry is not None and self._stack and self._stack[-1] in ENTRY_TAGS:
+            if name == 'link':
+                if text and not entry['link']:
+                    entry['link'] = text
+            elif name == 'category':
+                if text:
+                    entry['categories'].append(text)
+            elif text and name not in entry['fields']:
+                entry['fields'][name] = text
+        elif name == 'title' and self._stack and self._stack[-1] in CONTAINER_TAGS:
+            self.feed_title = text
+
+    # ---------- записи ----------
+
+    def _article(self, entry: Dict, link: str, key: int, ts: Optional[int]) -> Article:
+        fields = entry['fields']
+        summary = next((fields[f] for f in SUMMARY_FIELDS if f in fields), '')
+        return Article(
+            title=fields.get('title', 'No title'),
+            link=link,
+            url_key=key,
+            categories=entry['categories'],
+            summary=summary[:500],
+            published=next((fields[f] for f in DATE_FIELDS if f in fields), ''),
+            published_ts=ts,
+            source=self.source_name or self.feed_title or 'Unknown',
+        )
+
+    def _finish(self, entry: Dict):
+        if self.done:
+            return
+        self.entries_seen += 1
+        fields = entry['fields']
+        link = entry['link'] or ''
+        if self.tweet_links:
+            link = canonical_tweet_link(link)
+        key = url_key(link)
+        guid = link if self.tweet_links else fields.get('guid') or fields.get('id') or link
+        ts = next((t for t in (parse_date(fields[f]) for f in DATE_FIELDS if f in fields) if t), None)
+
+        if self.ascending is None and ts:
+            if self._first_ts is None:
+                self._first_ts = ts
+            elif ts != self._first_ts:
+                self.ascending = ts > self._first_ts
+        if ts:
+            if self.ascending:
+                self.entry_times.append(ts)
+            elif len(self.entry_times) < self.initial_limit:
+                self.entry_times.append(ts)
+        watermark = {'last_guid': guid, 'last_link_hash': key,
+                     'last_published_ts': min(ts, time.time()) if ts else None}
+        if self.new_watermark is None or self.ascending:
+            self.new_watermark = watermark
+
+        seen = bool(self.watermark) and is_seen(self.watermark, guid, key, ts)
+        self._held.append({'article': None if seen else self._article(entry, link, key, ts),
+                           'seen': seen})
+        if self.ascending is None and len(self._held) < 2:
+            return  # Порядок ещё не ясен
+        self._release()
+
+    def _release(self):
+        """Разобрать отложенные записи, когда порядок известен (или feed кончился)"""
+        held, self._held = self._held, []
+        if self.ascending:
+            # Старые -> новые: новые записи в конце, дочитываем до конца
+            for item in held:
+                if item['seen']:
+                    continue
+                if len(self._newest) == self._newest.maxlen:
+                    self.truncated = bool(self.watermark)
+                self._newest.append(item['article'])
+            return
+        for item in held:
+            if item['seen']:
+                self.done = True
+                return
+            if self._emitted >= self.limit:
+                self.truncated = bool(self.watermark)
+                self.done = True
+                return
+            self._emitted += 1
+            self._ready.append(item['article'])
+
+    # ---------- API ----------
+
+    def feed(self, chunk: bytes) -> List[Article]:
+        """Передать очередной кусок тела; вернуть записи, готовые к этому моменту"""
+        if not self.done:
+            try:
+                self._parser.Parse(chunk, False)
+            except expat.ExpatError as e:
+                raise ValueError(f"некорректный XML: {e}") from None
+        ready, self._ready = self._ready, []
+        return ready
+
+    def close(self) -> List[Article]:
+        """Конец тела (или досрочная остановка): оставшиеся записи"""
+        if not self.done:
+            try:
+                self._parser.Parse(b'', True)
+            except expat.ExpatError as e:
+                raise ValueError(f"некорректный XML: {e}") from None
+        if self._held:
+            self._release()
+        ready, self._ready = self._ready, []
+        if self.ascending:
+            ready += reversed(self._newest)
+            self._newest.clear()
+        if self.truncated:
+            logger.warning(f"В feed'е больше {self.limit} новых записей, старые пропущены")
+        return ready
+
+    def result(self, articles: List[Article]) -> Dict:
+        """Итог в формате _parse_feed: {'articles', 'entry_times', 'watermark', 'truncated'}"""
+        times = list(self.entry_times)
+        return {
+            'articles': articles,
+            'entry_times': times[::-1] if self.ascending else times,
+            'watermark': self.new_watermark,
+            'truncated': self.truncated,
+        }
+
+
+def iter_feed(chunks: Iterable[bytes], **kwargs) -> Iterator[Article]:
+    """Записи feed'а из итератора кусков тела; чтение прекращается на done"""
+    parser = StreamingFeedParser(**kwargs)
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+        if parser.done:
+            break
+    yield from parser.close()
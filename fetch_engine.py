@@ -0,0 +1,235 @@
+"""
+Движок параллельного получения новостей
+Общий для ручной команды /fetch и планировщика из advanced_bot.py;
+FetchCoordinator не даёт циклам пересекаться
+"""
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+from urllib.parse import urlparse
+
+from metrics import MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+
+class FetchEngine:
+    """Параллельная загрузка источников с глобальным лимитом и лимитом на хост"""
+
+    def __init__(self, parser, concurrency: int = 20, per_host_limit: int = 4,
+                 source_timeout: float = 30.0, metrics: Optional[MetricsRegistry] = None):
+        self.parser = parser
+        self.concurrency = max(1, concurrency)
+        self.per_host_limit = max(1, per_host_limit)
+        self.source_timeout = source_timeout
+        self._global_limit = asyncio.Semaphore(self.concurrency)
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+        metrics = metrics or MetricsRegistry()
+        self._fetch_seconds = metrics.histogram(
+            'news_fetch_seconds', 'Загрузка и разбор источника, сек', ['source'])
+        self._fetch_errors = metrics.counter(
+            'news_fetch_errors_total', 'Ошибки загрузки источника', ['source'])
+        self._cycle_seconds = metrics.histogram(
+            'news_fetch_cycle_seconds', 'Цикл получения целиком, сек',
+            buckets=(1, 2.5, 5, 10, 30, 60, 120, 300, 600))
+
+    @staticmethod
+    def source_host(source: Dict) -> str:
+        """Хост, к которому обращается источник (для лимита на хост)"""
+        if source['type'] == 'twitter':
+            return 'nitter'  # Все зеркала пула - один лимит (NitterPool сам выбирает зеркало)
+        return urlparse(source['url']).netloc.lower() or source['url']
+
+    def _host_limit(self, host: str) -> asyncio.Semaphore:
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(self.per_host_limit)
+        return self._host_limits[host]
+
+    async def fetch_source(self, source: Dict, validators: Optional[Dict] = None) -> Dict:
+        """Загрузить один источник, соблюдая оба лимита"""
+        # Сначала слот хоста, потом общий: источники в очереди к занятому хосту
+        # не держат общие слоты, и быстрые хосты не ждут медленный
+        async with self._host_limit(self.source_host(source)), self._global_limit:
+            started = time.monotonic()
+            result = {'source': source, 'articles': [], 'entry_times': [], 'not_modified': False,
+                      'validators': None, 'error': None}
+            try:
+                result.update(await asyncio.wait_for(
+                    self.parser.fetch_source(source, validators), timeout=self.source_timeout
+                ))
+            except Exception as e:
+                logger.error(f"Ошибка при получении новостей из {source['name']}: {type(e).__name__}: {e}")
+                result['error'] = e
+                self._fetch_errors.inc(source=source['name'])
+            result['elapsed'] = time.monotonic() - started
+            self._fetch_seconds.observe(result['elapsed'], source=source['name'])
+            return result
+
+    async def run_cycle(self, sources: List[Dict],
+                        publish: Callable[[Dict, List[Dict]], Awaitable[int]],
+                        validators: Optional[Dict[int, Dict]] = None) -> Dict:
+        """
+        Загрузить все источники параллельно и передать статьи в publish
+        по мере готовности каждого источника.
+        publish(source, articles) возвращает число опубликованных новостей.
+        validators - кэш условного GET по source_id; обновлённые валидаторы
+        возвращаются только для источников, обработанных без ошибок.
+        outcomes - итог по каждому источнику (для PollScheduler.record).
+        """
+        validators = validators or {}
+        started = time.monotonic()
+        published = 0
+        errors = 0
+        cache_hits = 0
+        cache_misses = 0
+        new_validators = []
+        outcomes = []
+
+        tasks = [asyncio.ensure_future(self.fetch_source(source, validators.get(source['id'])))
+                 for source in sources]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                result = await next_done
+                outcome = {
+                    'source_id': result['source']['id'],
+                    'error': result['error'] is not None,
+                    # Ошибка загрузки (не публикации) - для SourceHealth
+                    'fetch_error': (f"{type(result['error']).__name__}: {result['error']}".rstrip(': ')
+                                    if result['error'] is not None else None),
+                    'not_modified': result['not_modified'],
+                    'published': 0,
+                    # Даты последних записей feed'а, а не только новых - для PollScheduler
+                    'entry_times': result['entry_times'],
+                    'elapsed': result['elapsed'],
+                }
+                outcomes.append(outcome)
+                if result['error'] is not None:
+                    errors += 1
+                    continue
+                if result['not_modified']:
+                    cache_hits += 1
+                else:
+                    cache_misses += 1
+                try:
+                    if result['articles']:
+                        outcome['published'] = await publish(result['source'], result['articles'])
+                        published += outcome['published']
+                except Exception as e:
+                    logger.error(f"Ошибка при публикации новостей из {result['source']['name']}: {e}")
+                    outcome['error'] = True
+                    errors += 1
+                    continue
+                if result['validators']:
+                    new_validators.append(result['validators'])
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        elapsed = time.monotonic() - started
+        self._cycle_seconds.observe(elapsed)
+        logger.info(f"Цикл получения: {len(sources)} источников, "
+                    f"{published} новостей, {errors} ошибок за {elapsed:.1f}с "
+                    f"(кэш: {cache_hits} попаданий, {cache_misses} промахов)")
+        return {
+            'sources': len(sources),
+            'published': published,
+            'errors': errors,
+            'cache_hits': cache_hits,
+            'cache_misses': cache_misses,
+            'validators': new_validators,
+            'outcomes': outcomes,
+            'elapsed': elapsed,
+        }
+
+
+class FetchCoordinator:
+    """
+    Один цикл получения за раз (single-flight).
+    Запуск во время идущего цикла присоединяется к нему, если тот уже
+    опрашивает нужные источники; иначе ставится один следующий цикл,
+    в который сливаются все такие запуски. Два цикла никогда не
+    публикуют одновременно, поэтому проверки "уже опубликовано" не гоняются.
+    """
+
+    def __init__(self, run_cycle: Callable[[Optional[List[Dict]]], Awaitable[Dict]]):
+        self.run_cycle = run_cycle  # run_cycle(sources) - sources=None означает все
+        self._current: Optional[asyncio.Task] = None
+        self._current_ids: Optional[Set[int]] = None  # None - все источники
+        self._next: Optional[Dict] = None  # Следующий цикл: future, источники
+        self.stats = {'triggers': 0, 'cycles': 0, 'joined': 0, 'coalesced': 0, 'by_reason': {}}
+
+    @property
+    def running(self) -> bool:
+        return self._current is not None
+
+    @staticmethod
+    def _covers(planned: Optional[Set[int]], wanted: Optional[Set[int]]) -> bool:
+        return planned is None or (wanted is not None and wanted <= planned)
+
+    def _start(self, sources: Optional[List[Dict]]) -> asyncio.Task:
+        self._current_ids = None if sources is None else {s['id'] for s in sources}
+        self._current = asyncio.create_task(self.run_cycle(sources))
+        self._current.add_done_callback(self._on_done)
+        self.stats['cycles'] += 1
+        return self._current
+
+    def _on_done(self, task: asyncio.Task):
+        if not task.cancelled():
+            task.exception()  # Ошибку получат ожидающие; здесь - чтобы не было предупреждения
+        self._current = self._current_ids = None
+        queued, self._next = self._next, None
+        if queued is None:
+            return
+        sources = None if queued['all'] else list(queued['sources'].values())
+        follow_up = self._start(sources)
+
+        def relay(done: asyncio.Task):
+            future = queued['future']
+            if future.done():
+                return
+            if done.cancelled():
+                future.cancel()
+            elif done.exception() is not None:
+                future.set_exception(done.exception())
+            else:
+                future.set_result(done.result())
+
+        follow_up.add_done_callback(relay)
+
+    async def trigger(self, sources: Optional[List[Dict]] = None, reason: str = 'manual') -> Dict:
+        """
+        Запросить цикл для sources (None - все источники).
+        Возвращает результат цикла; 'joined': True - запуск присоединился
+        к чужому циклу (его новости уже посчитаны тем, кто цикл начал).
+        """
+        self.stats['triggers'] += 1
+        self.stats['by_reason'][reason] = self.stats['by_reason'].get(reason, 0) + 1
+        wanted = None if sources is None else {s['id'] for s in sources}
+
+        if self._current is None:
+            return {**await asyncio.shield(self._start(sources)), 'joined': False}
+
+        if self._covers(self._current_ids, wanted):
+            self.stats['joined'] += 1
+            logger.info(f"Запуск '{reason}' присоединён к идущему циклу получения")
+            return {**await asyncio.shield(self._current), 'joined': True}
+
+        # Один следующий цикл на все запуски, пришедшие во время текущего
+        owner = self._next is None
+        if owner:
+            self._next = {'future': asyncio.get_running_loop().create_future(),
+                          'sources': {}, 'all': False}
+        else:
+            self.stats['coalesced'] += 1
+        if sources is None:
+            self._next['all'] = True
+        else:
+            self._next['sources'].update((s['id'], s) for s in sources)
+        logger.info(f"Запуск '{reason}' {'поставлен' if owner else 'объединён'} "
+                    f"в следующий цикл получения")
+        return {**await asyncio.shield(self._next['future']), 'joined': not owner}
+
+    def get_stats(self) -> Dict:
+        return {**self.stats, 'by_reason': dict(self.stats['by_reason']), 'running': self.running}
@@ -0,0 +1,106 @@
+"""
+Общий HTTP клиент бота
+Одна долгоживущая aiohttp сессия для всех парсеров и внешних публикаторов:
+пул соединений, keep-alive, DNS кэш и сжатие ответов
+"""
+
+import logging
+from typing import Dict, Optional
+
+import aiohttp
+
+try:  # brotli опционален: без него просим только gzip/deflate
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    ACCEPT_ENCODING = "gzip, deflate"
+
+logger = logging.getLogger(__name__)
+
+
+class HttpClient:
+    """Долгоживущая aiohttp сессия со счётчиками переиспользования соединений"""
+
+    def __init__(self, limit: int = 100, limit_per_host: int = 8,
+                 dns_ttl: int = 300, keepalive_timeout: float = 60,
+                 connect_timeout: float = 10, read_timeout: float = 30,
+                 user_agent: str = "NewsBot/1.0"):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.dns_ttl = dns_ttl
+        self.keepalive_timeout = keepalive_timeout
+        # Без общего лимита на запрос: крупный feed, читаемый кусками, может идти
+        # дольше; зависшее соединение ловит sock_read, а общий срок источника
+        # задаёт вызывающий (FetchEngine.source_timeout, NitterPool.request_timeout)
+        self.timeout = aiohttp.ClientTimeout(total=None, sock_connect=connect_timeout,
+                                             sock_read=read_timeout)
+        self.headers = {
+            "User-Agent": user_agent,
+            "Accept-Encoding": ACCEPT_ENCODING,
+        }
+        self.stats = {
+            'requests': 0,
+            'connections_created': 0,
+            'connections_reused': 0,
+            'dns_cache_hits': 0,
+            'dns_cache_misses': 0,
+        }
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _trace_config(self) -> aiohttp.TraceConfig:
+        trace = aiohttp.TraceConfig()
+
+        def counter(key):
+            async def handler(session, ctx, params):
+                self.stats[key] += 1
+            return handler
+
+        trace.on_request_start.append(counter('requests'))
+        trace.on_connection_create_end.append(counter('connections_created'))
+        trace.on_connection_reuseconn.append(counter('connections_reused'))
+        trace.on_dns_cache_hit.append(counter('dns_cache_hits'))
+        trace.on_dns_cache_miss.append(counter('dns_cache_misses'))
+        return trace
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """Сессия создаётся лениво, внутри работающего event loop"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                ttl_dns_cache=self.dns_ttl,
+                use_dns_cache=True,
+                keepalive_timeout=self.keepalive_timeout,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=self.timeout,
+                headers=self.headers,
+                auto_decompress=True,
+                trace_configs=[self._trace_config()],
+            )
+        return self._session
+
+    def get(self, url: str, **kwargs):
+        """GET запрос (использовать как async with)"""
+        return self.session.get(url, **kwargs)
+
+    def post(self, url: str, **kwargs):
+        """POST запрос (использовать как async with)"""
+        return self.session.post(url, **kwargs)
+
+    def reuse_ratio(self) -> float:
+        """Доля запросов, обслуженных уже открытым соединением"""
+        total = self.stats['connections_created'] + self.stats['connections_reused']
+        return self.stats['connections_reused'] / total if total else 0.0
+
+    def get_stats(self) -> Dict:
+        return {**self.stats, 'reuse_ratio': round(self.reuse_ratio(), 3)}
+
+    async def close(self):
+        """Закрыть сессию и все соединения пула"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+            logger.info(f"HTTP клиент закрыт: {self.get_stats()}")
+        self._session = None
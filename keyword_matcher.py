@@ -0,0 +1,112 @@
+"""
+Поиск многих ключевых слов за один проход (автомат Ахо-Корасик)
+Автомат строится один раз при изменении списка слов; время проверки текста
+не зависит от числа слов. Регистр и "ё/е" не различаются, совпадения
+по умолчанию - только целыми словами ("крипт*" - слова, начинающиеся с "крипт").
+"""
+
+from collections import deque
+from typing import Dict, Hashable, Iterable, Iterator, List, Tuple, Union
+
+Keyword = Union[str, Tuple[str, Hashable]]
+
+
+def normalize(text: str) -> str:
+    """Приведение к одному виду для сравнения: casefold, ё -> е, одиночные пробелы"""
+    return ' '.join(text.casefold().replace('ё', 'е').split())
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == '_'
+
+
+class KeywordMatcher:
+    """
+    Скомпилированный набор ключевых слов.
+    keywords - строки или пары (слово, метка); метка возвращается при совпадении,
+    у одного слова может быть несколько меток (например, несколько каналов).
+    """
+
+    def __init__(self, keywords: Iterable[Keyword] = (), whole_words: bool = True):
+        self.whole_words = whole_words
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # Совпадения в состоянии с учётом fail-ссылок: (длина, метка, префикс?)
+        self._out: List[tuple] = [()]
+        self.keywords = 0
+        for item in keywords:
+            keyword, label = (item, item) if isinstance(item, str) else item
+            self._add(keyword, label)
+        self._link()
+
+    def __len__(self) -> int:
+        return self.keywords
+
+    @property
+    def states(self) -> int:
+        return len(self._goto)
+
+    def _add(self, keyword: str, label: Hashable):
+        keyword = normalize(keyword.strip())
+        prefix = keyword.endswith('*')
+        keyword = keyword.rstrip('*')
+        if not keyword:
+            return
+        state = 0
+        for ch in keyword:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            state = nxt
+        self._out[state] += ((len(keyword), label, prefix),)
+        self.keywords += 1
+
+    def _link(self):
+        """fail-ссылки обходом в ширину; выходы наследуются от fail-состояния"""
+        goto, fail, out = self._goto, self._fail, self._out
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                link = fail[state]
+                while link and ch not in goto[link]:
+                    link = fail[link]
+                fail[nxt] = goto[link].get(ch, 0)
+                out[nxt] += out[fail[nxt]]
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[Hashable, int, int]]:
+        """Совпадения (метка, начало, конец) в нормализованном тексте - по мере прохода"""
+        text = normalize(text)
+        goto, fail, out = self._goto, self._fail, self._out
+        whole_words = self.whole_words
+        end = len(text)
+        state = 0
+        for i, ch in enumerate(text):
+            nxt = goto[state].get(ch)
+            while nxt is None and state:
+                state = fail[state]
+                nxt = goto[state].get(ch)
+            state = nxt or 0
+            if not out[state]:
+                continue
+            for length, label, prefix in out[state]:
+                start = i - length + 1
+                if whole_words and (
+                    (start > 0 and _is_word_char(text[start - 1]))
+                    or (not prefix and i + 1 < end and _is_word_char(text[i + 1]))
+                ):
+                    continue
+                yield label, start, i + 1
+
+    def labels(self, text: str) -> set:
+        """Все метки, найденные в тексте"""
+        return {label for label, _, _ in self.iter_matches(text)}
+
+    def search(self, text: str) -> bool:
+        """Есть ли хотя бы одно совпадение"""
+        return next(self.iter_matches(text), None) is not None
@@ -0,0 +1,294 @@
+"""
+Метрики бота в формате Prometheus
+MetricsRegistry - счётчики, gauge и гистограммы с метками; компоненты
+регистрируют свои метрики сами (повторная регистрация возвращает ту же).
+MetricsServer отдаёт их по HTTP на /metrics. Счётчики сохраняются в БД
+(NewsDatabase.save_metric_counters) и переживают перезапуск; отметка
+mark() - база для отчёта "за период" (еженедельный отчёт).
+"""
+
+import json
+import logging
+import math
+import time
+from contextlib import contextmanager
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+# Секунды: от быстрых ответов до таймаута источника
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Metric:
+    """Семейство метрики: значения по наборам меток"""
+
+    kind = 'untyped'
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple[str, ...], object] = {}
+
+    def _key(self, labels: Dict) -> Tuple[str, ...]:
+        if set(labels) != set(self.labels):
+            raise ValueError(f"{self.name}: ожидаются метки {self.labels}, переданы {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def _samples(self) -> Iterable[Tuple[str, str, float]]:
+        """(суффикс имени, метки, значение) для вывода"""
+        for key, value in sorted(self._values.items()):
+            yield '', _format_labels(self.labels, key), value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines += [f"{self.name}{suffix}{labels} {_format_value(value)}"
+                  for suffix, labels, value in self._samples()]
+        return lines
+
+
+class Counter(Metric):
+    """Монотонно растущий счётчик"""
+
+    kind = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        if amount < 0:
+            raise ValueError(f"{self.name}: счётчик не уменьшается")
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def total(self) -> float:
+        """Сумма по всем меткам"""
+        return sum(self._values.values())
+
+
+class Gauge(Metric):
+    """Текущее значение (глубина очереди, время последнего события)"""
+
+    kind = 'gauge'
+
+    def set(self, value: float, **labels):
+        self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> Optional[float]:
+        return self._values.get(self._key(labels))
+
+
+class Histogram(Metric):
+    """Распределение наблюдений по корзинам (задержки, размеры)"""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = (),
+                 buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        state = self._values.get(key)
+        if state is None:
+            # Счётчики по корзинам (не накопительные), сумма, число наблюдений
+            state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                state[0][i] += 1
+                break
+        state[1] += value
+        state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Замерить длительность блока with"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def summary(self, **labels) -> Dict:
+        """{'count', 'sum', 'avg'} по набору меток; без меток - по всем наборам"""
+        if labels:
+            state = self._values.get(self._key(labels))
+            states = [state] if state is not None else []
+        else:
+            states = list(self._values.values())
+        count = sum(state[2] for state in states)
+        total = sum(state[1] for state in states)
+        return {'count': count, 'sum': total, 'avg': total / count if count else None}
+
+    def _samples(self):
+        for key, (counts, total, count) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield '_bucket', _format_labels(self.labels + ('le',), key + (_format_value(bound),)), cumulative
+            yield '_bucket', _format_labels(self.labels + ('le',), key + ('+Inf',)), count
+            yield '_sum', _format_labels(self.labels, key), total
+            yield '_count', _format_labels(self.labels, key), count
+
+
+class MetricsRegistry:
+    """Реестр метрик процесса"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._collectors: List[Callable[[], Awaitable[None]]] = []
+        self._marked: Dict[Tuple[str, Tuple[str, ...]], float] = {}
+        self._restored: Dict[str, List[Dict]] = {}  # Сохранённые счётчики, ещё не зарегистрированные
+
+    def _register(self, cls, name: str, help_text: str, labels: Iterable[str], **kwargs) -> Metric:
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = cls(name, help_text, tuple(labels), **kwargs)
+            self._apply_restored(metric, self._restored.pop(name, []))
+        elif type(metric) is not cls or metric.labels != tuple(labels):
+            raise ValueError(f"Метрика {name} уже зарегистрирована с другим типом или метками")
+        return metric
+
+    def counter(self, name: str, help_text: str, labels: Iterable[str] = ()) -> Counter:
+        return self._register(Counter, name, help_text, labels)
+
+    def gauge(self, name: str, help_text: str, labels: Iterable[str] = ()) -> Gauge:
+        return self._register(Gauge, name, help_text, labels)
+
+    def histogram(self, name: str, help_text: str, labels: Iterable[str] = (),
+                  buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, help_text, labels, buckets=buckets)
+
+    def get(self, name: str) -> Optional[Metric]:
+        return self._metrics.get(name)
+
+    def add_collector(self, collect: Callable[[], Awaitable[None]]):
+        """Корутина, обновляющая gauge перед выдачей (например, глубина очереди из БД)"""
+        self._collectors.append(collect)
+
+    async def collect(self):
+        for collect in self._collectors:
+            try:
+                await collect()
+            except Exception as e:
+                logger.warning(f"Сбор метрик не удался: {e}")
+
+    def render(self) -> str:
+        """Текстовый формат Prometheus (exposition format 0.0.4)"""
+        lines = []
+        for name in sorted(self._metrics):
+            lines += self._metrics[name].render()
+        return '\n'.join(lines) + '\n'
+
+    # ---------- сохранение счётчиков и отчёты за период ----------
+
+    def _counters(self) -> Iterable[Tuple[Counter, Tuple[str, ...], float]]:
+        for metric in self._metrics.values():
+            if isinstance(metric, Counter):
+                for key, value in metric._values.items():
+                    yield metric, key, value
+
+    def counter_rows(self) -> List[Dict]:
+        """Счётчики для NewsDatabase.save_metric_counters"""
+        return [{'name': metric.name, 'labels': json.dumps(key, ensure_ascii=False),
+                 'value': value, 'marked': self._marked.get((metric.name, key), 0)}
+                for metric, key, value in self._counters()]
+
+    def restore(self, rows: List[Dict]):
+        """
+        Продолжить счётчики с сохранённых значений (после перезапуска).
+        Счётчики, зарегистрированные позже (например, AdvancedNewsBot),
+        получают свои значения при регистрации; счётчики, которых больше
+        никто не регистрирует (переименованы, удалены), так и не применяются.
+        """
+        pending: Dict[str, List[Dict]] = {}
+        for row in rows:
+            pending.setdefault(row['name'], []).append(row)
+        for name, metric_rows in pending.items():
+            metric = self._metrics.get(name)
+            if metric is None:
+                self._restored.setdefault(name, []).extend(metric_rows)
+            else:
+                self._apply_restored(metric, metric_rows)
+
+    def _apply_restored(self, metric: Metric, rows: List[Dict]):
+        if not isinstance(metric, Counter):
+            return
+        for row in rows:
+            key = tuple(json.loads(row['labels']))
+            if len(metric.labels) != len(key):
+                continue
+            value = int(row['value']) if row['value'] == int(row['value']) else row['value']
+            metric._values[key] = metric._values.get(key, 0) + value
+            self._marked[(metric.name, key)] = row['marked']
+
+    def mark(self):
+        """Запомнить текущие значения счётчиков как начало нового периода"""
+        self._marked = {(metric.name, key): value for metric, key, value in self._counters()}
+
+    def since_mark(self, name: str, **labels) -> float:
+        """Прирост счётчика с последней mark() (без меток - сумма по всем)"""
+        metric = self._metrics.get(name)
+        if not isinstance(metric, Counter):
+            return 0
+        if labels:
+            key = metric._key(labels)
+            return metric._values.get(key, 0) - self._marked.get((name, key), 0)
+        return sum(value - self._marked.get((name, key), 0) for key, value in metric._values.items())
+
+
+class MetricsServer:
+    """HTTP сервер /metrics на локальном адресе"""
+
+    def __init__(self, registry: MetricsRegistry, host: str = '127.0.0.1', port: int = 9108):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._runner: Optional[web.AppRunner] = None
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        await self.registry.collect()
+        return web.Response(body=self.registry.render().encode('utf-8'),
+                            headers={'Content-Type': CONTENT_TYPE})
+
+    async def start(self):
+        if self._runner is not None:
+            return
+        app = web.Application()
+        app.router.add_get('/metrics', self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info(f"📈 Метрики: http://{self.host}:{self.port}/metrics")
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
@@ -0,0 +1,231 @@
+"""
+Поиск почти одинаковых новостей (перепечатки под другими URL)
+SimHash заголовка и анонса + LSH индекс по полосам битов за скользящее окно.
+Индекс живёт в памяти и сохраняется в SQLite (таблица news_fingerprints)
+вместе с новостью, в той же транзакции.
+"""
+
+import asyncio
+import hashlib
+import logging
+import re
+import time
+from array import array
+from collections import deque
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+_TAG_RE = re.compile(r"<[^>]+>")
+_MASK64 = (1 << 64) - 1
+
+
+def simhash(text: str) -> int:
+    """
+    64-битный SimHash по словам текста (с учётом частоты).
+    Только отдельные слова, без пар: на коротких заголовках и анонсах
+    замена одного слова меняет меньше бит, чем с шинглами из пар слов.
+    """
+    features = [w for w in _WORD_RE.findall(_TAG_RE.sub(" ", text).lower()) if len(w) > 2]
+    if not features:
+        return 0
+    # Бит результата = 1, если он стоит больше чем у половины признаков.
+    # Счётчики по всем 64 позициям сразу - "вертикальные": planes[i] хранит
+    # i-й разряд счётчика каждой позиции, прибавление - двоичный перенос по int'ам
+    planes: List[int] = []
+    for feature in features:
+        carry = int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), 'little')
+        for i, plane in enumerate(planes):
+            planes[i], carry = plane ^ carry, plane & carry
+            if not carry:
+                break
+        if carry:
+            planes.append(carry)
+    # Побитное сравнение счётчиков с порогом: count >= len(features) // 2 + 1
+    threshold = len(features) // 2 + 1
+    planes += [0] * (threshold.bit_length() - len(planes))
+    greater, equal = 0, _MASK64
+    for i in range(len(planes) - 1, -1, -1):
+        if threshold >> i & 1:
+            equal &= planes[i]
+        else:
+            greater |= equal & planes[i]
+            equal &= ~planes[i] & _MASK64
+    return greater | equal
+
+
+def to_signed(value: int) -> int:
+    """uint64 -> int64 для хранения в SQLite INTEGER"""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def to_unsigned(value: int) -> int:
+    return value & _MASK64
+
+
+class SimHashIndex:
+    """
+    LSH индекс: 64 бита делятся на max_distance + 1 полос; при расстоянии
+    Хэмминга не больше max_distance хотя бы одна полоса совпадает точно
+    (принцип Дирихле), поэтому достаточно проверить корзины совпавших полос.
+    Чем больше max_distance, тем уже полосы и крупнее корзины: 4 -> полосы
+    по 12-16 бит, при 1M записей около тысячи кандидатов на поиск.
+    """
+
+    def __init__(self, max_distance: int = 4, window_seconds: float = 72 * 3600):
+        self.max_distance = max_distance
+        self.bands = max_distance + 1
+        self.window_seconds = window_seconds
+        # (сдвиг, маска) каждой полосы; последняя забирает остаток бит
+        width = 64 // self.bands
+        self._band_slices = [
+            (band * width, (1 << (width if band < self.bands - 1 else 64 - band * width)) - 1)
+            for band in range(self.bands)
+        ]
+        self._buckets: List[Dict[int, array]] = [{} for _ in range(self.bands)]
+        self._added_at: Dict[int, float] = {}
+        self._order: deque = deque()  # (время, fingerprint) в порядке добавления
+
+    def __len__(self) -> int:
+        return len(self._added_at)
+
+    def items(self):
+        """Живые записи: (время добавления, fingerprint)"""
+        for added_at, fp in self._order:
+            if self._added_at.get(fp) == added_at:
+                yield added_at, fp
+
+    def _band_keys(self, fp: int):
+        for band, (shift, mask) in enumerate(self._band_slices):
+            yield band, (fp >> shift) & mask
+
+    def add(self, fp: int, added_at: Optional[float] = None):
+        added_at = time.time() if added_at is None else added_at
+        known = self._added_at.get(fp)
+        if known is not None:
+            if added_at > known:  # Продлить жизнь: старая запись в _order станет пропускаться
+                self._added_at[fp] = added_at
+                self._order.append((added_at, fp))
+            return
+        self._added_at[fp] = added_at
+        self._order.append((added_at, fp))
+        for band, key in self._band_keys(fp):
+            bucket = self._buckets[band].get(key)
+            if bucket is None:
+                self._buckets[band][key] = array('Q', (fp,))
+            else:
+                bucket.append(fp)
+
+    def find(self, fp: int, now: Optional[float] = None) -> Optional[int]:
+        """Ближайший fingerprint в пределах max_distance и окна, иначе None"""
+        oldest = (time.time() if now is None else now) - self.window_seconds
+        best, best_distance = None, self.max_distance + 1
+        for band, key in self._band_keys(fp):
+            bucket = self._buckets[band].get(key)
+            if not bucket:
+                continue
+            for candidate in bucket:
+                distance = (candidate ^ fp).bit_count()
+                if distance < best_distance and self._added_at.get(candidate, 0) >= oldest:
+                    best, best_distance = candidate, distance
+                    if distance == 0:
+                        return best
+        return best
+
+    def discard(self, fp: int):
+        if self._added_at.pop(fp, None) is None:
+            return
+        self._remove_from_buckets(fp)  # Запись в _order пропустит expire
+
+    def _remove_from_buckets(self, fp: int):
+        for band, key in self._band_keys(fp):
+            bucket = self._buckets[band][key]
+            bucket.remove(fp)
+            if not bucket:
+                del self._buckets[band][key]
+
+    def expire(self, now: Optional[float] = None) -> int:
+        """Удалить fingerprint'ы старше окна"""
+        oldest = (time.time() if now is None else now) - self.window_seconds
+        removed = 0
+        while self._order and self._order[0][0] < oldest:
+            added_at, fp = self._order.popleft()
+            if self._added_at.get(fp) != added_at:
+                continue  # Продлён или удалён - запись устарела
+            del self._added_at[fp]
+            self._remove_from_buckets(fp)
+            removed += 1
+        return removed
+
+
+class NearDuplicateDetector:
+    """Стадия дедупликации по содержимому для конвейера публикации"""
+
+    def __init__(self, db, max_distance: int = 4, window_hours: float = 72,
+                 expire_interval: float = 3600):
+        self.db = db  # AsyncNewsDatabase
+        self.index = SimHashIndex(max_distance, window_hours * 3600)
+        self.expire_interval = expire_interval
+        self._last_expire = time.time()
+        self.stats = {'checked': 0, 'duplicates': 0}
+
+    @staticmethod
+    def fingerprint(article) -> int:
+        if hasattr(article, 'simhash'):
+            return article.simhash  # Article считает SimHash один раз
+        return simhash(f"{article.get('title', '')} {article.get('summary', '')}")
+
+    async def load(self):
+        """Загрузить fingerprint'ы за окно из SQLite (индекс строится вне event loop)"""
+        started = time.monotonic()
+        rows = await self.db.load_fingerprints(time.time() - self.index.window_seconds)
+
+        def build() -> SimHashIndex:
+            index = SimHashIndex(self.index.max_distance, self.index.window_seconds)
+            for fp, added_at in rows:
+                index.add(to_unsigned(fp), added_at)
+            return index
+
+        index = await asyncio.to_thread(build)
+        # Доиграть то, что успело попасть в индекс во время загрузки
+        for added_at, fp in self.index.items():
+            index.add(fp, added_at)
+        self.index = index
+        logger.info(f"Индекс дублей загружен: {len(index)} fingerprint'ов "
+                    f"за {time.monotonic() - started:.1f}с")
+
+    def check(self, article: Dict) -> Optional[int]:
+        """
+        Проверить статью. Возвращает fingerprint найденного дубликата или None;
+        новая статья сразу попадает в индекс (ловит дубли внутри одного цикла).
+        Её fingerprint для записи в БД - article.simhash (0 - текста нет, в индекс не попала).
+        """
+        self.stats['checked'] += 1
+        fp = self.fingerprint(article)
+        if fp == 0:
+            return None  # Пустой текст - сравнивать не с чем
+        match = self.index.find(fp)
+        if match is not None:
+            self.stats['duplicates'] += 1
+            return match
+        self.index.add(fp)
+        return None
+
+    def forget(self, rows: List[Dict]):
+        """Убрать из индекса новости, которые не удалось записать в БД (rows для enqueue_news)"""
+        for row in rows:
+            if row.get('simhash') is not None:
+                self.index.discard(to_unsigned(row['simhash']))
+
+    async def expire(self, force: bool = False):
+        """Не чаще expire_interval чистить окно в памяти и в SQLite"""
+        now = time.time()
+        if not force and now - self._last_expire < self.expire_interval:
+            return
+        self._last_expire = now
+        self.index.expire(now)
+        await self.db.prune_fingerprints(now - self.index.window_seconds)
+
+    def get_stats(self) -> Dict:
+        return {**self.stats, 'indexed': len(self.index)}
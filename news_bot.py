@@ -4,9 +4,15 @@ Telegram News Bot с поддержкой RSS, Дзен и X/Twitter
 """
 
 import asyncio
+import calendar
+import functools
+import hashlib
+import multiprocessing
 import sqlite3
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 import feedparser
-import aiohttp
 from datetime import datetime
 from aiogram import Bot, Dispatcher, types, F
 from aiogram.filters import Command, StateFilter
@@ -14,6 +20,7 @@ from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, FSInputFile
+from aiohttp import ClientResponseError
 from contextlib import asynccontextmanager
 import logging
 from typing import List, Dict, Optional
@@ -21,108 +28,728 @@ import json
 import os
 from dotenv import load_dotenv
 
+from article import Article
+from async_db import AsyncNewsDatabase
+from categorizer import BatchCategorizer, load_categories
+from feed_stream import WATERMARK_FIELDS, FeedTooLarge, StreamingFeedParser, is_seen
+from fetch_engine import FetchCoordinator, FetchEngine
+from metrics import MetricsRegistry, MetricsServer
+from tracing import Tracer, record, span
+from outbox import OutboxWorker
+from poll_scheduler import PollScheduler
+from source_health import SourceHealth
+from retention import RetentionWorker
+from routing import RoutingIndex, parse_route_args
+from send_scheduler import SendScheduler
+from http_client import HttpClient
+from near_dup import NearDuplicateDetector, to_signed
+from nitter_pool import NitterPool, canonical_tweet_link
+from url_cache import PublishedUrlCache
+from url_canon import url_key
+
 # Загрузка переменных окружения
 load_dotenv()
 TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 CHANNELS = json.loads(os.getenv("TELEGRAM_CHANNELS", "[]"))  # ID каналов для публикации
 ADMIN_ID = int(os.getenv("ADMIN_ID", "0"))
 
+# Параллельная загрузка источников
+FETCH_CONCURRENCY = int(os.getenv("FETCH_CONCURRENCY", "20"))  # Всего одновременных загрузок
+FETCH_PER_HOST_LIMIT = int(os.getenv("FETCH_PER_HOST_LIMIT", "4"))  # Одновременных загрузок с одного хоста
+FETCH_SOURCE_TIMEOUT = float(os.getenv("FETCH_SOURCE_TIMEOUT", "30"))  # Таймаут на источник, сек
+
+# Адаптивный опрос источников (вместо общего cron раз в 30 минут)
+POLL_MIN_INTERVAL = float(os.getenv("POLL_MIN_INTERVAL", "600"))  # Не чаще, сек
+POLL_MAX_INTERVAL = float(os.getenv("POLL_MAX_INTERVAL", "7200"))  # Не реже, сек
+POLL_DEFAULT_INTERVAL = float(os.getenv("POLL_DEFAULT_INTERVAL", "1800"))  # Для нового источника, сек
+POLL_JITTER = float(os.getenv("POLL_JITTER", "0.1"))  # Случайный разброс интервала, доля
+POLL_RATE_FACTOR = float(os.getenv("POLL_RATE_FACTOR", "1.0"))  # Интервал = промежуток между записями * factor
+POLL_BACKOFF = float(os.getenv("POLL_BACKOFF", "1.5"))  # Рост интервала, если нового нет
+
+# Отключение падающих источников (circuit breaker)
+BREAKER_FAILURES = int(os.getenv("BREAKER_FAILURES", "3"))  # Ошибок подряд до отключения
+BREAKER_BACKOFF_BASE = float(os.getenv("BREAKER_BACKOFF_BASE", "300"))  # Первая пауза до пробы, сек
+BREAKER_BACKOFF_MAX = float(os.getenv("BREAKER_BACKOFF_MAX", "21600"))  # Максимальная пауза, сек
+
+# Зеркала Nitter для X/Twitter источников
+NITTER_MIRRORS = json.loads(os.getenv("NITTER_MIRRORS", '["https://nitter.net"]'))  # Базовые URL зеркал
+NITTER_HEDGE_AFTER = float(os.getenv("NITTER_HEDGE_AFTER", "2"))  # Через сколько сек спросить второе зеркало
+NITTER_TIMEOUT = float(os.getenv("NITTER_TIMEOUT", "10"))  # Таймаут запроса к зеркалу, сек
+NITTER_CACHE_TTL = float(os.getenv("NITTER_CACHE_TTL", "60"))  # Кэш ответа по пользователю, сек
+
+# Разбор feed'ов: только записи новее прошлого опроса (watermark)
+FEED_INITIAL_ENTRIES = int(os.getenv("FEED_INITIAL_ENTRIES", "10"))  # Записей с нового источника
+FEED_MAX_ENTRIES = int(os.getenv("FEED_MAX_ENTRIES", "100"))  # Не больше новых записей за опрос
+FEED_STREAM_THRESHOLD = int(os.getenv("FEED_STREAM_THRESHOLD", "1048576"))  # Больше - потоковый разбор, байт
+FEED_MAX_BYTES = int(os.getenv("FEED_MAX_BYTES", "33554432"))  # Больше - feed отклоняется, байт
+FEED_CHUNK_SIZE = int(os.getenv("FEED_CHUNK_SIZE", "65536"))  # Кусок чтения тела, байт
+
+# Разбор XML вне event loop. process по умолчанию: в thread разбор держит GIL,
+# и event loop всё равно подвисает на ~100 мс на крупных feed'ах (bench_loop_lag)
+PARSER_POOL = os.getenv("PARSER_POOL", "process")  # process или thread
+PARSER_WORKERS = int(os.getenv("PARSER_WORKERS", "4"))
+
+# Общий HTTP клиент
+HTTP_POOL_LIMIT = int(os.getenv("HTTP_POOL_LIMIT", "100"))  # Всего соединений в пуле
+HTTP_POOL_PER_HOST = int(os.getenv("HTTP_POOL_PER_HOST", "8"))  # Соединений на хост
+HTTP_DNS_TTL = int(os.getenv("HTTP_DNS_TTL", "300"))  # Время жизни DNS кэша, сек
+HTTP_KEEPALIVE = float(os.getenv("HTTP_KEEPALIVE", "60"))  # Keep-alive простаивающих соединений, сек
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "10"))  # Установка соединения, сек
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "30"))  # Тишина между кусками ответа, сек
+
+# Кэш опубликованных URL перед SQLite
+BLOOM_CAPACITY = int(os.getenv("BLOOM_CAPACITY", "1000000"))  # Ожидаемое число URL в фильтре
+BLOOM_FP_RATE = float(os.getenv("BLOOM_FP_RATE", "0.01"))  # Доля ложных срабатываний
+URL_LRU_SIZE = int(os.getenv("URL_LRU_SIZE", "10000"))  # Недавно проверенные URL
+
+# Лимиты Telegram Bot API
+TG_GLOBAL_RATE = float(os.getenv("TG_GLOBAL_RATE", "30"))  # Сообщений в секунду на бота
+TG_CHAT_RATE = float(os.getenv("TG_CHAT_RATE", "20"))  # Сообщений в минуту на чат
+TG_CHAT_BURST = float(os.getenv("TG_CHAT_BURST", "3"))  # Допустимая пачка в один чат
+TG_MAX_RETRIES = int(os.getenv("TG_MAX_RETRIES", "3"))  # Повторов после 429
+
+# Очередь отправки
+OUTBOX_BATCH = int(os.getenv("OUTBOX_BATCH", "50"))  # Строк за один проход
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))  # Попыток до статуса failed
+OUTBOX_BACKOFF_BASE = float(os.getenv("OUTBOX_BACKOFF_BASE", "5"))  # Первая задержка повтора, сек
+OUTBOX_BACKOFF_MAX = float(os.getenv("OUTBOX_BACKOFF_MAX", "3600"))  # Максимальная задержка, сек
+
+# Хранение опубликованных новостей
+RETENTION_DAYS = float(os.getenv("RETENTION_DAYS", "90"))  # Хранить новости, дней
+RETENTION_BATCH = int(os.getenv("RETENTION_BATCH", "1000"))  # Строк за одну пачку удаления
+RETENTION_INTERVAL = float(os.getenv("RETENTION_INTERVAL", "3600"))  # Период очистки, сек
+RETENTION_ARCHIVE_FILE = os.getenv("RETENTION_ARCHIVE_FILE") or None  # Архив вместо удаления
+# Однократно перевести старую БД в auto_vacuum=INCREMENTAL (полный VACUUM при первой очистке)
+RETENTION_CONVERT_VACUUM = os.getenv("RETENTION_CONVERT_VACUUM", "0") == "1"
+RETENTION_COUNT_ROWS = os.getenv("RETENTION_COUNT_ROWS", "0") == "1"  # Число строк в отчёте (COUNT(*))
+
+# Поиск перепечаток (почти одинаковые заголовок и анонс под разными URL)
+NEAR_DUP_ENABLED = os.getenv("NEAR_DUP_ENABLED", "1") == "1"
+NEAR_DUP_DISTANCE = int(os.getenv("NEAR_DUP_DISTANCE", "4"))  # Макс. различающихся бит SimHash из 64
+NEAR_DUP_WINDOW_HOURS = float(os.getenv("NEAR_DUP_WINDOW_HOURS", "72"))  # Окно сравнения, часов
+
+# Категоризация статей (категории видят правила маршрутизации и фильтры)
+CATEGORIZER_ENABLED = os.getenv("CATEGORIZER_ENABLED", "1") == "1"
+CATEGORIES_FILE = os.getenv("CATEGORIES_FILE") or None  # JSON {категория: [термины]}
+
+# Метрики Prometheus на /metrics
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")  # 0.0.0.0 - доступ извне контейнера
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9108"))  # 0 - не запускать сервер
+
+# Трассировка циклов по стадиям и профиль медленных циклов
+TRACE_FILE = os.getenv("TRACE_FILE") or None  # JSONL с трассой каждого цикла
+TRACE_SLOW_CYCLE = float(os.getenv("TRACE_SLOW_CYCLE", "120"))  # Бюджет цикла, сек (0 - без проверки)
+PROFILE_SLOW_CYCLES = os.getenv("PROFILE_SLOW_CYCLES", "0") == "1"  # Семплирующий профайлер в циклах
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")  # Куда сохранять профили медленных циклов
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.01"))  # Период семплирования, сек
+
 # Логирование
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # ==================== БД ====================
 class NewsDatabase:
+    # Настройки SQLite для каждого соединения
+    PRAGMAS = (
+        # До создания таблиц: место удалённых строк можно вернуть incremental_vacuum
+        # (существующую БД переводит convert_to_incremental_vacuum, см. RETENTION_CONVERT_VACUUM)
+        "PRAGMA auto_vacuum=INCREMENTAL",
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",  # В WAL безопасно и без fsync на каждый commit
+        "PRAGMA temp_store=MEMORY",
+        "PRAGMA cache_size=-20000",  # ~20MB страничного кэша
+        "PRAGMA mmap_size=268435456",  # 256MB
+        "PRAGMA busy_timeout=5000",
+    )
+    # Размер пачки для IN (...) - ниже лимита переменных старых SQLite
+    BATCH_SIZE = 500
+    # url_hash = url_key(url), см. url_canon; url хранится для справки, без индекса
+    PUBLISHED_NEWS_TABLE = '''
+        CREATE TABLE IF NOT EXISTS {name} (
+            id INTEGER PRIMARY KEY,
+            source_id INTEGER,
+            title TEXT,
+            url TEXT,
+            published_at TIMESTAMP,
+            posted_to_tg TIMESTAMP,
+            url_hash INTEGER,
+            FOREIGN KEY(source_id) REFERENCES sources(id)
+        )
+    '''
+
     def __init__(self, db_file: str = "news_bot.db"):
         self.db_file = db_file
+        # Постоянное соединение на поток (небольшой пул без переоткрытий)
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
         self.init_db()
 
+    def _conn(self) -> sqlite3.Connection:
+        """Постоянное соединение текущего потока"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_file, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            for pragma in self.PRAGMAS:
+                conn.execute(pragma)
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def close(self):
+        """Закрыть все открытые соединения"""
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
     def init_db(self):
         """Инициализация БД"""
-        conn = sqlite3.connect(self.db_file)
-        cursor = conn.cursor()
-        
-        # Таблица источников
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS sources (
-                id INTEGER PRIMARY KEY,
-                name TEXT UNIQUE,
-                url TEXT UNIQUE,
-                type TEXT,
-                active INTEGER DEFAULT 1,
-                added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
+        conn = self._conn()
+        with conn:
+            # Таблица источников
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS sources (
+                    id INTEGER PRIMARY KEY,
+                    name TEXT UNIQUE,
+                    url TEXT UNIQUE,
+                    type TEXT,
+                    active INTEGER DEFAULT 1,
+                    added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            
+            # Таблица опубликованных новостей
+            conn.execute(self.PUBLISHED_NEWS_TABLE.format(name='published_news'))
+            self._migrate_url_hash(conn)
+            # Дедупликация по 64-битному ключу канонического URL вместо текста url
+            conn.execute('''
+                CREATE UNIQUE INDEX IF NOT EXISTS idx_published_url_hash
+                ON published_news(url_hash)
+            ''')
+            
+            # Валидаторы для условного GET (ETag / Last-Modified / хеш тела)
+            # и watermark - самая новая запись feed'а на прошлом опросе
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS source_cache (
+                    source_id INTEGER PRIMARY KEY,
+                    etag TEXT,
+                    last_modified TEXT,
+                    content_hash TEXT,
+                    last_guid TEXT,
+                    last_link_hash INTEGER,
+                    last_published_ts REAL,
+                    checked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY(source_id) REFERENCES sources(id)
+                )
+            ''')
+            self._migrate_watermarks(conn)
+            
+            # Адаптивный опрос: выученный интервал и время следующего опроса источника
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS source_schedule (
+                    source_id INTEGER PRIMARY KEY,
+                    interval REAL NOT NULL,
+                    next_due REAL NOT NULL,
+                    avg_gap REAL,
+                    not_modified INTEGER DEFAULT 0,
+                    last_new_at REAL,
+                    FOREIGN KEY(source_id) REFERENCES sources(id)
+                )
+            ''')
+            
+            # Здоровье источников: circuit breaker и время следующей пробы
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS source_health (
+                    source_id INTEGER PRIMARY KEY,
+                    state TEXT NOT NULL DEFAULT 'closed',
+                    failures INTEGER DEFAULT 0,
+                    opened INTEGER DEFAULT 0,
+                    retry_at REAL,
+                    last_error TEXT,
+                    last_success_at REAL,
+                    FOREIGN KEY(source_id) REFERENCES sources(id)
+                )
+            ''')
+            
+            # Очередь отправки: строка на пару (новость, канал)
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS outbox (
+                    id INTEGER PRIMARY KEY,
+                    source_id INTEGER,
+                    url TEXT,
+                    channel_id TEXT,
+                    payload TEXT,
+                    status TEXT DEFAULT 'pending',
+                    attempts INTEGER DEFAULT 0,
+                    next_attempt_at REAL DEFAULT 0,
+                    last_error TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    sent_at TIMESTAMP,
+                    UNIQUE(url, channel_id),
+                    FOREIGN KEY(source_id) REFERENCES sources(id)
+                )
+            ''')
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_outbox_due
+                ON outbox(status, next_attempt_at)
+            ''')
+            
+            # Индексы для запросов по времени и по источнику (retention, отчёты)
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_published_posted
+                ON published_news(posted_to_tg)
+            ''')
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_published_source
+                ON published_news(source_id, posted_to_tg)
+            ''')
+            
+            # Правила маршрутизации: (источник, категория, ключевые слова) -> канал
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS routing_rules (
+                    id INTEGER PRIMARY KEY,
+                    channel_id TEXT NOT NULL,
+                    source_id INTEGER,
+                    category TEXT,
+                    keywords TEXT,
+                    active INTEGER DEFAULT 1,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY(source_id) REFERENCES sources(id)
+                )
+            ''')
+            
+            # SimHash заголовка и анонса для поиска перепечаток (скользящее окно)
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS news_fingerprints (
+                    url TEXT PRIMARY KEY,
+                    simhash INTEGER NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            ''')
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_fingerprints_created
+                ON news_fingerprints(created_at)
+            ''')
+            
+            # Счётчики метрик (MetricsRegistry): переживают перезапуск,
+            # marked - значение на момент последнего еженедельного отчёта
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS metric_counters (
+                    name TEXT NOT NULL,
+                    labels TEXT NOT NULL,
+                    value REAL NOT NULL,
+                    marked REAL NOT NULL DEFAULT 0,
+                    PRIMARY KEY(name, labels)
+                )
+            ''')
+
+    def _migrate_url_hash(self, conn: sqlite3.Connection):
+        """
+        Старая схема: UNIQUE(url) по полному тексту. Таблица пересобирается
+        с url_hash; варианты одного канонического URL схлопываются в одну строку.
+        """
+        columns = {row[1] for row in conn.execute('PRAGMA table_info(published_news)')}
+        if 'url_hash' in columns:
+            return
+        logger.info("Миграция published_news: ключ url_hash вместо UNIQUE(url)...")
+        conn.create_function('url_key', 1, url_key, deterministic=True)
+        conn.execute('DROP TABLE IF EXISTS published_news_new')  # Остаток прерванной миграции
+        conn.execute(self.PUBLISHED_NEWS_TABLE.format(name='published_news_new'))
+        conn.execute('''
+            CREATE UNIQUE INDEX idx_published_url_hash ON published_news_new(url_hash)
         ''')
-        
-        # Таблица опубликованных новостей
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS published_news (
-                id INTEGER PRIMARY KEY,
-                source_id INTEGER,
-                title TEXT,
-                url TEXT UNIQUE,
-                published_at TIMESTAMP,
-                posted_to_tg TIMESTAMP,
-                FOREIGN KEY(source_id) REFERENCES sources(id)
-            )
+        conn.execute('''
+            INSERT OR IGNORE INTO published_news_new
+                (id, source_id, title, url, published_at, posted_to_tg, url_hash)
+            SELECT id, source_id, title, url, published_at, posted_to_tg, url_key(url)
+            FROM published_news ORDER BY id
         ''')
-        
-        conn.commit()
-        conn.close()
+        # Индексы старой таблицы удаляются вместе с ней и создаются заново в init_db
+        conn.execute('DROP TABLE published_news')
+        conn.execute('ALTER TABLE published_news_new RENAME TO published_news')
+
+    def _migrate_watermarks(self, conn: sqlite3.Connection):
+        """Колонки watermark в source_cache старой схемы"""
+        columns = {row[1] for row in conn.execute('PRAGMA table_info(source_cache)')}
+        for column, column_type in (('last_guid', 'TEXT'), ('last_link_hash', 'INTEGER'),
+                                    ('last_published_ts', 'REAL')):
+            if column not in columns:
+                conn.execute(f'ALTER TABLE source_cache ADD COLUMN {column} {column_type}')
 
     def add_source(self, name: str, url: str, source_type: str = "rss") -> bool:
         """Добавить источник"""
         try:
-            conn = sqlite3.connect(self.db_file)
-            cursor = conn.cursor()
-            cursor.execute('''
-                INSERT INTO sources (name, url, type)
-                VALUES (?, ?, ?)
-            ''', (name, url, source_type))
-            conn.commit()
-            conn.close()
+            with self._conn() as conn:
+                conn.execute('''
+                    INSERT INTO sources (name, url, type)
+                    VALUES (?, ?, ?)
+                ''', (name, url, source_type))
             return True
         except sqlite3.IntegrityError:
             return False
 
     def get_active_sources(self) -> List[Dict]:
         """Получить активные источники"""
-        conn = sqlite3.connect(self.db_file)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM sources WHERE active = 1')
-        sources = [dict(row) for row in cursor.fetchall()]
-        conn.close()
-        return sources
+        cursor = self._conn().execute('SELECT * FROM sources WHERE active = 1')
+        return [dict(row) for row in cursor.fetchall()]
 
     def is_news_published(self, url: str) -> bool:
-        """Проверить, опубликована ли новость"""
-        conn = sqlite3.connect(self.db_file)
-        cursor = conn.cursor()
-        cursor.execute('SELECT id FROM published_news WHERE url = ?', (url,))
-        result = cursor.fetchone()
-        conn.close()
-        return result is not None
+        """Проверить, опубликована ли новость (по каноническому URL)"""
+        cursor = self._conn().execute('SELECT 1 FROM published_news WHERE url_hash = ?',
+                                      (url_key(url),))
+        return cursor.fetchone() is not None
+
+    def count_published(self) -> int:
+        """Количество опубликованных новостей"""
+        return self._conn().execute('SELECT COUNT(*) FROM published_news').fetchone()[0]
+
+    def iter_published_keys(self, batch_size: int = 10000):
+        """Все ключи url_hash порциями (для построения кэша при старте)"""
+        cursor = self._conn().execute('SELECT url_hash FROM published_news')
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                yield row[0]
+
+    def get_published_keys(self, keys: List[int]) -> set:
+        """Какие из ключей url_hash уже опубликованы (один запрос на пачку)"""
+        conn = self._conn()
+        published = set()
+        for i in range(0, len(keys), self.BATCH_SIZE):
+            chunk = keys[i:i + self.BATCH_SIZE]
+            placeholders = ','.join('?' * len(chunk))
+            cursor = conn.execute(
+                f'SELECT url_hash FROM published_news WHERE url_hash IN ({placeholders})', chunk
+            )
+            published.update(row[0] for row in cursor.fetchall())
+        return published
+
+    def filter_unpublished(self, urls: List[str]) -> List[str]:
+        """Оставить только неопубликованные urls, сохраняя порядок"""
+        published = self.get_published_keys([url_key(url) for url in urls])
+        return [url for url in urls if url_key(url) not in published]
 
     def add_published_news(self, source_id: int, title: str, url: str, published_at: datetime):
         """Сохранить опубликованную новость"""
-        conn = sqlite3.connect(self.db_file)
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT INTO published_news (source_id, title, url, published_at, posted_to_tg)
-            VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
-        ''', (source_id, title, url, published_at))
-        conn.commit()
-        conn.close()
+        with self._conn() as conn:
+            conn.execute('''
+                INSERT INTO published_news
+                    (source_id, title, url, url_hash, published_at, posted_to_tg)
+                VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+            ''', (source_id, title, url, url_key(url), published_at))
+
+    def add_published_news_batch(self, rows: List[tuple]) -> int:
+        """
+        Сохранить много опубликованных новостей одной транзакцией.
+        rows: [(source_id, title, url, published_at), ...]; повторы URL пропускаются.
+        """
+        if not rows:
+            return 0
+        with self._conn() as conn:
+            cursor = conn.executemany('''
+                INSERT OR IGNORE INTO published_news
+                    (source_id, title, url, url_hash, published_at, posted_to_tg)
+                VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+            ''', [(source_id, title, url, url_key(url), published_at)
+                  for source_id, title, url, published_at in rows])
+        return cursor.rowcount
+
+    def enqueue_news(self, rows: List[Dict], channels: Optional[List] = None) -> int:
+        """
+        Записать новости и их строки outbox одной транзакцией.
+        rows: [{'source_id', 'title', 'url', 'published_at', 'payload'}, ...].
+        Каналы - row['channels'] (после маршрутизации), иначе общий channels.
+        Уже известные URL пропускаются (по row['url_hash'], если его нет -
+        считается из url); возвращает число новых новостей.
+        Необязательный row['simhash'] (int64) сохраняется в news_fingerprints.
+        """
+        added = 0
+        with self._conn() as conn:
+            for row in rows:
+                key = row['url_hash'] if row.get('url_hash') is not None else url_key(row['url'])
+                cursor = conn.execute('''
+                    INSERT OR IGNORE INTO published_news
+                        (source_id, title, url, url_hash, published_at, posted_to_tg)
+                    VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                ''', (row['source_id'], row['title'], row['url'], key, row['published_at']))
+                if cursor.rowcount == 0:
+                    continue
+                added += 1
+                conn.executemany('''
+                    INSERT OR IGNORE INTO outbox (source_id, url, channel_id, payload)
+                    VALUES (?, ?, ?, ?)
+                ''', [(row['source_id'], row['url'], str(channel_id), row['payload'])
+                      for channel_id in row.get('channels', channels) or []])
+                if row.get('simhash') is not None:
+                    conn.execute('''
+                        INSERT OR REPLACE INTO news_fingerprints (url, simhash, created_at)
+                        VALUES (?, ?, ?)
+                    ''', (row['url'], row['simhash'], time.time()))
+        return added
+
+    def get_due_outbox(self, now: float, limit: int = 50) -> List[Dict]:
+        """Строки outbox, готовые к отправке, в порядке постановки"""
+        cursor = self._conn().execute('''
+            SELECT id, url, channel_id, payload, attempts FROM outbox
+            WHERE status = 'pending' AND next_attempt_at <= ?
+            ORDER BY id LIMIT ?
+        ''', (now, limit))
+        return [dict(row) for row in cursor.fetchall()]
+
+    def update_outbox(self, results: List[Dict]):
+        """Сохранить результаты попыток: [{'id', 'status', 'attempts', 'next_attempt_at', 'last_error'}]"""
+        if not results:
+            return
+        with self._conn() as conn:
+            conn.executemany('''
+                UPDATE outbox
+                SET status = :status, attempts = :attempts,
+                    next_attempt_at = :next_attempt_at, last_error = :last_error,
+                    sent_at = CASE WHEN :status = 'sent' THEN CURRENT_TIMESTAMP END
+                WHERE id = :id
+            ''', results)
+
+    def get_outbox_stats(self) -> Dict[str, int]:
+        """Число строк outbox по статусам"""
+        cursor = self._conn().execute('SELECT status, COUNT(*) FROM outbox GROUP BY status')
+        return {row[0]: row[1] for row in cursor.fetchall()}
+
+    def get_source_validators(self) -> Dict[int, Dict]:
+        """Валидаторы условного GET и watermark для всех источников: {source_id: {...}}"""
+        cursor = self._conn().execute('''
+            SELECT source_id, etag, last_modified, content_hash,
+                   last_guid, last_link_hash, last_published_ts
+            FROM source_cache
+        ''')
+        return {row['source_id']: dict(row) for row in cursor.fetchall()}
+
+    def save_source_validators(self, validators: List[Dict]):
+        """
+        Сохранить валидаторы после успешной обработки источников.
+        Watermark сдвигается только здесь - после публикации, иначе упавший
+        цикл потерял бы записи, которые следующий опрос счёл бы виденными.
+        """
+        if not validators:
+            return
+        with self._conn() as conn:
+            conn.executemany('''
+                INSERT OR REPLACE INTO source_cache
+                    (source_id, etag, last_modified, content_hash,
+                     last_guid, last_link_hash, last_published_ts, checked_at)
+                VALUES (:source_id, :etag, :last_modified, :content_hash,
+                        :last_guid, :last_link_hash, :last_published_ts, CURRENT_TIMESTAMP)
+            ''', validators)
+
+    def get_source_schedule(self) -> Dict[int, Dict]:
+        """Состояние адаптивного опроса по источникам: {source_id: {...}}"""
+        cursor = self._conn().execute('''
+            SELECT source_id, interval, next_due, avg_gap, not_modified, last_new_at
+            FROM source_schedule
+        ''')
+        return {row['source_id']: dict(row) for row in cursor.fetchall()}
+
+    def save_source_schedule(self, states: List[Dict]):
+        """Сохранить интервалы и сроки опроса после цикла"""
+        with self._conn() as conn:
+            conn.executemany('''
+                INSERT OR REPLACE INTO source_schedule
+                    (source_id, interval, next_due, avg_gap, not_modified, last_new_at)
+                VALUES (:source_id, :interval, :next_due, :avg_gap, :not_modified, :last_new_at)
+            ''', states)
+
+    def get_source_health(self) -> Dict[int, Dict]:
+        """Состояние breaker'а по источникам: {source_id: {...}}"""
+        cursor = self._conn().execute('''
+            SELECT source_id, state, failures, opened, retry_at, last_error, last_success_at
+            FROM source_health
+        ''')
+        return {row['source_id']: dict(row) for row in cursor.fetchall()}
+
+    def save_source_health(self, states: List[Dict]):
+        """Сохранить состояние breaker'а после цикла"""
+        with self._conn() as conn:
+            conn.executemany('''
+                INSERT OR REPLACE INTO source_health
+                    (source_id, state, failures, opened, retry_at, last_error, last_success_at)
+                VALUES (:source_id, :state, :failures, :opened, :retry_at, :last_error,
+                        :last_success_at)
+            ''', states)
+
+    def load_metric_counters(self) -> List[Dict]:
+        """Сохранённые счётчики метрик"""
+        cursor = self._conn().execute('SELECT name, labels, value, marked FROM metric_counters')
+        return [dict(row) for row in cursor.fetchall()]
+
+    def save_metric_counters(self, rows: List[Dict]):
+        """Сохранить счётчики метрик (MetricsRegistry.counter_rows)"""
+        with self._conn() as conn:
+            conn.executemany('''
+                INSERT OR REPLACE INTO metric_counters (name, labels, value, marked)
+                VALUES (:name, :labels, :value, :marked)
+            ''', rows)
+
+    def get_routing_rules(self) -> List[Dict]:
+        """Активные правила маршрутизации (keywords - JSON список)"""
+        cursor = self._conn().execute('''
+            SELECT id, channel_id, source_id, category, keywords
+            FROM routing_rules WHERE active = 1 ORDER BY id
+        ''')
+        return [dict(row) for row in cursor.fetchall()]
+
+    def add_routing_rule(self, channel_id: str, source_id: Optional[int] = None,
+                         category: Optional[str] = None,
+                         keywords: Optional[List[str]] = None) -> int:
+        """Добавить правило; возвращает его id"""
+        with self._conn() as conn:
+            cursor = conn.execute('''
+                INSERT INTO routing_rules (channel_id, source_id, category, keywords)
+                VALUES (?, ?, ?, ?)
+            ''', (str(channel_id), source_id, category,
+                  json.dumps(keywords, ensure_ascii=False) if keywords else None))
+        return cursor.lastrowid
+
+    def remove_routing_rule(self, rule_id: int) -> bool:
+        """Отключить правило"""
+        with self._conn() as conn:
+            cursor = conn.execute('UPDATE routing_rules SET active = 0 WHERE id = ?', (rule_id,))
+        return cursor.rowcount > 0
+
+    def load_fingerprints(self, since: float) -> List[tuple]:
+        """SimHash'и (int64) новостей, добавленных после since: [(simhash, created_at)]"""
+        cursor = self._conn().execute(
+            'SELECT simhash, created_at FROM news_fingerprints WHERE created_at >= ? '
+            'ORDER BY created_at', (since,)
+        )
+        return cursor.fetchall()
+
+    def prune_fingerprints(self, before: float) -> int:
+        """Удалить fingerprint'ы, вышедшие из окна"""
+        with self._conn() as conn:
+            cursor = conn.execute('DELETE FROM news_fingerprints WHERE created_at < ?', (before,))
+        return cursor.rowcount
+
+    # ---------- хранение и очистка ----------
+
+    def prune_published(self, older_than_days: float, batch_size: int = 1000,
+                        archive_file: Optional[str] = None) -> int:
+        """
+        Удалить (или перенести в archive_file) одну пачку новостей старше
+        older_than_days. Возвращает число удалённых строк.
+        """
+        conn = self._conn()
+        cutoff = f"-{older_than_days} days"
+        ids = [row[0] for row in conn.execute('''
+            SELECT id FROM published_news
+            WHERE posted_to_tg < datetime('now', ?)
+            ORDER BY posted_to_tg LIMIT ?
+        ''', (cutoff, batch_size)).fetchall()]
+        if not ids:
+            return 0
+        placeholders = ','.join('?' * len(ids))
+        if archive_file:
+            self._attach_archive(conn, archive_file)  # ATTACH нельзя внутри транзакции
+        with conn:
+            if archive_file:
+                conn.execute(f'''
+                    INSERT OR IGNORE INTO archive.published_news
+                        (id, source_id, title, url, published_at, posted_to_tg, url_hash)
+                    SELECT id, source_id, title, url, published_at, posted_to_tg, url_hash
+                    FROM main.published_news WHERE id IN ({placeholders})
+                ''', ids)
+            conn.execute(f'DELETE FROM published_news WHERE id IN ({placeholders})', ids)
+        return len(ids)
+
+    @staticmethod
+    def _attach_archive(conn: sqlite3.Connection, archive_file: str):
+        attached = {row[1] for row in conn.execute('PRAGMA database_list')}
+        if 'archive' not in attached:
+            conn.execute('ATTACH DATABASE ? AS archive', (archive_file,))
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS archive.published_news (
+                    id INTEGER PRIMARY KEY,
+                    source_id INTEGER,
+                    title TEXT,
+                    url TEXT,
+                    published_at TIMESTAMP,
+                    posted_to_tg TIMESTAMP,
+                    url_hash INTEGER
+                )
+            ''')
+            columns = {row[1] for row in conn.execute('PRAGMA archive.table_info(published_news)')}
+            if 'url_hash' not in columns:  # Архив, созданный до появления url_hash
+                conn.execute('ALTER TABLE archive.published_news ADD COLUMN url_hash INTEGER')
+
+    def prune_outbox(self, older_than_days: float, batch_size: int = 1000) -> int:
+        """Удалить пачку завершённых строк outbox старше older_than_days"""
+        with self._conn() as conn:
+            cursor = conn.execute('''
+                DELETE FROM outbox WHERE id IN (
+                    SELECT id FROM outbox
+                    WHERE status != 'pending' AND created_at < datetime('now', ?)
+                    LIMIT ?
+                )
+            ''', (f"-{older_than_days} days", batch_size))
+        return cursor.rowcount
+
+    def incremental_vacuum(self, pages: int = 1000) -> int:
+        """Вернуть ОС до pages свободных страниц; возвращает число оставшихся свободных"""
+        conn = self._conn()
+        if conn.execute('PRAGMA auto_vacuum').fetchone()[0] == 2:
+            conn.execute(f'PRAGMA incremental_vacuum({int(pages)})').fetchall()
+        return conn.execute('PRAGMA freelist_count').fetchone()[0]
+
+    def convert_to_incremental_vacuum(self):
+        """Однократно перевести существующую БД в auto_vacuum=INCREMENTAL (полный VACUUM)"""
+        conn = self._conn()
+        conn.execute('PRAGMA auto_vacuum=INCREMENTAL')
+        conn.execute('VACUUM')
+
+    def get_storage_stats(self, count_rows: bool = False) -> Dict:
+        """
+        Размер файла БД (только PRAGMA, без чтения таблиц).
+        count_rows - ещё и число строк основных таблиц (полный проход COUNT(*)).
+        """
+        conn = self._conn()
+        page_size = conn.execute('PRAGMA page_size').fetchone()[0]
+        stats = {
+            'size_bytes': conn.execute('PRAGMA page_count').fetchone()[0] * page_size,
+            'free_bytes': conn.execute('PRAGMA freelist_count').fetchone()[0] * page_size,
+            'auto_vacuum': conn.execute('PRAGMA auto_vacuum').fetchone()[0],
+        }
+        if count_rows:
+            stats['published_rows'] = conn.execute('SELECT COUNT(*) FROM published_news').fetchone()[0]
+            stats['outbox_rows'] = conn.execute('SELECT COUNT(*) FROM outbox').fetchone()[0]
+        return stats
+
+    def probe_query_latency(self) -> Dict[str, float]:
+        """Время (мс) типовых запросов по времени и по источнику"""
+        conn = self._conn()
+        queries = {
+            'last_day': ("SELECT COUNT(*) FROM published_news "
+                         "WHERE posted_to_tg >= datetime('now', '-1 day')", ()),
+            'by_source_week': ("SELECT COUNT(*) FROM published_news "
+                               "WHERE source_id = ? AND posted_to_tg >= datetime('now', '-7 days')",
+                               (1,)),
+            'oldest': ("SELECT MIN(posted_to_tg) FROM published_news", ()),
+        }
+        latency = {}
+        for name, (sql, params) in queries.items():
+            started = time.perf_counter()
+            conn.execute(sql, params).fetchall()
+            latency[name] = round((time.perf_counter() - started) * 1000, 3)
+        return latency
 
     def remove_source(self, name: str) -> bool:
         """Деактивировать источник"""
         try:
-            conn = sqlite3.connect(self.db_file)
-            cursor = conn.cursor()
-            cursor.execute('UPDATE sources SET active = 0 WHERE name = ?', (name,))
-            conn.commit()
-            conn.close()
+            with self._conn() as conn:
+                cursor = conn.execute('UPDATE sources SET active = 0 WHERE name = ?', (name,))
             return cursor.rowcount > 0
         except Exception as e:
             logger.error(f"Ошибка при удалении источника: {e}")
@@ -130,61 +757,304 @@ class NewsDatabase:
 
 
 # ==================== ПАРСЕРЫ ====================
+def _entry_ts(entry) -> Optional[int]:
+    """Время публикации записи (UTC, сек)"""
+    published_parsed = entry.get('published_parsed') or entry.get('updated_parsed')
+    return calendar.timegm(published_parsed) if published_parsed else None
+
+
+def _parse_feed(content: bytes, url: str, source_name: Optional[str] = None,
+                watermark: Optional[Dict] = None, tweet_links: bool = False) -> Dict:
+    """
+    Разобрать RSS/Atom документ (выполняется в пуле, вне event loop).
+    Записи разбираются от новых к старым до первой уже виденной (watermark
+    прошлого опроса), но не больше FEED_MAX_ENTRIES; у нового источника без
+    watermark - FEED_INITIAL_ENTRIES. tweet_links - ссылки зеркала Nitter -> x.com.
+    Возвращает {'articles', 'entry_times', 'watermark', 'truncated'}.
+    """
+    feed = feedparser.parse(content)
+    if feed.bozo:
+        logger.warning(f"RSS feed может быть некорректным: {url}")
+    
+    source = source_name or feed.feed.get('title', 'Unknown')
+    entries = feed.entries
+    if len(entries) > 1:
+        first, last = _entry_ts(entries[0]), _entry_ts(entries[-1])
+        if first and last and first < last:
+            entries = entries[::-1]  # Feed от старых к новым
+    limit = FEED_MAX_ENTRIES if watermark else FEED_INITIAL_ENTRIES
+    articles = []
+    new_watermark = None
+    truncated = False
+    for entry in entries:
+        link = entry.get('link', '')
+        if tweet_links:
+            link = canonical_tweet_link(link)
+        key = url_key(link)  # Ключ дедупликации канонического URL
+        # guid зеркала Nitter зависит от зеркала - для твитов guid = ссылка на x.com
+        guid = link if tweet_links else entry.get('id') or link
+        published_ts = _entry_ts(entry)
+        if new_watermark is None:
+            # Дата из будущего не должна навсегда отсечь все следующие записи
+            new_watermark = {'last_guid': guid, 'last_link_hash': key,
+                             'last_published_ts': min(published_ts, time.time()) if published_ts else None}
+        if watermark and is_seen(watermark, guid, key, published_ts):
+            break
+        if len(articles) >= limit:
+            truncated = bool(watermark)
+            break
+        articles.append(Article(
+            title=entry.get('title', 'No title'),
+            link=link,
+            url_key=key,
+            # Теги <category> feed'а - для правил маршрутизации
+            categories=[tag['term'] for tag in entry.get('tags', []) if tag.get('term')],
+            summary=entry.get('summary', '')[:500],
+            published=entry.get('published', ''),
+            # Время публикации (UTC, сек) - по нему PollScheduler оценивает частоту
+            published_ts=published_ts,
+            source=source,
+        ))
+    if truncated:
+        logger.warning(f"В feed'е больше {limit} новых записей, старые пропущены: {url}")
+    return {
+        'articles': articles,
+        # Даты последних записей, даже уже виденных - для оценки частоты публикаций
+        'entry_times': [t for t in map(_entry_ts, entries[:FEED_INITIAL_ENTRIES]) if t],
+        'watermark': new_watermark,
+        'truncated': truncated,
+    }
+
+
+def _parser_mp_context():
+    """
+    Контекст процессов пула разбора. К первому разбору в процессе уже есть
+    потоки (писатель БД, пул чтения, to_thread, профайлер): fork унаследовал
+    бы их блокировки, и логирование в воркере могло бы зависнуть. forkserver
+    запускает воркеры из чистого процесса; модуль бота загружается в нём
+    один раз (preload), иначе каждый воркер заново импортировал бы aiogram.
+    """
+    if 'forkserver' not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('spawn')
+    context = multiprocessing.get_context('forkserver')
+    context.set_forkserver_preload([__name__])
+    return context
+
+
 class NewsParser:
-    @staticmethod
-    async def parse_rss(url: str) -> List[Dict]:
-        """Парсить RSS feed"""
-        try:
-            feed = feedparser.parse(url)
-            if feed.bozo:
-                logger.warning(f"RSS feed может быть некорректным: {url}")
-            
+    # Пул для разбора XML: 'process' или 'thread' (PARSER_POOL в .env)
+    _executor: Optional[Executor] = None
+    pool_type = PARSER_POOL
+    pool_workers = PARSER_WORKERS
+
+    def __init__(self, http: Optional[HttpClient] = None, nitter: Optional[NitterPool] = None,
+                 metrics: Optional[MetricsRegistry] = None):
+        self.http = http or HttpClient()
+        self.nitter = nitter or NitterPool(self.http, NITTER_MIRRORS)
+        metrics = metrics or MetricsRegistry()
+        self._bytes = metrics.counter(
+            'news_fetch_bytes_total', 'Скачано байт тела feed\'а', ['source'])
+        self._parse_seconds = metrics.histogram(
+            'news_parse_seconds', 'Разбор feed\'а, сек (pool - целиком, stream - по кускам)', ['mode'])
+
+    @classmethod
+    def _get_executor(cls) -> Executor:
+        if cls._executor is None:
+            if cls.pool_type == 'process':
+                cls._executor = ProcessPoolExecutor(max_workers=cls.pool_workers,
+                                                    mp_context=_parser_mp_context())
+            else:
+                cls._executor = ThreadPoolExecutor(max_workers=cls.pool_workers,
+                                                   thread_name_prefix="feed-parser")
+        return cls._executor
+
+    @classmethod
+    def shutdown_pool(cls):
+        """Остановить пул разбора"""
+        if cls._executor is not None:
+            cls._executor.shutdown(wait=False, cancel_futures=True)
+            cls._executor = None
+
+    @classmethod
+    async def _parse_in_pool(cls, content: bytes, url: str, source_name: Optional[str] = None,
+                             watermark: Optional[Dict] = None, tweet_links: bool = False) -> Dict:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            cls._get_executor(),
+            functools.partial(_parse_feed, content, url, source_name,
+                              watermark=watermark, tweet_links=tweet_links)
+        )
+
+    async def _download(self, url: str, validators: Optional[Dict] = None,
+                        stream_options: Optional[Dict] = None) -> Dict:
+        """
+        Скачать feed через общий HTTP клиент.
+        С validators отправляется условный GET (If-None-Match / If-Modified-Since).
+        HTTP ошибки пробрасываются как aiohttp.ClientResponseError.
+        Тело читается кусками: до FEED_STREAM_THRESHOLD копится целиком
+        ('content'), дальше разбирается StreamingFeedParser на лету ('parsed',
+        stream_options - его параметры) и чтение прекращается, как только
+        разбор дошёл до watermark. Тело больше FEED_MAX_BYTES - FeedTooLarge.
+        """
+        headers = {}
+        if validators:
+            if validators.get('etag'):
+                headers['If-None-Match'] = validators['etag']
+            if validators.get('last_modified'):
+                headers['If-Modified-Since'] = validators['last_modified']
+        
+        async with self.http.get(url, headers=headers) as resp:
+            if resp.status == 304:
+                if not headers:
+                    # 304 без условного запроса - сравнивать не с чем, считаем ошибкой
+                    raise ClientResponseError(resp.request_info, resp.history, status=304,
+                                              message="Not Modified без условного запроса",
+                                              headers=resp.headers)
+                return {'status': 304, 'content': None, 'bytes': 0,
+                        'etag': validators.get('etag'),
+                        'last_modified': validators.get('last_modified')}
+            resp.raise_for_status()
+            if resp.content_length is not None and resp.content_length > FEED_MAX_BYTES:
+                raise FeedTooLarge(f"{resp.content_length} байт (лимит {FEED_MAX_BYTES}): {url}")
+            digest = hashlib.sha1()
+            body = bytearray()
+            size = 0
+            stream = None
             articles = []
-            for entry in feed.entries[:10]:  # Последние 10 статей
-                articles.append({
-                    'title': entry.get('title', 'No title'),
-                    'link': entry.get('link', ''),
-                    'summary': entry.get('summary', '')[:500],
-                    'published': entry.get('published', ''),
-                    'source': feed.feed.get('title', 'Unknown')
+            parse_seconds = 0.0
+            async for chunk in resp.content.iter_chunked(FEED_CHUNK_SIZE):
+                size += len(chunk)
+                if size > FEED_MAX_BYTES:
+                    raise FeedTooLarge(f"больше {FEED_MAX_BYTES} байт: {url}")
+                digest.update(chunk)
+                if stream is None:
+                    body += chunk
+                    if size <= FEED_STREAM_THRESHOLD:
+                        continue
+                    stream = StreamingFeedParser(limit=FEED_MAX_ENTRIES,
+                                                 initial_limit=FEED_INITIAL_ENTRIES,
+                                                 **(stream_options or {}))
+                    chunk, body = bytes(body), None
+                # Разбор куска - вне event loop; остаток тела после done не скачивается
+                started = time.perf_counter()
+                articles += await asyncio.to_thread(stream.feed, chunk)
+                parse_seconds += time.perf_counter() - started
+                if stream.done:
+                    break
+            result = {'status': resp.status, 'content': None, 'parsed': None, 'bytes': size,
+                      # При досрочной остановке - хэш прочитанной части
+                      'content_hash': digest.hexdigest(),
+                      'etag': resp.headers.get('ETag'),
+                      'last_modified': resp.headers.get('Last-Modified')}
+            if stream is None:
+                result['content'] = bytes(body)
+                return result
+        started = time.perf_counter()
+        articles += await asyncio.to_thread(stream.close)
+        result['parse_seconds'] = parse_seconds + time.perf_counter() - started
+        logger.info(f"Потоковый разбор {url}: прочитано {size} байт, "
+                    f"записей {stream.entries_seen}, новых {len(articles)}")
+        result['parsed'] = stream.result(articles)
+        return result
+
+    async def _parse_response(self, resp: Dict, url: str, source_name: Optional[str] = None,
+                              watermark: Optional[Dict] = None, tweet_links: bool = False) -> Dict:
+        """Разбор ответа: уже разобранный на лету или целиком в пуле"""
+        if resp.get('parsed') is not None:
+            return resp['parsed']
+        return await self._parse_in_pool(resp['content'], url, source_name,
+                                         watermark=watermark, tweet_links=tweet_links)
+
+    def source_feed_url(self, source: Dict) -> str:
+        """URL RSS, который скачивается для источника (для twitter - текущее лучшее зеркало)"""
+        if source['type'] == 'twitter':
+            return f"{self.nitter.primary}/{source['url']}/rss"
+        return source['url']
+
+    async def fetch_source(self, source: Dict, validators: Optional[Dict] = None) -> Dict:
+        """
+        Скачать и разобрать источник с учётом кэша валидаторов.
+        Возвращает {'articles', 'entry_times', 'not_modified', 'validators'};
+        при 304 или неизменившемся теле разбор пропускается, иначе в articles
+        только записи новее watermark из validators. Ошибки пробрасываются.
+        """
+        url = self.source_feed_url(source)
+        source_name = 'Яндекс.Дзен' if source['type'] == 'zen' else None
+        tweet_links = source['type'] == 'twitter'
+        watermark = {field: (validators or {}).get(field) for field in WATERMARK_FIELDS}
+        has_watermark = watermark['last_guid'] is not None or watermark['last_link_hash'] is not None
+        # При потоковом разборе fetch включает и разбор кусков (он же отдельно - в parse)
+        with span('fetch', source=source['name']):
+            if tweet_links:
+                # Зеркала отдают разные ETag - условный GET не работает, сравнивается хэш тела
+                resp = await self.nitter.fetch(source['url'])
+                url = f"{resp['mirror']}/{source['url']}/rss"
+                resp['bytes'] = len(resp['content'])
+            else:
+                resp = await self._download(url, validators, {
+                    'watermark': watermark if has_watermark else None,
+                    'source_name': source_name,
                 })
-            return articles
+        self._bytes.inc(resp['bytes'], source=source['name'])
+        
+        if resp['status'] == 304:
+            content_hash = validators.get('content_hash')
+        else:
+            content_hash = resp.get('content_hash') or hashlib.sha1(resp['content']).hexdigest()
+        new_validators = {
+            'source_id': source['id'],
+            'etag': resp['etag'],
+            'last_modified': resp['last_modified'],
+            'content_hash': content_hash,
+            **watermark,
+        }
+        
+        if resp['status'] == 304 or (validators and validators.get('content_hash') == content_hash):
+            return {'articles': [], 'entry_times': [], 'not_modified': True,
+                    'validators': new_validators}
+        
+        if resp.get('parsed') is not None:
+            parsed = resp['parsed']
+            self._parse_seconds.observe(resp['parse_seconds'], mode='stream')
+            record('parse', resp['parse_seconds'], source=source['name'], mode='stream')
+        else:
+            with span('parse', source=source['name'], mode='pool'):
+                started = time.perf_counter()
+                parsed = await self._parse_in_pool(resp['content'], url, source_name,
+                                                   watermark=watermark if has_watermark else None,
+                                                   tweet_links=tweet_links)
+                self._parse_seconds.observe(time.perf_counter() - started, mode='pool')
+        if parsed['watermark'] is not None:
+            new_validators.update(parsed['watermark'])
+        return {'articles': parsed['articles'], 'entry_times': parsed['entry_times'],
+                'not_modified': False, 'validators': new_validators}
+
+    async def parse_rss(self, url: str) -> List[Article]:
+        """Парсить RSS feed"""
+        try:
+            resp = await self._download(url)
+            return (await self._parse_response(resp, url))['articles']
         except Exception as e:
             logger.error(f"Ошибка при парсинге RSS {url}: {e}")
             return []
 
-    @staticmethod
-    async def parse_zen(zen_url: str) -> List[Dict]:
+    async def parse_zen(self, zen_url: str) -> List[Article]:
         """Парсить канал Яндекс.Дзен (через RSS feed Дзена)"""
         # Дзен предоставляет RSS по адресу: https://dzen.ru/feed/rss/?channel_name=CHANNEL_NAME
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(zen_url, timeout=aiohttp.ClientTimeout(total=10)) as resp:
-                    if resp.status == 200:
-                        text = await resp.text()
-                        feed = feedparser.parse(text)
-                        
-                        articles = []
-                        for entry in feed.entries[:10]:
-                            articles.append({
-                                'title': entry.get('title', 'No title'),
-                                'link': entry.get('link', ''),
-                                'summary': entry.get('summary', '')[:500],
-                                'published': entry.get('published', ''),
-                                'source': 'Яндекс.Дзен'
-                            })
-                        return articles
+            resp = await self._download(zen_url, stream_options={'source_name': 'Яндекс.Дзен'})
+            return (await self._parse_response(resp, zen_url, 'Яндекс.Дзен'))['articles']
         except Exception as e:
             logger.error(f"Ошибка при парсинге Дзена: {e}")
         return []
 
-    @staticmethod
-    async def parse_twitter_rss(twitter_user: str) -> List[Dict]:
+    async def parse_twitter_rss(self, twitter_user: str) -> List[Article]:
         """Парсить твиты пользователя X/Twitter через RSS агрегатор"""
-        # Используем сервис nitter.net для RSS питания
+        # RSS отдают зеркала Nitter; пул выбирает самое быстрое и надёжное
         try:
-            rss_url = f"https://nitter.net/{twitter_user}/rss"
-            return await NewsParser.parse_rss(rss_url)
+            resp = await self.nitter.fetch(twitter_user)
+            parsed = await self._parse_in_pool(resp['content'], resp['mirror'], tweet_links=True)
+            return parsed['articles']
         except Exception as e:
             logger.error(f"Ошибка при парсинге Twitter: {e}")
         return []
@@ -203,12 +1073,129 @@ class NewsBot:
         self.bot = Bot(token=token)
         self.storage = MemoryStorage()
         self.dp = Dispatcher(storage=self.storage)
-        self.db = NewsDatabase()
-        self.parser = NewsParser()
+        self.metrics = MetricsRegistry()
+        self.tracer = Tracer(
+            trace_file=TRACE_FILE,
+            slow_budget=TRACE_SLOW_CYCLE,
+            profile=PROFILE_SLOW_CYCLES,
+            profile_dir=PROFILE_DIR,
+            profile_interval=PROFILE_INTERVAL,
+            metrics=self.metrics,
+        )
+        self.db = AsyncNewsDatabase(
+            NewsDatabase(),
+            url_cache=PublishedUrlCache(lru_size=URL_LRU_SIZE, fp_rate=BLOOM_FP_RATE),
+        )
+        self.http = HttpClient(
+            limit=HTTP_POOL_LIMIT,
+            limit_per_host=HTTP_POOL_PER_HOST,
+            dns_ttl=HTTP_DNS_TTL,
+            keepalive_timeout=HTTP_KEEPALIVE,
+            connect_timeout=HTTP_CONNECT_TIMEOUT,
+            read_timeout=HTTP_READ_TIMEOUT,
+        )
+        self.nitter = NitterPool(
+            self.http,
+            NITTER_MIRRORS,
+            hedge_after=NITTER_HEDGE_AFTER,
+            request_timeout=NITTER_TIMEOUT,
+            cache_ttl=NITTER_CACHE_TTL,
+        )
+        self.parser = NewsParser(self.http, self.nitter, metrics=self.metrics)
+        self.sender = SendScheduler(
+            global_rate=TG_GLOBAL_RATE,
+            per_chat_rate=TG_CHAT_RATE / 60,
+            per_chat_burst=TG_CHAT_BURST,
+            max_retries=TG_MAX_RETRIES,
+            metrics=self.metrics,
+        )
+        self.outbox = OutboxWorker(
+            self.db,
+            self._send_outbox_item,
+            batch_size=OUTBOX_BATCH,
+            max_attempts=OUTBOX_MAX_ATTEMPTS,
+            backoff_base=OUTBOX_BACKOFF_BASE,
+            backoff_max=OUTBOX_BACKOFF_MAX,
+            metrics=self.metrics,
+            tracer=self.tracer,
+        )
+        self.retention = RetentionWorker(
+            self.db,
+            retention_days=RETENTION_DAYS,
+            batch_size=RETENTION_BATCH,
+            interval=RETENTION_INTERVAL,
+            archive_file=RETENTION_ARCHIVE_FILE,
+            convert_vacuum=RETENTION_CONVERT_VACUUM,
+            count_rows=RETENTION_COUNT_ROWS,
+        )
+        self.dedup = NearDuplicateDetector(
+            self.db,
+            max_distance=NEAR_DUP_DISTANCE,
+            window_hours=NEAR_DUP_WINDOW_HOURS,
+        ) if NEAR_DUP_ENABLED else None
+        self.categorizer = BatchCategorizer(
+            load_categories(CATEGORIES_FILE),
+        ) if CATEGORIZER_ENABLED else None
+        self.router: Optional[RoutingIndex] = None
+        self.poller = PollScheduler(
+            self.db,
+            functools.partial(self.run_fetch_cycle, reason='poll'),
+            min_interval=POLL_MIN_INTERVAL,
+            max_interval=POLL_MAX_INTERVAL,
+            default_interval=POLL_DEFAULT_INTERVAL,
+            jitter=POLL_JITTER,
+            rate_factor=POLL_RATE_FACTOR,
+            backoff=POLL_BACKOFF,
+        )
+        self.fetcher = FetchEngine(
+            self.parser,
+            concurrency=FETCH_CONCURRENCY,
+            per_host_limit=FETCH_PER_HOST_LIMIT,
+            source_timeout=FETCH_SOURCE_TIMEOUT,
+            metrics=self.metrics,
+        )
+        self.fetches = FetchCoordinator(self._fetch_cycle)
+        self.health = SourceHealth(
+            self.db,
+            failure_threshold=BREAKER_FAILURES,
+            backoff_base=BREAKER_BACKOFF_BASE,
+            backoff_max=BREAKER_BACKOFF_MAX,
+        )
+        self._register_metrics()
+        # Счётчики продолжаются с сохранённых до первого цикла (он сохраняет их снова);
+        # зарегистрированные позже (AdvancedNewsBot) получат свои значения при регистрации
+        self.metrics.restore(self.db.sync.load_metric_counters())
+        self.metrics_server = MetricsServer(
+            self.metrics, host=METRICS_HOST, port=METRICS_PORT) if METRICS_PORT else None
         
         # Регистрация хендлеров
         self._register_handlers()
 
+    def _register_metrics(self):
+        """Метрики циклов, публикации и очереди (остальные регистрируют компоненты)"""
+        m = self.metrics
+        self._cycles = m.counter('news_fetch_cycles_total', 'Выполненные циклы получения')
+        self._cycle_errors = m.counter('news_fetch_cycle_errors_total',
+                                       'Ошибки источников в циклах (загрузка и публикация)')
+        self._enqueued = m.counter('news_enqueued_total', 'Новости, поставленные в outbox', ['source'])
+        self._duplicates = m.counter('news_duplicates_total',
+                                     'Отсеянные дубли: url - уже опубликован, near - перепечатка',
+                                     ['kind'])
+        self._last_fetch = m.gauge('news_last_fetch_timestamp_seconds', 'Конец последнего цикла, unixtime')
+        m.gauge('news_bot_start_time_seconds', 'Время запуска процесса, unixtime').set(time.time())
+        queue_depth = m.gauge('news_outbox_queue', 'Строки outbox по статусам', ['status'])
+
+        async def collect_outbox():
+            counts = await self.db.get_outbox_stats()
+            for status in ('pending', 'sent', 'failed', *counts):
+                queue_depth.set(counts.get(status, 0), status=status)
+
+        m.add_collector(collect_outbox)
+
+    async def save_metrics(self):
+        """Сохранить счётчики метрик в БД (переживают перезапуск)"""
+        await self.db.save_metric_counters(self.metrics.counter_rows())
+
     def _register_handlers(self):
         """Регистрация всех хендлеров"""
         # Команды администратора
@@ -218,6 +1205,9 @@ class NewsBot:
         self.dp.message.register(self.cmd_remove_source, Command("remove_source"))
         self.dp.message.register(self.cmd_list_sources, Command("sources"))
         self.dp.message.register(self.cmd_fetch_news, Command("fetch"))
+        self.dp.message.register(self.cmd_add_route, Command("add_route"))
+        self.dp.message.register(self.cmd_remove_route, Command("remove_route"))
+        self.dp.message.register(self.cmd_list_routes, Command("routes"))
         
         # ФСМ обработчики
         self.dp.message.register(self.process_source_name, 
@@ -242,8 +1232,15 @@ class NewsBot:
 /remove_source - Удалить источник
 /sources - Список активных источников
 /fetch - Получить новости прямо сейчас
+/routes - Правила рассылки по каналам
+/add_route - Добавить правило:
+  /add_route @channel source=Habr category=AI keywords=нейросет*, machine learning
+/remove_route <номер> - Удалить правило
 /help - Эта справка
 
+🧭 Пока правил нет, новости идут во все каналы из TELEGRAM_CHANNELS.
+Условия правила необязательны; если их несколько - должны выполниться все.
+
 📝 Поддерживаемые типы источников:
 • rss - RSS feed
 • zen - Яндекс.Дзен
@@ -292,7 +1289,7 @@ class NewsBot:
             return
         
         data = await state.get_data()
-        added = self.db.add_source(data['name'], data['url'], source_type)
+        added = await self.db.add_source(data['name'], data['url'], source_type)
         
         await state.clear()
         
@@ -307,7 +1304,7 @@ class NewsBot:
             await message.answer("❌ У вас нет прав администратора")
             return
         
-        sources = self.db.get_active_sources()
+        sources = await self.db.get_active_sources()
         if not sources:
             await message.answer("📭 Нет активных источников")
             return
@@ -321,7 +1318,8 @@ class NewsBot:
 
     async def cmd_list_sources(self, message: types.Message):
         """Список источников"""
-        sources = self.db.get_active_sources()
+        sources = await self.db.get_active_sources()
+        await self.health.load()
         
         if not sources:
             await message.answer("📭 Нет активных источников")
@@ -331,10 +1329,72 @@ class NewsBot:
         for source in sources:
             text += f"• {source['name']}\n"
             text += f"  Тип: {source['type']}\n"
-            text += f"  URL: {source['url']}\n\n"
+            text += f"  URL: {source['url']}\n"
+            text += f"  {self.health.describe(source['id'])}\n"
+            schedule = self.poller.describe(source['id'])
+            if schedule:
+                text += f"  ⏱️ {schedule}\n"
+            text += "\n"
         
         await message.answer(text)
 
+    async def cmd_add_route(self, message: types.Message):
+        """Добавить правило маршрутизации"""
+        if message.from_user.id != ADMIN_ID:
+            await message.answer("❌ У вас нет прав администратора")
+            return
+        
+        _, _, args = (message.text or '').partition(' ')
+        try:
+            rule = parse_route_args(args)
+        except ValueError as e:
+            await message.answer(f"❌ {e}\nПример: /add_route @channel source=Habr keywords=AI")
+            return
+        
+        source_id = None
+        if rule['source']:
+            sources = {s['name']: s['id'] for s in await self.db.get_active_sources()}
+            if rule['source'] not in sources:
+                await message.answer(f"❌ Источник «{rule['source']}» не найден")
+                return
+            source_id = sources[rule['source']]
+        
+        rule_id = await self.db.add_routing_rule(
+            rule['channel_id'], source_id, rule['category'], rule['keywords']
+        )
+        await self.reload_routes()
+        await message.answer(f"✅ Правило #{rule_id} добавлено")
+
+    async def cmd_remove_route(self, message: types.Message):
+        """Удалить правило маршрутизации по номеру"""
+        if message.from_user.id != ADMIN_ID:
+            await message.answer("❌ У вас нет прав администратора")
+            return
+        
+        _, _, arg = (message.text or '').partition(' ')
+        if not arg.strip().lstrip('#').isdigit():
+            await message.answer("❌ Укажите номер правила: /remove_route 3")
+            return
+        
+        if await self.db.remove_routing_rule(int(arg.strip().lstrip('#'))):
+            await self.reload_routes()
+            await message.answer("✅ Правило удалено")
+        else:
+            await message.answer("❌ Правило не найдено")
+
+    async def cmd_list_routes(self, message: types.Message):
+        """Список правил маршрутизации"""
+        router = await self.get_router()
+        if not len(router):
+            await message.answer(
+                "📭 Правил нет - новости идут во все каналы по умолчанию: "
+                f"{', '.join(map(str, CHANNELS)) or 'не заданы'}"
+            )
+            return
+        
+        sources = {s['id']: s['name'] for s in await self.db.get_active_sources()}
+        await message.answer("🧭 Правила рассылки:\n\n" + "\n".join(router.describe(sources)))
+
     async def cmd_fetch_news(self, message: types.Message):
         """Получить и опубликовать новости"""
         if message.from_user.id != ADMIN_ID:
@@ -343,65 +1403,206 @@ class NewsBot:
         
         status = await message.answer("⏳ Загрузка новостей...")
         
-        sources = self.db.get_active_sources()
-        news_count = 0
+        result = await self.run_fetch_cycle(reason='manual')
         
-        for source in sources:
-            articles = []
-            
-            try:
-                if source['type'] == 'rss':
-                    articles = await self.parser.parse_rss(source['url'])
-                elif source['type'] == 'zen':
-                    articles = await self.parser.parse_zen(source['url'])
-                elif source['type'] == 'twitter':
-                    articles = await self.parser.parse_twitter_rss(source['url'])
-                
-                for article in articles:
-                    if not self.db.is_news_published(article['link']):
-                        await self._post_news_to_channels(article, source)
-                        self.db.add_published_news(source['id'], article['title'], 
-                                                 article['link'], datetime.now())
-                        news_count += 1
-                        await asyncio.sleep(1)  # Задержка между постами
-            
-            except Exception as e:
-                logger.error(f"Ошибка при получении новостей из {source['name']}: {e}")
-        
-        await status.edit_text(f"✅ Опубликовано новостей: {news_count}")
+        await status.edit_text(
+            ("🔁 Цикл уже шёл - показан его результат\n" if result['joined'] else "")
+            + f"✅ Новых новостей в очереди на отправку: {result['published']}\n"
+            f"♻️ Без изменений: {result['cache_hits']} из {result['sources']} источников"
+            + (f"\n⛔ Пропущено недоступных источников: {result['skipped']}" if result['skipped'] else "")
+        )
+
+    async def run_fetch_cycle(self, sources: Optional[List[Dict]] = None,
+                              reason: str = 'manual') -> Dict:
+        """
+        Запросить цикл получения (по умолчанию - все источники).
+        /fetch, cron и адаптивный опрос идут через FetchCoordinator:
+        одновременно выполняется только один цикл, остальные запуски
+        присоединяются к нему или сливаются в один следующий.
+        """
+        return await self.fetches.trigger(sources, reason)
+
+    async def _fetch_cycle(self, sources: Optional[List[Dict]] = None) -> Dict:
+        """
+        Один цикл: параллельно загрузить источники и опубликовать новое.
+        Источники с открытым breaker'ом (SourceHealth) пропускаются до пробы.
+        Итоги по источникам уходят в PollScheduler, поэтому ручной /fetch
+        тоже сдвигает их следующий опрос. Стадии цикла пишутся в трассу (Tracer).
+        """
+        async with self.tracer.trace('fetch_cycle') as trace:
+            if sources is None:
+                sources = await self.db.get_active_sources()
+            await self.health.load()
+            sources, skipped = self.health.split(sources)
+            for source in skipped:
+                self.poller.defer(source['id'], self.health.retry_at(source['id']))
+            validators = await self.db.get_source_validators()
 
-    async def _post_news_to_channels(self, article: Dict, source: Dict):
-        """Опубликовать новость в каналы"""
-        message_text = f"""
-📰 <b>{article['title']}</b>
+            result = await self.fetcher.run_cycle(sources, self.publish_articles, validators)
+            with span('db_write', what='source_state'):
+                await self.db.save_source_validators(result['validators'])
+                await self.poller.record(result['outcomes'])
+                for state in await self.health.record(result['outcomes']):
+                    self.poller.defer(state['source_id'], state['retry_at'])
+            result['skipped'] = len(skipped)
+            self._cycles.inc()
+            self._cycle_errors.inc(result['errors'])
+            self._last_fetch.set(time.time())
+            with span('db_write', what='metrics'):
+                await self.save_metrics()
+            trace.attrs.update(sources=result['sources'], skipped=result['skipped'],
+                               published=result['published'], errors=result['errors'])
+        return result
 
-ℹ️ Источник: {article['source']}
-🏷️ Категория: {source['name']}
+    async def get_router(self) -> RoutingIndex:
+        """Скомпилированные правила маршрутизации (загружаются при первом обращении)"""
+        if self.router is None:
+            await self.reload_routes()
+        return self.router
 
-{article['summary']}
+    async def reload_routes(self):
+        """Перекомпилировать индекс после изменения правил"""
+        self.router = RoutingIndex(await self.db.get_routing_rules(), default_channels=CHANNELS)
+        logger.info(f"🧭 Правил маршрутизации: {len(self.router)}")
 
-🔗 <a href="{article['link']}">Читать далее</a>
+    async def publish_articles(self, source: Dict, articles: List[Article]) -> int:
+        """
+        Поставить ещё не опубликованные статьи источника в outbox.
+        Новость записывается в БД до отправки, поэтому сбой между отправкой
+        и записью больше не даёт дублей; отправляет OutboxWorker.
+        Перепечатки (см. NearDuplicateDetector) записываются без строк outbox,
+        остальные одной пачкой категоризируются (BatchCategorizer),
+        каналы каждой статьи выбирает RoutingIndex.
         """
+        router = await self.get_router()
+        with span('dedup', source=source['name'], articles=len(articles)):
+            fresh, fresh_rows, duplicates = await self._dedup(source, articles)
+        with span('filter', source=source['name'], articles=len(fresh)):
+            if self.categorizer is not None and fresh:
+                fresh = self.categorizer.annotate(fresh)
+            rows = []
+            for article, row in zip(fresh, fresh_rows):
+                row['channels'] = router.route(article, source)
+                row['payload'] = json.dumps({'article': article.to_dict(),
+                                             'source': {'name': source['name']}},
+                                            ensure_ascii=False)
+                rows.append(row)
+        with span('db_write', what='outbox', source=source['name'], rows=len(rows)):
+            if duplicates:
+                await self.db.enqueue_news(duplicates, [])  # Запомнить URL, чтобы не проверять снова
+            if self.dedup is not None:
+                await self.dedup.expire()
+            if not rows:
+                return 0
+            try:
+                news_count = await self.db.enqueue_news(rows)
+            except Exception:
+                if self.dedup is not None:
+                    self.dedup.forget(rows)
+                raise
+        self._enqueued.inc(news_count, source=source['name'])
+        self.outbox.notify()
+        return news_count
+
+    async def _dedup(self, source: Dict, articles: List[Article]):
+        """Отсеять уже опубликованные ссылки и перепечатки: (новые, их строки, перепечатки)"""
+        seen = await self.db.get_published_keys([article.url_key for article in articles])
+        fresh, fresh_rows, duplicates = [], [], []
+        for article in articles:
+            if article.url_key in seen:
+                self._duplicates.inc(kind='url')
+                continue
+            seen.add(article.url_key)  # Та же ссылка повторно внутри одного feed'а
+            row = {
+                'source_id': source['id'],
+                'title': article.title,
+                'url': article.link,
+                'url_hash': article.url_key,
+                'published_at': datetime.now(),
+            }
+            if self.dedup is not None:
+                if self.dedup.check(article) is not None:
+                    logger.info(f"♻️ Перепечатка пропущена: {article.title} ({article.link})")
+                    duplicates.append({**row, 'payload': None})
+                    self._duplicates.inc(kind='near')
+                    continue
+                if article.simhash:
+                    row['simhash'] = to_signed(article.simhash)
+            fresh.append(article)
+            fresh_rows.append(row)
+        return fresh, fresh_rows, duplicates
+
+    @staticmethod
+    def _render_news(article: Article, source: Dict):
+        """Текст и клавиатура сообщения с новостью"""
+        message_text = article.render(source['name'])
         
         keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="Читать источник", url=article['link'])]
+            [InlineKeyboardButton(text="Читать источник", url=article.link)]
         ])
-        
-        for channel_id in CHANNELS:
+        return message_text, keyboard
+
+    async def _send_news(self, channel_id, article: Article, source: Dict):
+        """Отправить новость в один канал в пределах лимитов Telegram"""
+        with span('render', chat=channel_id):
+            message_text, keyboard = self._render_news(article, source)
+        # Ожидание лимитов Telegram входит в send
+        with span('send', chat=channel_id):
+            await self.sender.send(channel_id, lambda: self.bot.send_message(
+                chat_id=channel_id,
+                text=message_text,
+                reply_markup=keyboard,
+                parse_mode="HTML"
+            ))
+
+    async def _send_outbox_item(self, channel_id: str, payload: Dict):
+        """Отправка строки outbox (вызывается OutboxWorker)"""
+        await self._send_news(channel_id, Article.from_dict(payload['article']), payload['source'])
+
+    async def _post_news_to_channels(self, article: Article, source: Dict):
+        """Опубликовать новость в каналы сразу, минуя outbox"""
+        async def send_to(channel_id):
             try:
-                await self.bot.send_message(
-                    chat_id=channel_id,
-                    text=message_text,
-                    reply_markup=keyboard,
-                    parse_mode="HTML"
-                )
+                await self._send_news(channel_id, article, source)
             except Exception as e:
                 logger.error(f"Ошибка при отправке в канал {channel_id}: {e}")
+        
+        # Каналы параллельно; темп задают лимиты SendScheduler, а не задержки
+        router = await self.get_router()
+        await asyncio.gather(*(send_to(channel_id)
+                               for channel_id in router.route(article, source)))
 
     async def start_polling(self):
         """Запустить polling"""
         logger.info("🚀 Бот запущен!")
-        await self.dp.start_polling(self.bot)
+        if self.metrics_server is not None:
+            await self.metrics_server.start()
+        # Кэш URL строится в фоне; до готовности проверки идут в БД
+        cache_task = asyncio.create_task(self.db.load_url_cache(BLOOM_CAPACITY))
+        dedup_task = asyncio.create_task(self.dedup.load()) if self.dedup is not None else None
+        # Отправка идёт независимо от загрузки; после рестарта продолжает очередь
+        self.outbox.start()
+        self.retention.start()
+        try:
+            await self.dp.start_polling(self.bot)
+        finally:
+            cache_task.cancel()
+            if dedup_task is not None:
+                dedup_task.cancel()
+            await self.close()
+
+    async def close(self):
+        """Освободить сетевые ресурсы и пул разбора"""
+        await self.poller.stop()
+        await self.outbox.stop()
+        await self.retention.stop()
+        if self.metrics_server is not None:
+            await self.metrics_server.stop()
+        await self.save_metrics()
+        await self.http.close()
+        NewsParser.shutdown_pool()
+        await self.db.close()
+        await self.bot.session.close()
 
 
 # ==================== MAIN ====================
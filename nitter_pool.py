@@ -0,0 +1,216 @@
+"""
+Пул зеркал Nitter для X/Twitter источников
+Для каждого зеркала считаются скользящие средние задержки и доли ошибок;
+запрос идёт на зеркало с наименьшим ожидаемым временем ответа. Если оно
+не ответило за hedge_after секунд, параллельно запрашивается следующее
+(hedging) - побеждает первый успешный ответ. Ошибка сразу переключает на
+следующее зеркало. Ответы кэшируются по пользователю на cache_ttl секунд.
+"""
+
+import asyncio
+import logging
+import random
+import time
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+TWITTER_BASE = "https://x.com"
+
+
+def canonical_tweet_link(link: str) -> str:
+    """
+    Ссылка на твит с любого зеркала -> https://x.com/user/status/id.
+    Иначе один твит с разных зеркал получил бы разные url_key.
+    """
+    path = urlparse(link).path
+    return f"{TWITTER_BASE}{path}" if path else link
+
+
+class NitterPool:
+    """Выбор зеркала по задержке и ошибкам, hedging и кэш ответов"""
+
+    def __init__(self, http, mirrors: List[str], hedge_after: float = 2.0,
+                 request_timeout: float = 10.0, cache_ttl: float = 60.0,
+                 smoothing: float = 0.3, error_half_life: float = 600.0):
+        if not mirrors:
+            raise ValueError("Нужно хотя бы одно зеркало Nitter")
+        self.http = http  # HttpClient
+        self.hedge_after = hedge_after
+        self.request_timeout = aiohttp.ClientTimeout(total=request_timeout)
+        self.cache_ttl = cache_ttl
+        self.smoothing = smoothing  # Вес нового замера в скользящих средних
+        self.error_half_life = error_half_life  # За сколько секунд "забывается" половина ошибок
+        self.mirrors: Dict[str, Dict] = {
+            base.rstrip('/'): {'base': base.rstrip('/'), 'latency': None, 'error_rate': 0.0,
+                               'updated_at': 0.0, 'requests': 0, 'errors': 0, 'wins': 0,
+                               'last_error': None}
+            for base in mirrors
+        }
+        self.stats = {'fetches': 0, 'cache_hits': 0, 'joined': 0, 'hedged': 0,
+                      'hedge_wins': 0, 'failovers': 0, 'failed': 0}
+        self._cache: Dict[str, tuple] = {}  # user -> (expires_at, result)
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    @property
+    def primary(self) -> str:
+        """Зеркало, которое сейчас выбрал бы пул (для логов и source_feed_url)"""
+        return self.ranked()[0]['base']
+
+    # ---------- выбор зеркала ----------
+
+    def _error_rate(self, mirror: Dict, now: float) -> float:
+        """Доля ошибок с затуханием: упавшее зеркало со временем пробуется снова"""
+        age = now - mirror['updated_at']
+        return mirror['error_rate'] * 0.5 ** (age / self.error_half_life)
+
+    def expected_latency(self, mirror: Dict, now: Optional[float] = None) -> float:
+        """Ожидаемое время до успешного ответа с учётом повторов после ошибок"""
+        now = time.monotonic() if now is None else now
+        # Незнакомое зеркало оценивается как "на грани hedging" - его стоит попробовать
+        latency = mirror['latency'] if mirror['latency'] is not None else self.hedge_after
+        return latency / max(0.05, 1.0 - self._error_rate(mirror, now))
+
+    def ranked(self) -> List[Dict]:
+        """Зеркала от лучшего к худшему (равные - в случайном порядке)"""
+        now = time.monotonic()
+        mirrors = list(self.mirrors.values())
+        random.shuffle(mirrors)
+        return sorted(mirrors, key=lambda m: self.expected_latency(m, now))
+
+    def _record(self, mirror: Dict, latency: Optional[float], error: Optional[Exception]):
+        now = time.monotonic()
+        alpha = self.smoothing
+        mirror['requests'] += 1
+        mirror['error_rate'] = (self._error_rate(mirror, now) * (1 - alpha)
+                                + (alpha if error is not None else 0.0))
+        mirror['updated_at'] = now
+        if error is not None:
+            mirror['errors'] += 1
+            mirror['last_error'] = f"{type(error).__name__}: {error}"[:200]
+        elif mirror['latency'] is None:
+            mirror['latency'] = latency
+        else:
+            mirror['latency'] += alpha * (latency - mirror['latency'])
+
+    # ---------- запросы ----------
+
+    async def _request(self, mirror: Dict, user: str) -> Dict:
+        """Один запрос к зеркалу; ошибки HTTP и не-RSS ответы пробрасываются"""
+        started = time.monotonic()
+        try:
+            async with self.http.get(f"{mirror['base']}/{user}/rss",
+                                     timeout=self.request_timeout) as resp:
+                if resp.status == 404:
+                    # Нет такого пользователя - зеркало ни при чём
+                    self._record(mirror, time.monotonic() - started, None)
+                resp.raise_for_status()
+                content = await resp.read()
+            if b'<rss' not in content[:4096]:
+                # Зеркала под лимитом отдают 200 со страницей-заглушкой
+                raise ValueError("ответ зеркала не RSS")
+        except asyncio.CancelledError:
+            raise  # Проиграл hedging - не ошибка зеркала
+        except aiohttp.ClientResponseError as e:
+            if e.status != 404:
+                self._record(mirror, None, e)
+            raise
+        except Exception as e:
+            self._record(mirror, None, e)
+            raise
+        self._record(mirror, time.monotonic() - started, None)
+        return {'status': 200, 'content': content, 'mirror': mirror['base'],
+                'etag': None, 'last_modified': None}
+
+    async def _fetch(self, user: str) -> Dict:
+        ranked = self.ranked()
+        pending: Dict[asyncio.Task, Dict] = {}
+        errors = []
+        hedged = False
+
+        def launch():
+            mirror = ranked[len(pending) + len(errors)]
+            pending[asyncio.ensure_future(self._request(mirror, user))] = mirror
+
+        launch()
+        try:
+            while pending:
+                can_hedge = not hedged and len(pending) + len(errors) < len(ranked)
+                done, _ = await asyncio.wait(pending, timeout=self.hedge_after if can_hedge else None,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedged = True
+                    self.stats['hedged'] += 1
+                    launch()
+                    continue
+                for task in done:
+                    mirror = pending.pop(task)
+                    error = task.exception()
+                    if error is None:
+                        mirror['wins'] += 1
+                        if hedged and mirror is not ranked[0]:
+                            self.stats['hedge_wins'] += 1
+                        return task.result()
+                    if isinstance(error, aiohttp.ClientResponseError) and error.status == 404:
+                        raise error
+                    errors.append(error)
+                    logger.warning(f"Зеркало Nitter {mirror['base']} не ответило для {user}: "
+                                   f"{type(error).__name__}: {error}")
+                if not pending and len(errors) < len(ranked):
+                    self.stats['failovers'] += 1
+                    launch()
+        finally:
+            for task in pending:
+                task.cancel()
+        self.stats['failed'] += 1
+        raise errors[-1]
+
+    async def fetch(self, user: str) -> Dict:
+        """
+        RSS пользователя: {'status', 'content', 'mirror', 'etag', 'last_modified'}.
+        Одновременные запросы одного пользователя объединяются, ответ
+        кэшируется на cache_ttl. Если все зеркала не ответили - последняя ошибка.
+        """
+        key = user.lower()
+        self.stats['fetches'] += 1
+        cached = self._cache.get(key)
+        if cached is not None and cached[0] > time.monotonic():
+            self.stats['cache_hits'] += 1
+            return cached[1]
+        task = self._inflight.get(key)
+        if task is not None:
+            self.stats['joined'] += 1
+            return await asyncio.shield(task)
+
+        task = asyncio.ensure_future(self._fetch(user))
+        self._inflight[key] = task
+        # Запрос доводится до конца и без вызвавшего (отменённый fetch) -
+        # убирает и кэширует его сама задача, не вызвавший
+        task.add_done_callback(lambda done: self._finish(key, done))
+        return await asyncio.shield(task)
+
+    def _finish(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if task.cancelled() or task.exception() is not None or self.cache_ttl <= 0:
+            return
+        now = time.monotonic()
+        self._cache = {k: v for k, v in self._cache.items() if v[0] > now}
+        self._cache[key] = (now + self.cache_ttl, task.result())
+
+    def get_stats(self) -> Dict:
+        now = time.monotonic()
+        return {
+            **self.stats,
+            'mirrors': [{
+                'base': m['base'],
+                'latency_ms': round(m['latency'] * 1000) if m['latency'] is not None else None,
+                'error_rate': round(self._error_rate(m, now), 3),
+                'requests': m['requests'],
+                'errors': m['errors'],
+                'wins': m['wins'],
+            } for m in self.ranked()],
+        }
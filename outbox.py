@@ -0,0 +1,126 @@
+"""
+Надёжная очередь отправки (outbox)
+Статья сначала записывается в БД вместе со строками outbox (по одной на канал),
+а отдельный потребитель отправляет их в Telegram с повторами и backoff.
+После перезапуска потребитель продолжает с невыполненных строк.
+"""
+
+import asyncio
+import json
+import logging
+import random
+import time
+from contextlib import nullcontext
+from typing import Awaitable, Callable, Dict, Optional
+
+from metrics import MetricsRegistry
+from tracing import Tracer, span
+
+logger = logging.getLogger(__name__)
+
+
+class OutboxWorker:
+    """Потребитель таблицы outbox"""
+
+    def __init__(self, db, send: Callable[[str, Dict], Awaitable],
+                 batch_size: int = 50, max_attempts: int = 8,
+                 backoff_base: float = 5.0, backoff_max: float = 3600.0,
+                 poll_interval: float = 5.0, metrics: Optional[MetricsRegistry] = None,
+                 tracer: Optional[Tracer] = None):
+        self.db = db
+        self.send = send  # send(channel_id, payload)
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.poll_interval = poll_interval
+        self.tracer = tracer
+        self.stats = {'sent': 0, 'retried': 0, 'failed': 0}
+        metrics = metrics or MetricsRegistry()
+        self._attempts = metrics.counter(
+            'news_outbox_attempts_total', 'Попытки отправки строк outbox по итогу', ['result'])
+        self._wake = asyncio.Event()
+        self._task = None
+
+    def notify(self):
+        """Появились новые строки - разбудить потребителя"""
+        self._wake.set()
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        logger.info("📤 Outbox запущен")
+        while True:
+            self._wake.clear()
+            try:
+                processed = await self.drain_once()
+            except Exception as e:
+                logger.error(f"Ошибка обработки outbox: {e}")
+                processed = 0
+            if processed:
+                continue
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def backoff(self, attempts: int) -> float:
+        """Экспоненциальная задержка перед следующей попыткой (с разбросом ±20%)"""
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (attempts - 1))
+        return delay * random.uniform(0.8, 1.2)
+
+    async def drain_once(self) -> int:
+        """Отправить одну пачку готовых к отправке строк; вернуть их число"""
+        rows = await self.db.get_due_outbox(time.time(), self.batch_size)
+        if not rows:
+            return 0
+        # Пачка идёт в темпе лимитов Telegram - бюджет медленного цикла к ней не применяется
+        trace = (self.tracer.trace('outbox', budget=0, rows=len(rows))
+                 if self.tracer is not None else nullcontext())
+        async with trace:
+            await asyncio.gather(*(self._deliver(row) for row in rows))
+        return len(rows)
+
+    async def _deliver(self, row: Dict):
+        # Результат сохраняется сразу после попытки: отправка пачки идёт
+        # в темпе лимитов Telegram, и сбой посреди неё не должен повторять уже отправленное
+        result = await self._attempt(row)
+        with span('db_write', what='outbox_status'):
+            await self.db.update_outbox([result])
+
+    async def _attempt(self, row: Dict) -> Dict:
+        attempts = row['attempts'] + 1
+        try:
+            await self.send(row['channel_id'], json.loads(row['payload']))
+            self.stats['sent'] += 1
+            self._attempts.inc(result='sent')
+            return {'id': row['id'], 'status': 'sent', 'attempts': attempts,
+                    'next_attempt_at': 0, 'last_error': None}
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            if attempts >= self.max_attempts:
+                self.stats['failed'] += 1
+                self._attempts.inc(result='failed')
+                logger.error(f"❌ Отправка в {row['channel_id']} не удалась после "
+                             f"{attempts} попыток: {row['url']} ({error})")
+                status, next_at = 'failed', 0
+            else:
+                self.stats['retried'] += 1
+                self._attempts.inc(result='retried')
+                delay = self.backoff(attempts)
+                logger.warning(f"Отправка в {row['channel_id']} не удалась ({error}), "
+                               f"повтор через {delay:.0f}с")
+                status, next_at = 'pending', time.time() + delay
+            return {'id': row['id'], 'status': status, 'attempts': attempts,
+                    'next_attempt_at': next_at, 'last_error': error}
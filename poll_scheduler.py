@@ -0,0 +1,230 @@
+"""
+Адаптивный опрос источников
+У каждого источника свой интервал: он подстраивается под частоту публикаций
+(по датам записей feed'а) и растёт, пока источник отвечает 304 или не
+приносит нового. Время следующего опроса хранится в куче, в цикл попадают
+только источники, чей срок подошёл; случайный разброс (jitter) не даёт
+источникам собираться в один момент.
+"""
+
+import asyncio
+import heapq
+import logging
+import random
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+class PollScheduler:
+    """Очередь источников по времени следующего опроса"""
+
+    def __init__(self, db, run_cycle: Callable[[List[Dict]], Awaitable[Dict]],
+                 min_interval: float = 600, max_interval: float = 7200,
+                 default_interval: float = 1800, jitter: float = 0.1,
+                 rate_factor: float = 1.0, backoff: float = 1.5,
+                 gap_smoothing: float = 0.3, max_sleep: float = 60):
+        self.db = db  # AsyncNewsDatabase
+        self.run_cycle = run_cycle  # run_cycle(sources) - NewsBot.run_fetch_cycle(reason='poll')
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.default_interval = default_interval
+        self.jitter = jitter
+        self.rate_factor = rate_factor  # Интервал = средний промежуток между записями * factor
+        self.backoff = backoff  # Множитель интервала для опроса без нового
+        self.gap_smoothing = gap_smoothing  # Вес нового замера в скользящем среднем
+        self.max_sleep = max_sleep  # Не спать дольше - чтобы заметить новые источники
+        self.states: Dict[int, Dict] = {}
+        self.stats = {'polls': 0, 'not_modified': 0, 'cycles': 0, 'rescheduled': 0}
+        self._heap: List[tuple] = []  # (next_due, source_id); устаревшие пропускаются
+        self._loaded = False
+        self._task = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        logger.info("⏱️ Адаптивный опрос источников запущен")
+        while True:
+            try:
+                await self.run_due()
+            except Exception as e:
+                logger.error(f"Ошибка планировщика опроса: {e}")
+            await asyncio.sleep(self.seconds_until_due())
+
+    # ---------- очередь ----------
+
+    def _clamp(self, interval: float) -> float:
+        return min(self.max_interval, max(self.min_interval, interval))
+
+    def _schedule(self, state: Dict, delay: float):
+        """Назначить следующий опрос через delay ± jitter"""
+        delay *= 1 + random.uniform(-self.jitter, self.jitter)
+        state['next_due'] = time.time() + delay
+        heapq.heappush(self._heap, (state['next_due'], state['source_id']))
+
+    def _new_state(self, source_id: int) -> Dict:
+        state = {'source_id': source_id, 'interval': self.default_interval,
+                 'avg_gap': None, 'not_modified': 0, 'last_new_at': None, 'next_due': 0}
+        self.states[source_id] = state
+        return state
+
+    async def _load(self):
+        """Выученные интервалы из БД (один раз, после рестарта)"""
+        if self._loaded:
+            return
+        self.states = await self.db.get_source_schedule()
+        self._loaded = True
+        now = time.time()
+        for state in self.states.values():
+            # Просроченные за время простоя - вразброс в пределах min_interval
+            if state['next_due'] <= now:
+                state['next_due'] = now + random.uniform(0, self.min_interval)
+            heapq.heappush(self._heap, (state['next_due'], state['source_id']))
+
+    async def sync_sources(self, sources: List[Dict]):
+        """Добавить новые источники в очередь и забыть удалённые"""
+        await self._load()
+        active = {source['id'] for source in sources}
+        for source_id in active - self.states.keys():
+            self._schedule(self._new_state(source_id), 0)
+        for source_id in self.states.keys() - active:
+            del self.states[source_id]  # Запись в куче отбросится при извлечении
+
+    def pop_due(self, now: Optional[float] = None) -> List[int]:
+        """Источники, чей срок опроса подошёл"""
+        now = time.time() if now is None else now
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            next_due, source_id = heapq.heappop(self._heap)
+            state = self.states.get(source_id)
+            if state is not None and state['next_due'] == next_due:
+                due.append(source_id)
+        return due
+
+    def seconds_until_due(self) -> float:
+        """Сколько спать до ближайшего опроса"""
+        while self._heap:
+            next_due, source_id = self._heap[0]
+            state = self.states.get(source_id)
+            if state is not None and state['next_due'] == next_due:
+                return min(self.max_sleep, max(0.0, next_due - time.time()))
+            heapq.heappop(self._heap)
+        return self.max_sleep
+
+    async def run_due(self) -> Optional[Dict]:
+        """Один проход: опросить источники, чей срок подошёл"""
+        sources = await self.db.get_active_sources()
+        await self.sync_sources(sources)
+        now = time.time()
+        due = set(self.pop_due(now))
+        if not due:
+            return None
+        self.stats['cycles'] += 1
+        # Результаты учитывает NewsBot.run_fetch_cycle через record()
+        try:
+            return await self.run_cycle([source for source in sources if source['id'] in due])
+        finally:
+            self._reschedule_missed(due, now)
+
+    def _reschedule_missed(self, due: Set[int], popped_at: float):
+        """
+        Вернуть в очередь источники, которые цикл не учёл через record()
+        или defer() (цикл упал или вернулся раньше): иначе они выпали бы
+        из кучи до рестарта. Интервал не меняется - как после ошибки.
+        """
+        missed = 0
+        for source_id in due:
+            state = self.states.get(source_id)
+            if state is not None and state['next_due'] <= popped_at:
+                self._schedule(state, state['interval'])
+                missed += 1
+        if missed:
+            self.stats['rescheduled'] += missed
+            logger.warning(f"Цикл опроса не учёл {missed} источников - следующий опрос по их интервалу")
+
+    # ---------- обучение ----------
+
+    @staticmethod
+    def estimate_gap(entry_times: List[float], now: float) -> Optional[float]:
+        """
+        Средний промежуток между публикациями по датам записей feed'а.
+        Окно считается до текущего момента, а не до последней записи:
+        если источник замолчал, оценка растёт сама.
+        """
+        times = [t for t in entry_times if t and t <= now]
+        if len(times) < 2:
+            return None
+        return (now - min(times)) / len(times)
+
+    def next_interval(self, state: Dict, outcome: Dict, now: float) -> float:
+        """Новый интервал источника по результату опроса"""
+        if outcome['error']:
+            return state['interval']
+        if outcome['not_modified'] or not outcome['published']:
+            return self._clamp(state['interval'] * self.backoff)
+        gap = self.estimate_gap(outcome.get('entry_times') or [], now)
+        if gap is None:
+            # Дат в feed'е нет - только ускоряемся от того, что есть новое
+            return self._clamp(state['interval'] / self.backoff)
+        if state['avg_gap'] is None:
+            state['avg_gap'] = gap
+        else:
+            state['avg_gap'] += self.gap_smoothing * (gap - state['avg_gap'])
+        return self._clamp(state['avg_gap'] * self.rate_factor)
+
+    async def record(self, outcomes: List[Dict]):
+        """Учесть результаты цикла (FetchEngine.run_cycle()['outcomes']) и сохранить"""
+        await self._load()
+        now = time.time()
+        changed = []
+        for outcome in outcomes:
+            state = self.states.get(outcome['source_id']) or self._new_state(outcome['source_id'])
+            self.stats['polls'] += 1
+            if outcome['not_modified']:
+                self.stats['not_modified'] += 1
+                state['not_modified'] += 1
+            elif not outcome['error']:
+                state['not_modified'] = 0
+            if outcome['published']:
+                state['last_new_at'] = now
+            state['interval'] = self.next_interval(state, outcome, now)
+            self._schedule(state, state['interval'])
+            changed.append(dict(state))
+        if changed:
+            await self.db.save_source_schedule(changed)
+
+    def defer(self, source_id: int, until: float):
+        """Не опрашивать источник до until (например, пока открыт breaker)"""
+        state = self.states.get(source_id)
+        if state is not None and state['next_due'] < until:
+            state['next_due'] = until
+            heapq.heappush(self._heap, (until, source_id))
+
+    def describe(self, source_id: int) -> Optional[str]:
+        """Интервал и следующий опрос источника текстом (для /sources)"""
+        state = self.states.get(source_id)
+        if state is None:
+            return None
+        wait = max(0, state['next_due'] - time.time())
+        return (f"опрос раз в {state['interval'] / 60:.0f} мин, "
+                f"следующий через {wait / 60:.0f} мин")
+
+    def get_stats(self) -> Dict:
+        intervals = sorted(state['interval'] for state in self.states.values())
+        return {
+            **self.stats,
+            'sources': len(intervals),
+            'median_interval': intervals[len(intervals) // 2] if intervals else None,
+        }
@@ -0,0 +1,126 @@
+"""
+Хранение и очистка published_news
+Фоновая задача удаляет (или архивирует) старые записи маленькими пачками
+через поток-писатель БД, чтобы не мешать публикации, и возвращает место
+ОС через incremental_vacuum
+"""
+
+import asyncio
+import logging
+import time
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class RetentionWorker:
+    """Периодическая очистка старых новостей и outbox"""
+
+    def __init__(self, db, retention_days: float = 90, batch_size: int = 1000,
+                 batch_pause: float = 0.2, interval: float = 3600,
+                 vacuum_pages: int = 2000, archive_file: Optional[str] = None,
+                 convert_vacuum: bool = False, count_rows: bool = False):
+        self.db = db  # AsyncNewsDatabase
+        self.retention_days = retention_days
+        self.batch_size = batch_size
+        self.batch_pause = batch_pause
+        self.interval = interval
+        self.vacuum_pages = vacuum_pages
+        self.archive_file = archive_file
+        self.convert_vacuum = convert_vacuum  # Старую БД - однократно в auto_vacuum=INCREMENTAL
+        self.count_rows = count_rows  # Число строк до/после в отчёте (полный COUNT(*))
+        self.last_report: Optional[Dict] = None
+        self._incremental: Optional[bool] = None  # Работает ли incremental_vacuum; None - не проверено
+        self._task = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"Ошибка очистки БД: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def _prune(self, prune, *args) -> int:
+        """Удалять пачками, уступая очередь записи между пачками"""
+        total = 0
+        while True:
+            removed = await prune(self.retention_days, self.batch_size, *args)
+            total += removed
+            if removed < self.batch_size:
+                return total
+            await asyncio.sleep(self.batch_pause)
+
+    async def _vacuum_enabled(self, auto_vacuum: int) -> bool:
+        """
+        incremental_vacuum работает только в БД с auto_vacuum=INCREMENTAL (2).
+        Старая БД переводится однократным полным VACUUM, если это разрешено
+        (convert_vacuum), иначе шаг пропускается - одной записью в логе.
+        """
+        if self._incremental is not None:
+            return self._incremental
+        if auto_vacuum == 2:
+            self._incremental = True
+        elif self.convert_vacuum:
+            logger.info("🧹 Перевод БД в auto_vacuum=INCREMENTAL (полный VACUUM, запись на это время встанет)")
+            started = time.monotonic()
+            try:
+                await self.db.convert_to_incremental_vacuum()
+                self._incremental = True
+                logger.info(f"🧹 БД переведена в auto_vacuum=INCREMENTAL за {time.monotonic() - started:.1f}с")
+            except Exception as e:
+                logger.error(f"Не удалось перевести БД в auto_vacuum=INCREMENTAL: {e}")
+                self._incremental = False
+        else:
+            logger.info("БД создана без auto_vacuum=INCREMENTAL: место не возвращается ОС, "
+                        "шаг incremental_vacuum пропускается. Для перевода - RETENTION_CONVERT_VACUUM=1")
+            self._incremental = False
+        return self._incremental
+
+    async def run_once(self) -> Dict:
+        """Один проход очистки; возвращает отчёт до/после"""
+        started = time.monotonic()
+        before = await self.db.get_storage_stats(self.count_rows)
+        latency_before = await self.db.probe_query_latency()
+
+        published = await self._prune(self.db.prune_published, self.archive_file)
+        outbox = await self._prune(self.db.prune_outbox)
+
+        # Освобождённые страницы возвращаются ОС тоже по частям
+        if await self._vacuum_enabled(before['auto_vacuum']):
+            while True:
+                free_pages = await self.db.incremental_vacuum(self.vacuum_pages)
+                if free_pages == 0:
+                    break
+                await asyncio.sleep(self.batch_pause)
+
+        after = await self.db.get_storage_stats(self.count_rows)
+        latency_after = await self.db.probe_query_latency()
+
+        self.last_report = {
+            'pruned_published': published,
+            'pruned_outbox': outbox,
+            'size_before': before['size_bytes'],
+            'size_after': after['size_bytes'],
+            'latency_ms_before': latency_before,
+            'latency_ms_after': latency_after,
+            'elapsed': round(time.monotonic() - started, 2),
+        }
+        if self.count_rows:
+            self.last_report.update(rows_before=before['published_rows'],
+                                    rows_after=after['published_rows'])
+        logger.info(f"🧹 Очистка БД: {self.last_report}")
+        return self.last_report
@@ -0,0 +1,112 @@
+"""
+Маршрутизация новостей по каналам
+Правила из таблицы routing_rules: (источник, категория, ключевые слова) -> канал.
+Пустое условие означает "любой"; непустые условия правила должны выполниться все.
+Правила компилируются в индекс: статья проверяется одним проходом по тексту.
+"""
+
+import json
+import re
+from typing import Dict, Iterable, List, Optional, Set
+
+from article import article_text
+from keyword_matcher import KeywordMatcher, normalize
+
+# /add_route @channel source=Habr category=AI keywords=machine learning, нейросет*
+_ROUTE_ARG_RE = re.compile(r"(\w+)=(.*?)(?=\s+\w+=|$)", re.S)
+
+
+def parse_route_args(text: str) -> Dict:
+    """Разобрать аргументы команды /add_route: канал и условия key=value"""
+    channel, _, rest = text.strip().partition(' ')
+    if not channel or '=' in channel:
+        raise ValueError("Первым аргументом должен быть канал (@name или ID)")
+    rule = {'channel_id': channel, 'source': None, 'category': None, 'keywords': []}
+    for key, value in _ROUTE_ARG_RE.findall(rest.strip()):
+        value = value.strip()
+        if key == 'source':
+            rule['source'] = value
+        elif key == 'category':
+            rule['category'] = value
+        elif key == 'keywords':
+            rule['keywords'] = [k.strip() for k in value.split(',') if k.strip()]
+        else:
+            raise ValueError(f"Неизвестное условие: {key}")
+    return rule
+
+
+def article_categories(article: Dict) -> Set[str]:
+    """Категории статьи в нормализованном виде (теги feed'а и вычисленные)"""
+    return {normalize(c) for c in article.get('categories', ()) if c}
+
+
+class RoutingIndex:
+    """
+    Скомпилированные правила.
+    Правила без условий на текст для источника раскрываются заранее
+    в готовое множество каналов; остальные проверяются по найденным меткам.
+    """
+
+    def __init__(self, rules: Iterable[Dict], default_channels: Iterable = ()):
+        self.rules = [dict(rule) for rule in rules]
+        # Пока правил нет, всё идёт в каналы по умолчанию (TELEGRAM_CHANNELS)
+        self.default_channels = [str(c) for c in default_channels] if not self.rules else []
+        self._static: Dict[Optional[int], Set[str]] = {}  # source_id (None - любой) -> каналы
+        self._conditional: Dict[Optional[int], List[Dict]] = {}
+        keywords = []
+        for rule in self.rules:
+            rule['channel_id'] = str(rule['channel_id'])
+            rule['category'] = normalize(rule['category']) if rule.get('category') else None
+            rule['keywords'] = rule.get('keywords') or []
+            if isinstance(rule['keywords'], str):
+                rule['keywords'] = json.loads(rule['keywords'])
+            source_id = rule.get('source_id')
+            if rule['category'] is None and not rule['keywords']:
+                self._static.setdefault(source_id, set()).add(rule['channel_id'])
+            else:
+                self._conditional.setdefault(source_id, []).append(rule)
+                keywords += [(keyword, rule['id']) for keyword in rule['keywords']]
+        self._matcher = KeywordMatcher(keywords)
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def route(self, article: Dict, source: Dict) -> List[str]:
+        """Каналы для статьи источника source"""
+        if not self.rules:
+            return list(self.default_channels)
+        source_id = source.get('id')
+        channels = set(self._static.get(None, ()))
+        channels |= self._static.get(source_id, set())
+
+        candidates = self._conditional.get(None, []) + self._conditional.get(source_id, [])
+        if candidates:
+            categories = article_categories(article)
+            matched = None  # Метки ключевых слов считаются один раз и только если нужны
+            for rule in candidates:
+                if rule['channel_id'] in channels:
+                    continue
+                if rule['category'] is not None and rule['category'] not in categories:
+                    continue
+                if rule['keywords']:
+                    if matched is None:
+                        matched = self._matcher.labels(article_text(article))
+                    if rule['id'] not in matched:
+                        continue
+                channels.add(rule['channel_id'])
+        return sorted(channels)
+
+    def describe(self, sources: Dict[int, str]) -> List[str]:
+        """Правила текстом для команды /routes"""
+        lines = []
+        for rule in self.rules:
+            conditions = []
+            if rule.get('source_id') is not None:
+                conditions.append(f"источник={sources.get(rule['source_id'], rule['source_id'])}")
+            if rule['category']:
+                conditions.append(f"категория={rule['category']}")
+            if rule['keywords']:
+                conditions.append(f"слова={', '.join(rule['keywords'])}")
+            lines.append(f"#{rule['id']} → {rule['channel_id']}: "
+                         f"{'; '.join(conditions) or 'все новости'}")
+        return lines
@@ -0,0 +1,124 @@
+"""
+Планировщик отправки сообщений в Telegram
+Token bucket на весь бот и на каждый чат, параллельная отправка в каналы
+в пределах лимитов и соблюдение retry_after при ответе 429
+"""
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+from aiogram.exceptions import TelegramRetryAfter
+
+from metrics import MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Token bucket; ожидающие обслуживаются по очереди (FIFO)"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate  # Токенов в секунду
+        self.capacity = max(1.0, capacity)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self) -> float:
+        """Взять токен; возвращает время ожидания в секундах"""
+        started = time.monotonic()
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.blocked_until:
+                    await asyncio.sleep(self.blocked_until - now)
+                    continue
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return time.monotonic() - started
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds: float):
+        """Не выдавать токены seconds секунд (ответ 429 с retry_after)"""
+        now = time.monotonic()
+        self.blocked_until = max(self.blocked_until, now + seconds)
+        self._refill(now)
+        self.tokens = 0
+
+
+class SendScheduler:
+    """Отправка в чаты с учётом общего лимита бота и лимита каждого чата"""
+
+    def __init__(self, global_rate: float = 30, per_chat_rate: float = 20 / 60,
+                 per_chat_burst: float = 3, max_retries: int = 3, global_burst: float = 1,
+                 metrics: Optional[MetricsRegistry] = None):
+        self.per_chat_rate = per_chat_rate
+        self.per_chat_burst = per_chat_burst
+        self.max_retries = max_retries
+        # Малый burst для общего лимита: ровный темп вместо всплесков x2 на границе секунды
+        self._global = TokenBucket(global_rate, global_burst)
+        self._chats: Dict[str, TokenBucket] = {}
+        self.stats = {
+            'sent': 0,
+            'failed': 0,
+            'retry_after': 0,  # Ответов 429
+            'wait_seconds': 0.0,
+        }
+        metrics = metrics or MetricsRegistry()
+        self._send_seconds = metrics.histogram(
+            'telegram_send_seconds', 'Запрос к Bot API (без ожидания лимитов), сек', ['chat'])
+        self._wait_seconds = metrics.histogram(
+            'telegram_send_wait_seconds', 'Ожидание лимитов перед отправкой, сек', ['chat'])
+        self._retry_after = metrics.counter(
+            'telegram_retry_after_total', 'Ответы 429 от Bot API', ['chat'])
+        self._failures = metrics.counter(
+            'telegram_send_failures_total', 'Неудачные отправки', ['chat'])
+
+    def _chat_bucket(self, chat_id) -> TokenBucket:
+        key = str(chat_id)
+        if key not in self._chats:
+            self._chats[key] = TokenBucket(self.per_chat_rate, self.per_chat_burst)
+        return self._chats[key]
+
+    async def send(self, chat_id, send: Callable[[], Awaitable]):
+        """
+        Выполнить send() для чата в пределах лимитов.
+        На 429 чат ставится на паузу retry_after и попытка повторяется.
+        """
+        bucket = self._chat_bucket(chat_id)
+        for attempt in range(self.max_retries + 1):
+            # Сначала токен чата, потом общий - чтобы не держать общий, ожидая чат
+            waited = await bucket.acquire()
+            waited += await self._global.acquire()
+            self.stats['wait_seconds'] += waited
+            self._wait_seconds.observe(waited, chat=chat_id)
+            started = time.perf_counter()
+            try:
+                result = await send()
+                self.stats['sent'] += 1
+                self._send_seconds.observe(time.perf_counter() - started, chat=chat_id)
+                return result
+            except TelegramRetryAfter as e:
+                self.stats['retry_after'] += 1
+                self._retry_after.inc(chat=chat_id)
+                logger.warning(f"429 для чата {chat_id}: пауза {e.retry_after}с "
+                               f"(попытка {attempt + 1}/{self.max_retries + 1})")
+                bucket.pause(e.retry_after)
+            except Exception:
+                self.stats['failed'] += 1
+                self._failures.inc(chat=chat_id)
+                raise
+        self.stats['failed'] += 1
+        self._failures.inc(chat=chat_id)
+        raise RuntimeError(f"Не удалось отправить в {chat_id}: превышено число повторов после 429")
+
+    def get_stats(self) -> Dict:
+        return {**self.stats, 'wait_seconds': round(self.stats['wait_seconds'], 2)}
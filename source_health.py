@@ -0,0 +1,130 @@
+"""
+Здоровье источников (circuit breaker)
+После нескольких ошибок подряд источник "размыкается" и не опрашивается до
+времени пробы; задержка растёт экспоненциально с каждым неудачным открытием.
+В срок пробы источник получает один запрос (half-open): успех замыкает
+цепь, ошибка открывает её снова на удвоенный срок.
+"""
+
+import logging
+import random
+import time
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class SourceHealth:
+    """Состояние breaker'а по каждому источнику"""
+
+    def __init__(self, db, failure_threshold: int = 3, backoff_base: float = 300,
+                 backoff_max: float = 21600, jitter: float = 0.1):
+        self.db = db  # AsyncNewsDatabase
+        self.failure_threshold = max(1, failure_threshold)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.jitter = jitter
+        self.states: Dict[int, Dict] = {}
+        self.stats = {'skipped': 0, 'opened': 0, 'recovered': 0}
+        self._loaded = False
+
+    async def load(self):
+        """Состояние из БД (один раз, после рестарта)"""
+        if not self._loaded:
+            self.states = await self.db.get_source_health()
+            self._loaded = True
+
+    def _state(self, source_id: int) -> Dict:
+        if source_id not in self.states:
+            self.states[source_id] = {
+                'source_id': source_id, 'state': CLOSED, 'failures': 0, 'opened': 0,
+                'retry_at': None, 'last_error': None, 'last_success_at': None,
+            }
+        return self.states[source_id]
+
+    def allow(self, source_id: int, now: Optional[float] = None) -> bool:
+        """Опрашивать ли источник сейчас (в срок пробы переводит в half-open)"""
+        state = self.states.get(source_id)
+        if state is None or state['state'] == CLOSED:
+            return True
+        now = time.time() if now is None else now
+        if state['state'] == OPEN and now >= state['retry_at']:
+            state['state'] = HALF_OPEN
+            return True
+        if state['state'] == HALF_OPEN:
+            return True  # Циклы не пересекаются (FetchCoordinator) - проба одна
+        self.stats['skipped'] += 1
+        return False
+
+    def split(self, sources: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+        """Разделить источники на опрашиваемые и пропускаемые"""
+        now = time.time()
+        allowed, skipped = [], []
+        for source in sources:
+            (allowed if self.allow(source['id'], now) else skipped).append(source)
+        return allowed, skipped
+
+    def retry_at(self, source_id: int) -> Optional[float]:
+        state = self.states.get(source_id)
+        return state['retry_at'] if state is not None and state['state'] != CLOSED else None
+
+    def _open(self, state: Dict, now: float):
+        state['opened'] += 1
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (state['opened'] - 1))
+        delay *= 1 + random.uniform(-self.jitter, self.jitter)
+        state['state'] = OPEN
+        state['retry_at'] = now + delay
+        self.stats['opened'] += 1
+
+    async def record(self, outcomes: List[Dict]) -> List[Dict]:
+        """
+        Учесть результаты цикла (FetchEngine.run_cycle()['outcomes']).
+        Считаются только ошибки загрузки ('fetch_error'), не публикации.
+        Возвращает состояния источников, чья цепь сейчас открыта.
+        """
+        await self.load()
+        now = time.time()
+        changed, opened = [], []
+        for outcome in outcomes:
+            state = self._state(outcome['source_id'])
+            if outcome.get('fetch_error'):
+                state['failures'] += 1
+                state['last_error'] = outcome['fetch_error'][:200]
+                if state['state'] == HALF_OPEN or state['failures'] >= self.failure_threshold:
+                    self._open(state, now)
+                    opened.append(state)
+                    logger.warning(f"⛔ Источник {outcome['source_id']} отключён до "
+                                   f"{time.strftime('%H:%M', time.localtime(state['retry_at']))}: "
+                                   f"{state['failures']} ошибок подряд ({state['last_error']})")
+            else:
+                if state['state'] != CLOSED:
+                    self.stats['recovered'] += 1
+                    logger.info(f"✅ Источник {outcome['source_id']} снова доступен")
+                state.update(state=CLOSED, failures=0, opened=0, retry_at=None,
+                             last_success_at=now)
+            changed.append(dict(state))
+        if changed:
+            await self.db.save_source_health(changed)
+        return opened
+
+    def describe(self, source_id: int) -> str:
+        """Здоровье источника текстом (для /sources)"""
+        state = self.states.get(source_id)
+        if state is None or (state['state'] == CLOSED and not state['failures']):
+            return "🟢 работает"
+        if state['state'] == CLOSED:
+            return f"🟡 ошибок подряд: {state['failures']} ({state['last_error']})"
+        if state['state'] == HALF_OPEN:
+            return f"🟡 пробный запрос после {state['failures']} ошибок"
+        until = time.strftime('%d.%m %H:%M', time.localtime(state['retry_at']))
+        return f"🔴 отключён до {until}: {state['failures']} ошибок подряд ({state['last_error']})"
+
+    def get_stats(self) -> Dict:
+        by_state = {CLOSED: 0, OPEN: 0, HALF_OPEN: 0}
+        for state in self.states.values():
+            by_state[state['state']] += 1
+        return {**self.stats, **by_state}
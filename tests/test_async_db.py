@@ -0,0 +1,100 @@
+import asyncio
+import sqlite3
+import time
+
+import pytest
+
+from async_db import AsyncNewsDatabase
+from news_bot import NewsDatabase
+from url_cache import PublishedUrlCache
+from url_canon import url_key
+
+URL = "https://example.com/news/1"
+
+
+def make_db(tmp_path):
+    return AsyncNewsDatabase(NewsDatabase(str(tmp_path / "news.db")), url_cache=PublishedUrlCache())
+
+
+def row():
+    return {'source_id': 1, 'title': "Новость", 'url': URL, 'published_at': None, 'payload': '{}'}
+
+
+def test_enqueue_marks_url_published(tmp_path):
+    async def run():
+        db = make_db(tmp_path)
+        try:
+            await db.enqueue_news([row()], channels=['-100'])
+            return await db.is_news_published(URL)
+        finally:
+            await db.close()
+
+    assert asyncio.run(run())
+
+
+def test_failed_enqueue_does_not_mark_url_published(tmp_path, monkeypatch):
+    async def run():
+        db = make_db(tmp_path)
+
+        def fail(*args):
+            raise sqlite3.OperationalError("database is locked")
+
+        monkeypatch.setattr(db.sync, 'enqueue_news', fail)
+        try:
+            with pytest.raises(sqlite3.OperationalError):
+                await db.enqueue_news([row()], channels=['-100'])
+            monkeypatch.undo()
+            # Строки нет - кэш не должен отвечать "опубликовано", повтор проходит
+            assert not await db.is_news_published(URL)
+            assert await db.enqueue_news([row()], channels=['-100']) == 1
+        finally:
+            await db.close()
+
+    asyncio.run(run())
+
+
+def test_failed_batch_insert_does_not_mark_urls_published(tmp_path, monkeypatch):
+    async def run():
+        db = make_db(tmp_path)
+
+        def fail(batch):
+            raise sqlite3.OperationalError("disk I/O error")
+
+        monkeypatch.setattr(db.sync, 'add_published_news_batch', fail)
+        try:
+            with pytest.raises(sqlite3.OperationalError):
+                await db.add_published_news(1, "Новость", URL, None)
+            assert url_key(URL) not in await db.get_published_keys([url_key(URL)])
+        finally:
+            await db.close()
+
+    asyncio.run(run())
+
+
+def test_close_does_not_block_event_loop(tmp_path, monkeypatch):
+    async def run():
+        db = make_db(tmp_path)
+
+        def slow_read():
+            time.sleep(0.3)
+            return []
+
+        monkeypatch.setattr(db.sync, 'get_active_sources', slow_read)
+        read = asyncio.create_task(db.get_active_sources())
+        await asyncio.sleep(0.05)  # Чтение уже идёт в пуле
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticker = asyncio.create_task(tick())
+        await db.close()  # Ждёт завершения чтения
+        ticker.cancel()
+        await read
+        return ticks
+
+    # За ~0.25 с ожидания пула чтения loop продолжал работать
+    assert asyncio.run(run()) >= 10
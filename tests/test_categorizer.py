@@ -0,0 +1,58 @@
+import random
+
+import pytest
+
+from categorizer import DEFAULT_CATEGORIES, BatchCategorizer
+from keyword_matcher import KeywordMatcher
+
+CATEGORIES = {
+    'dev': ['open source', 'python'],
+    'ai': ['машинное обучение', 'нейросет*'],
+}
+
+
+def categorize(*titles):
+    categorizer = BatchCategorizer(CATEGORIES, default=None)
+    return categorizer.categorize([{'title': title, 'summary': ''} for title in titles])
+
+
+def test_phrase_needs_only_spaces_between_words():
+    assert categorize(
+        'Новый open source проект',
+        'Новый open-source проект',
+        'Это open, source - отдельно',
+        'Open\n  Source  снова',
+    ) == [['dev'], [], [], ['dev']]
+
+
+def test_phrase_does_not_cross_articles():
+    assert categorize('Курс: машинное', 'обучение с нуля') == [[], []]
+
+
+def test_prefix_and_whole_words():
+    assert categorize('Нейросети рисуют', 'Пишем на python3', 'Python 3.12') == [
+        ['ai'], [], ['dev']]
+
+
+def test_term_with_punctuation_is_rejected():
+    with pytest.raises(ValueError):
+        BatchCategorizer({'dev': ['c++']})
+
+
+def test_matches_keyword_matcher_on_punctuated_text():
+    rng = random.Random(15)
+    terms = [t.rstrip('*') + ('ами' if t.endswith('*') else '')
+             for terms in DEFAULT_CATEGORIES.values() for t in terms]
+    vocab = ['новость', 'рынок', 'open', 'source', 'machine', 'learning', 'обучение', 'машинное']
+    separators = [' ', ' ', ' ', ', ', '-', '. ', ' - ', ': ', '\n']
+    articles = []
+    for _ in range(2000):
+        words = [rng.choice(terms if rng.random() < 0.3 else vocab) for _ in range(12)]
+        text = ''.join(word + rng.choice(separators) for word in words)
+        articles.append({'title': text[:40], 'summary': text[40:]})
+
+    categorizer = BatchCategorizer(DEFAULT_CATEGORIES)
+    reference = KeywordMatcher([(t, c) for c, terms in DEFAULT_CATEGORIES.items() for t in terms])
+    for got, article in zip(categorizer.categorize(articles), articles):
+        expected = reference.labels(f"{article['title']} {article['summary']}")
+        assert set(got) - {'general'} == expected, article
@@ -0,0 +1,51 @@
+import asyncio
+
+import pytest
+from aiohttp import ClientResponseError, web
+
+from news_bot import NewsParser
+
+FEED = (b'<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel><title>T</title>'
+        b'<item><title>One</title><link>https://example.com/1</link></item></channel></rss>')
+
+
+async def fetch(validators, always_304: bool = False):
+    async def handler(request):
+        if always_304 or request.headers.get('If-None-Match') == '"v1"':
+            return web.Response(status=304)
+        return web.Response(body=FEED, headers={'ETag': '"v1"'}, content_type='application/rss+xml')
+
+    app = web.Application()
+    app.router.add_get('/feed', handler)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    parser = NewsParser()
+    source = {'id': 1, 'name': 'Test', 'type': 'rss',
+              'url': f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}/feed"}
+    try:
+        return await parser.fetch_source(source, validators)
+    finally:
+        await parser.http.close()
+        await runner.cleanup()
+
+
+def test_full_fetch_returns_validators():
+    result = asyncio.run(fetch(None))
+    assert not result['not_modified']
+    assert [article.link for article in result['articles']] == ['https://example.com/1']
+    assert result['validators']['etag'] == '"v1"'
+
+
+def test_conditional_304_is_not_modified():
+    result = asyncio.run(fetch({'etag': '"v1"', 'content_hash': 'abc'}))
+    assert result['not_modified']
+    assert result['validators']['content_hash'] == 'abc'
+
+
+@pytest.mark.parametrize('validators', [None, {'content_hash': 'abc'}])
+def test_unconditional_304_is_an_error(validators):
+    with pytest.raises(ClientResponseError) as error:
+        asyncio.run(fetch(validators, always_304=True))
+    assert error.value.status == 304
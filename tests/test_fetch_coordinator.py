@@ -0,0 +1,132 @@
+import asyncio
+
+import pytest
+
+from fetch_engine import FetchCoordinator
+
+
+def source(source_id):
+    return {'id': source_id, 'name': f"Source {source_id}"}
+
+
+class GatedCycles:
+    """run_cycle, который ждёт release(); запоминает источники каждого цикла"""
+
+    def __init__(self, error: Exception = None):
+        self.error = error
+        self.calls = []
+        self.gates = []
+
+    async def __call__(self, sources):
+        self.calls.append(None if sources is None else sorted(s['id'] for s in sources))
+        gate = asyncio.Event()
+        self.gates.append(gate)
+        await gate.wait()
+        if self.error is not None:
+            raise self.error
+        return {'cycle': len(self.calls)}
+
+    async def release(self, index):
+        while len(self.gates) <= index:  # Цикл ещё не успел стартовать
+            await asyncio.sleep(0)
+        self.gates[index].set()
+
+
+def test_concurrent_trigger_joins_running_cycle():
+    async def run():
+        cycles = GatedCycles()
+        coordinator = FetchCoordinator(cycles)
+        first = asyncio.create_task(coordinator.trigger(reason='schedule'))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(coordinator.trigger([source(1)], reason='manual'))
+        await asyncio.sleep(0)
+        await cycles.release(0)
+        return cycles, coordinator, await first, await second
+
+    cycles, coordinator, first, second = asyncio.run(run())
+    assert cycles.calls == [None]
+    assert first == {'cycle': 1, 'joined': False}
+    assert second == {'cycle': 1, 'joined': True}
+    assert coordinator.stats['joined'] == 1
+    assert not coordinator.running
+
+
+def test_triggers_during_cycle_queue_exactly_one_follow_up():
+    async def run():
+        cycles = GatedCycles()
+        coordinator = FetchCoordinator(cycles)
+        first = asyncio.create_task(coordinator.trigger([source(1)], reason='schedule'))
+        await asyncio.sleep(0)
+        # Источники 2 и 3 не входят в идущий цикл - оба ждут один следующий
+        queued = [asyncio.create_task(coordinator.trigger([source(n)], reason='manual'))
+                  for n in (2, 3, 2)]
+        await cycles.release(0)
+        first_result = await first
+        await cycles.release(1)
+        return cycles, coordinator, first_result, await asyncio.gather(*queued)
+
+    cycles, coordinator, first, queued = asyncio.run(run())
+    assert cycles.calls == [[1], [2, 3]]
+    assert first == {'cycle': 1, 'joined': False}
+    assert queued == [{'cycle': 2, 'joined': False},
+                      {'cycle': 2, 'joined': True},
+                      {'cycle': 2, 'joined': True}]
+    assert coordinator.stats['cycles'] == 2
+    assert coordinator.stats['coalesced'] == 2
+
+
+def test_follow_up_for_all_sources_when_any_trigger_wants_all():
+    async def run():
+        cycles = GatedCycles()
+        coordinator = FetchCoordinator(cycles)
+        first = asyncio.create_task(coordinator.trigger([source(1)]))
+        await asyncio.sleep(0)
+        queued = [asyncio.create_task(coordinator.trigger([source(2)])),
+                  asyncio.create_task(coordinator.trigger())]
+        await asyncio.sleep(0)
+        await cycles.release(0)
+        await first
+        await cycles.release(1)
+        await asyncio.gather(*queued)
+        return cycles
+
+    assert asyncio.run(run()).calls == [[1], None]
+
+
+def test_exception_reaches_every_waiter():
+    async def run():
+        cycles = GatedCycles(error=RuntimeError("feed down"))
+        coordinator = FetchCoordinator(cycles)
+        waiters = [asyncio.create_task(coordinator.trigger([source(1)])),
+                   asyncio.create_task(coordinator.trigger([source(1)])),
+                   asyncio.create_task(coordinator.trigger([source(2)])),
+                   asyncio.create_task(coordinator.trigger([source(3)]))]
+        await asyncio.sleep(0)
+        await cycles.release(0)
+        await cycles.release(1)
+        results = await asyncio.gather(*waiters, return_exceptions=True)
+        return coordinator, results
+
+    coordinator, results = asyncio.run(run())
+    assert len(results) == 4
+    for result in results:
+        assert isinstance(result, RuntimeError) and str(result) == "feed down"
+    assert not coordinator.running
+
+
+def test_failed_cycle_does_not_block_next_trigger():
+    async def run():
+        cycles = GatedCycles(error=RuntimeError("feed down"))
+        coordinator = FetchCoordinator(cycles)
+        task = asyncio.create_task(coordinator.trigger())
+        await asyncio.sleep(0)
+        await cycles.release(0)
+        with pytest.raises(RuntimeError):
+            await task
+        cycles.error = None
+        task = asyncio.create_task(coordinator.trigger())
+        await asyncio.sleep(0)
+        await cycles.release(1)
+        return await task
+
+    assert asyncio.run(run()) == {'cycle': 2, 'joined': False}
@@ -0,0 +1,74 @@
+import asyncio
+import time
+
+from fetch_engine import FetchEngine
+
+
+class SlowHostParser:
+    """Источники slow.example.com отвечают delay секунд, остальные - сразу"""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.finished = {}
+
+    async def fetch_source(self, source, validators=None):
+        if 'slow.example.com' in source['url']:
+            await asyncio.sleep(self.delay)
+        else:
+            await asyncio.sleep(0.01)
+        self.finished[source['id']] = time.monotonic()
+        return {}
+
+
+def make_sources():
+    slow = [{'id': n, 'name': f"Slow {n}", 'url': f"https://slow.example.com/{n}", 'type': 'rss'}
+            for n in range(40)]
+    fast = [{'id': 100 + n, 'name': f"Fast {n}", 'url': f"https://fast{n}.example.com/rss", 'type': 'rss'}
+            for n in range(5)]
+    return slow, fast
+
+
+def test_fast_hosts_not_blocked_by_slow_host():
+    async def run():
+        parser = SlowHostParser(delay=0.2)
+        engine = FetchEngine(parser, concurrency=20, per_host_limit=4)
+        slow, fast = make_sources()
+        started = time.monotonic()
+        # Медленный хост первым: его очередь не должна занять общие слоты
+        await asyncio.gather(*(engine.fetch_source(source) for source in slow + fast))
+        return started, parser.finished, fast
+
+    started, finished, fast = asyncio.run(run())
+    # 40 источников по 4 на хост - около 2 с; быстрые хосты не ждут их
+    assert max(finished[source['id']] for source in fast) - started < 0.5
+
+
+def test_per_host_and_global_limits_hold():
+    class CountingParser:
+        def __init__(self):
+            self.active = {}
+            self.peak = {}
+            self.total = self.total_peak = 0
+
+        async def fetch_source(self, source, validators=None):
+            host = FetchEngine.source_host(source)
+            self.active[host] = self.active.get(host, 0) + 1
+            self.total += 1
+            self.peak[host] = max(self.peak.get(host, 0), self.active[host])
+            self.total_peak = max(self.total_peak, self.total)
+            await asyncio.sleep(0.01)
+            self.active[host] -= 1
+            self.total -= 1
+            return {}
+
+    async def run():
+        parser = CountingParser()
+        engine = FetchEngine(parser, concurrency=6, per_host_limit=2)
+        sources = [{'id': n, 'name': str(n), 'url': f"https://h{n % 5}.example.com/{n}", 'type': 'rss'}
+                   for n in range(50)]
+        await asyncio.gather(*(engine.fetch_source(source) for source in sources))
+        return parser
+
+    parser = asyncio.run(run())
+    assert max(parser.peak.values()) <= 2
+    assert parser.total_peak <= 6
@@ -0,0 +1,45 @@
+import asyncio
+
+import pytest
+from aiohttp import web
+
+from http_client import HttpClient
+
+
+async def serve(chunks: int, pause: float):
+    async def handler(request):
+        response = web.StreamResponse()
+        await response.prepare(request)
+        for _ in range(chunks):
+            await response.write(b'x' * 1024)
+            await asyncio.sleep(pause)
+        return response
+
+    app = web.Application()
+    app.router.add_get('/feed', handler)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    return runner, f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}/feed"
+
+
+async def download(chunks: int, pause: float, read_timeout: float) -> int:
+    runner, url = await serve(chunks, pause)
+    http = HttpClient(read_timeout=read_timeout)
+    try:
+        async with http.get(url) as resp:
+            return len(await resp.read())
+    finally:
+        await http.close()
+        await runner.cleanup()
+
+
+def test_slow_streamed_body_is_not_cut_by_total_timeout():
+    # Тело идёт дольше read_timeout целиком, но без пауз длиннее него
+    assert asyncio.run(download(chunks=8, pause=0.1, read_timeout=0.3)) == 8 * 1024
+
+
+def test_stalled_connection_times_out():
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(download(chunks=2, pause=1.0, read_timeout=0.3))
@@ -0,0 +1,56 @@
+import asyncio
+
+from metrics import MetricsRegistry
+
+
+def saved_registry() -> list:
+    registry = MetricsRegistry()
+    registry.counter('jobs_total', 'Задачи').inc(5)
+    registry.counter('sent_total', 'Отправки', ['chat']).inc(3, chat='-100')
+    registry.mark()
+    registry.get('sent_total').inc(2, chat='-100')
+    return registry.counter_rows()
+
+
+def test_restore_continues_registered_counters():
+    registry = MetricsRegistry()
+    sent = registry.counter('sent_total', 'Отправки', ['chat'])
+    registry.restore(saved_registry())
+    assert sent.value(chat='-100') == 5
+    assert registry.since_mark('sent_total') == 2
+
+
+def test_counter_registered_after_restore_gets_saved_value():
+    registry = MetricsRegistry()
+    registry.restore(saved_registry())
+    # Как news_fetch_job_failures_total из AdvancedNewsBot - регистрируется позже
+    jobs = registry.counter('jobs_total', 'Задачи')
+    jobs.inc()
+    assert jobs.value() == 6
+    assert {row['name']: row['value'] for row in registry.counter_rows()}['jobs_total'] == 6
+
+
+def test_counter_with_changed_labels_is_not_restored():
+    registry = MetricsRegistry()
+    registry.restore(saved_registry())
+    sent = registry.counter('sent_total', 'Отправки', ['chat', 'kind'])
+    assert sent.total() == 0
+
+
+def test_late_counter_survives_bot_restart(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr('news_bot.METRICS_PORT', 0)
+    from advanced_bot import AdvancedNewsBot
+    from news_bot import NewsBot
+
+    async def run(failures: int) -> float:
+        bot = NewsBot("123456:TEST")
+        advanced = AdvancedNewsBot(bot)
+        for _ in range(failures):
+            advanced._job_failures.inc()
+        value = advanced._job_failures.value()
+        await bot.close()
+        return value
+
+    assert asyncio.run(run(2)) == 2
+    assert asyncio.run(run(1)) == 3
@@ -0,0 +1,36 @@
+from advanced_features import NewsFilter
+
+
+def article(title, summary=''):
+    return {'title': title, 'summary': summary}
+
+
+def test_default_matches_substrings_like_before():
+    news_filter = NewsFilter()
+    news_filter.set_include(['биткоин', 'крипто'])
+
+    assert news_filter.should_post(article('Курс биткоина вырос'))
+    assert news_filter.should_post(article('Новости', 'Рынок: криптовалюта дешевеет'))
+    assert not news_filter.should_post(article('Погода на выходные'))
+
+
+def test_default_exclude_has_priority_and_matches_substrings():
+    news_filter = NewsFilter()
+    news_filter.set_include(['биткоин'])
+    news_filter.set_exclude(['реклам'])
+
+    assert not news_filter.should_post(article('Биткоин', 'Рекламная интеграция'))
+    assert news_filter.should_post(article('Биткоин', 'Обзор рынка'))
+
+
+def test_whole_words_is_opt_in():
+    news_filter = NewsFilter(whole_words=True)
+    news_filter.set_include(['биткоин', 'крипт*'])
+
+    assert not news_filter.should_post(article('Курс биткоина вырос'))
+    assert news_filter.should_post(article('Биткоин вырос'))
+    assert news_filter.should_post(article('Рынок: криптовалюта дешевеет'))
+
+
+def test_no_keywords_posts_everything():
+    assert NewsFilter().should_post(article('Что угодно'))
@@ -0,0 +1,189 @@
+import asyncio
+import time
+
+import aiohttp
+import pytest
+from aiohttp import web
+
+from http_client import HttpClient
+from nitter_pool import NitterPool, canonical_tweet_link
+
+RSS = ('<?xml version="1.0"?><rss version="2.0"><channel><title>{user}</title>'
+       '<item><title>tweet</title><link>https://mirror/{user}/status/1#m</link></item>'
+       '</channel></rss>')
+
+
+class Mirrors:
+    """Зеркала-заглушки на одном сервере: /m{n}/{user}/rss, поведение задаёт тест"""
+
+    def __init__(self, behaviours):
+        self.behaviours = behaviours  # n -> 'ok' | 'error' | 'stub' | 'missing' | задержка (сек)
+        self.requests = [0] * len(behaviours)
+
+    async def handle(self, request: web.Request):
+        n = int(request.match_info['n'])
+        self.requests[n] += 1
+        behaviour = self.behaviours[n]
+        if isinstance(behaviour, (int, float)):
+            await asyncio.sleep(behaviour)
+        elif behaviour == 'error':
+            return web.Response(status=503)
+        elif behaviour == 'missing':
+            return web.Response(status=404)
+        elif behaviour == 'stub':
+            return web.Response(text="<html>Instance has been rate limited</html>", content_type='text/html')
+        return web.Response(text=RSS.format(user=request.match_info['user']),
+                            content_type='application/rss+xml')
+
+    async def __aenter__(self):
+        app = web.Application()
+        app.router.add_get('/m{n}/{user}/rss', self.handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, '127.0.0.1', 0)
+        await site.start()
+        url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+        self.bases = [f"{url}/m{n}" for n in range(len(self.behaviours))]
+        self.http = HttpClient()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.http.close()
+        await self._runner.cleanup()
+
+    def pool(self, **kwargs) -> NitterPool:
+        pool = NitterPool(self.http, self.bases, **{'cache_ttl': 0, **kwargs})
+        # Порядок зеркал фиксирован: m0 считается лучшим
+        for n, base in enumerate(self.bases):
+            pool.mirrors[base]['latency'] = 0.01 * (n + 1)
+        return pool
+
+
+def run(behaviours, scenario):
+    async def main():
+        async with Mirrors(behaviours) as mirrors:
+            return await scenario(mirrors)
+
+    return asyncio.run(main())
+
+
+def test_failover_on_error_and_reranking():
+    async def scenario(mirrors):
+        pool = mirrors.pool()
+        result = await pool.fetch('alice')
+        return pool, result, mirrors
+
+    pool, result, mirrors = run(['error', 'ok'], scenario)
+    assert result['mirror'] == mirrors.bases[1]
+    assert pool.stats['failovers'] == 1
+    assert pool.mirrors[mirrors.bases[0]]['errors'] == 1
+    # Ошибка подняла ожидаемую задержку m0 выше m1
+    assert pool.primary == mirrors.bases[1]
+
+
+def test_stub_page_counts_as_mirror_error():
+    async def scenario(mirrors):
+        pool = mirrors.pool()
+        return pool, await pool.fetch('alice'), mirrors
+
+    pool, result, mirrors = run(['stub', 'ok'], scenario)
+    assert result['mirror'] == mirrors.bases[1]
+    assert b'<rss' in result['content']
+    assert pool.mirrors[mirrors.bases[0]]['last_error'].startswith('ValueError')
+
+
+def test_hedging_returns_fast_mirror_before_slow_one():
+    async def scenario(mirrors):
+        pool = mirrors.pool(hedge_after=0.05)
+        started = time.monotonic()
+        result = await pool.fetch('alice')
+        return pool, result, time.monotonic() - started, mirrors
+
+    pool, result, elapsed, mirrors = run([1.0, 'ok'], scenario)
+    assert result['mirror'] == mirrors.bases[1]
+    assert elapsed < 0.5
+    assert pool.stats['hedged'] == 1
+    assert pool.stats['hedge_wins'] == 1
+
+
+def test_missing_user_is_not_a_mirror_error():
+    async def scenario(mirrors):
+        pool = mirrors.pool()
+        with pytest.raises(aiohttp.ClientResponseError) as error:
+            await pool.fetch('nobody')
+        return pool, error.value, mirrors
+
+    pool, error, mirrors = run(['missing', 'ok'], scenario)
+    assert error.status == 404
+    assert mirrors.requests == [1, 0]  # Без перебора зеркал
+    assert pool.mirrors[mirrors.bases[0]]['errors'] == 0
+
+
+def test_all_mirrors_failing_raises_last_error():
+    async def scenario(mirrors):
+        pool = mirrors.pool()
+        with pytest.raises(aiohttp.ClientResponseError):
+            await pool.fetch('alice')
+        return pool, mirrors
+
+    pool, mirrors = run(['error', 'error'], scenario)
+    assert mirrors.requests == [1, 1]
+    assert pool.stats['failed'] == 1
+
+
+def test_concurrent_fetches_share_one_request_and_cache():
+    async def scenario(mirrors):
+        pool = mirrors.pool(cache_ttl=60)
+        results = await asyncio.gather(*(pool.fetch('Alice') for _ in range(5)))
+        cached = await pool.fetch('alice')
+        return pool, results, cached, mirrors
+
+    pool, results, cached, mirrors = run([0.05, 'ok'], scenario)
+    assert sum(mirrors.requests) == 1
+    assert all(result is results[0] for result in results + [cached])
+    assert pool.stats['joined'] == 4
+    assert pool.stats['cache_hits'] == 1
+
+
+def test_cancelled_caller_keeps_request_shared_and_cached():
+    async def scenario(mirrors):
+        pool = mirrors.pool(cache_ttl=60)
+        owner = asyncio.create_task(pool.fetch('alice'))
+        await asyncio.sleep(0.01)
+        owner.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await owner
+        # Запрос отменённого продолжается - новый вызов присоединяется к нему
+        joined = await pool.fetch('alice')
+        cached = await pool.fetch('alice')
+        return pool, joined, cached, mirrors
+
+    pool, joined, cached, mirrors = run([0.05, 'ok'], scenario)
+    assert sum(mirrors.requests) == 1
+    assert cached is joined
+    assert pool.stats['joined'] == 1
+    assert pool.stats['cache_hits'] == 1
+    assert pool._inflight == {}
+
+
+def test_request_finished_after_caller_cancelled_is_cached():
+    async def scenario(mirrors):
+        pool = mirrors.pool(cache_ttl=60)
+        owner = asyncio.create_task(pool.fetch('alice'))
+        await asyncio.sleep(0.01)
+        owner.cancel()
+        await asyncio.sleep(0.1)
+        inflight = dict(pool._inflight)
+        cached = await pool.fetch('alice')
+        return pool, inflight, cached, mirrors
+
+    pool, inflight, cached, mirrors = run([0.05, 'ok'], scenario)
+    assert inflight == {}
+    assert cached['status'] == 200
+    assert sum(mirrors.requests) == 1
+    assert pool.stats['cache_hits'] == 1
+
+
+def test_canonical_tweet_link():
+    assert canonical_tweet_link("https://nitter.net/user/status/1#m") == "https://x.com/user/status/1"
+    assert canonical_tweet_link("https://nitter.example.org/user/status/1") == "https://x.com/user/status/1"
@@ -0,0 +1,158 @@
+import asyncio
+import json
+import time
+
+import pytest
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import SendMessage
+
+from async_db import AsyncNewsDatabase
+from news_bot import NewsDatabase
+from outbox import OutboxWorker
+from send_scheduler import SendScheduler
+
+CHANNELS = ['-1001', '-1002']
+
+
+async def open_db(tmp_path, rows: int = 1) -> AsyncNewsDatabase:
+    db = AsyncNewsDatabase(NewsDatabase(str(tmp_path / "news.db")))
+    await db.enqueue_news([{'source_id': 1, 'title': f"Новость {n}", 'url': f"https://example.com/{n}",
+                            'published_at': None, 'payload': json.dumps({'n': n})}
+                           for n in range(rows)], channels=CHANNELS)
+    return db
+
+
+def outbox_rows(db: AsyncNewsDatabase):
+    return [dict(row) for row in db.sync._conn().execute(
+        "SELECT channel_id, status, attempts, next_attempt_at, last_error FROM outbox ORDER BY id")]
+
+
+def run(tmp_path, send, rows: int = 1, passes: int = 1, **kwargs):
+    async def main():
+        db = await open_db(tmp_path, rows)
+        worker = OutboxWorker(db, send, **kwargs)
+        try:
+            for _ in range(passes):
+                await worker.drain_once()
+            return worker, outbox_rows(db)
+        finally:
+            await db.close()
+
+    return asyncio.run(main())
+
+
+def test_successful_send_marks_rows_sent(tmp_path):
+    sent = []
+
+    async def send(channel_id, payload):
+        sent.append((channel_id, payload['n']))
+
+    worker, rows = run(tmp_path, send, rows=2)
+    assert sorted(sent) == [('-1001', 0), ('-1001', 1), ('-1002', 0), ('-1002', 1)]
+    assert {row['status'] for row in rows} == {'sent'}
+    assert worker.stats == {'sent': 4, 'retried': 0, 'failed': 0}
+
+
+def test_failed_send_is_retried_later_with_backoff(tmp_path):
+    async def send(channel_id, payload):
+        if channel_id == '-1002':
+            raise ConnectionError("network down")
+
+    started = time.time()
+    worker, rows = run(tmp_path, send, backoff_base=10)
+    ok, failed = rows
+    assert ok['status'] == 'sent'
+    assert failed['status'] == 'pending'
+    assert failed['attempts'] == 1
+    assert failed['last_error'] == "ConnectionError: network down"
+    # Первая задержка - backoff_base ±20%: до неё строка не берётся снова
+    assert started + 8 <= failed['next_attempt_at'] <= time.time() + 12
+    assert worker.stats['retried'] == 1
+
+
+def test_row_fails_after_max_attempts(tmp_path):
+    calls = []
+
+    async def send(channel_id, payload):
+        calls.append(channel_id)
+        raise ConnectionError("still down")
+
+    # backoff 0 - строка снова готова к следующему проходу
+    worker, rows = run(tmp_path, send, passes=5, max_attempts=3, backoff_base=0)
+    assert [row['status'] for row in rows] == ['failed', 'failed']
+    assert [row['attempts'] for row in rows] == [3, 3]
+    assert len(calls) == 6  # После failed строк больше не пытаются отправить
+    assert worker.stats == {'sent': 0, 'retried': 4, 'failed': 2}
+
+
+def test_backoff_grows_exponentially_and_is_capped():
+    worker = OutboxWorker(None, None, backoff_base=5, backoff_max=60)
+    for attempts, expected in [(1, 5), (2, 10), (3, 20), (4, 40), (5, 60), (10, 60)]:
+        for _ in range(20):
+            assert expected * 0.8 <= worker.backoff(attempts) <= expected * 1.2
+
+
+def retry_after() -> TelegramRetryAfter:
+    return TelegramRetryAfter(method=SendMessage(chat_id=1, text='x'),
+                              message="Too Many Requests", retry_after=0)
+
+
+def test_retry_after_is_handled_by_scheduler_without_outbox_retry(tmp_path):
+    scheduler = SendScheduler(global_rate=1000, per_chat_rate=1000, max_retries=3)
+    attempts = {}
+
+    async def send(channel_id, payload):
+        async def call():
+            attempts[channel_id] = attempts.get(channel_id, 0) + 1
+            if attempts[channel_id] == 1:
+                raise retry_after()
+        await scheduler.send(channel_id, call)
+
+    worker, rows = run(tmp_path, send)
+    assert [row['status'] for row in rows] == ['sent', 'sent']
+    assert [row['attempts'] for row in rows] == [1, 1]
+    assert scheduler.stats['retry_after'] == 2
+
+
+def test_persistent_retry_after_leaves_row_for_outbox_retry(tmp_path):
+    scheduler = SendScheduler(global_rate=1000, per_chat_rate=1000, max_retries=2)
+
+    async def send(channel_id, payload):
+        async def call():
+            raise retry_after()
+        await scheduler.send(channel_id, call)
+
+    worker, rows = run(tmp_path, send, backoff_base=10)
+    assert [row['status'] for row in rows] == ['pending', 'pending']
+    assert all('превышено число повторов' in row['last_error'] for row in rows)
+    assert scheduler.stats['retry_after'] == 6  # 3 попытки на каждый из двух каналов
+
+
+def test_pending_rows_survive_restart(tmp_path):
+    async def main():
+        db = await open_db(tmp_path)
+        await db.close()
+        # "Рестарт": новый процесс видит невыполненные строки и отправляет их
+        db = AsyncNewsDatabase(NewsDatabase(str(tmp_path / "news.db")))
+        sent = []
+
+        async def send(channel_id, payload):
+            sent.append(channel_id)
+
+        try:
+            assert await OutboxWorker(db, send).drain_once() == 2
+            assert await OutboxWorker(db, send).drain_once() == 0
+            return sent
+        finally:
+            await db.close()
+
+    assert sorted(asyncio.run(main())) == CHANNELS
+
+
+@pytest.mark.parametrize('batch_size', [1, 3])
+def test_drain_once_respects_batch_size(tmp_path, batch_size):
+    async def send(channel_id, payload):
+        pass
+
+    worker, rows = run(tmp_path, send, rows=2, batch_size=batch_size)
+    assert sum(row['status'] == 'sent' for row in rows) == batch_size
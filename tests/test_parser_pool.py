@@ -0,0 +1,92 @@
+import asyncio
+import time
+
+import pytest
+from aiohttp import web
+
+from news_bot import NewsParser, _parser_mp_context
+
+
+def make_feed(entries: int) -> bytes:
+    # Меньше FEED_STREAM_THRESHOLD: разбор целиком в пуле
+    items = "".join(
+        f"<item><title>Новость {i}</title><link>https://example.com/n/{i}</link>"
+        f"<description>{'Текст новости. ' * 20}</description>"
+        f"<pubDate>Mon, 06 Jan 2025 10:00:00 GMT</pubDate></item>"
+        for i in range(entries)
+    )
+    return (f'<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel>'
+            f"<title>Test</title>{items}</channel></rss>").encode()
+
+
+async def parse_with_lag(pool_type: str, feeds: int = 4, entries: int = 600):
+    body = make_feed(entries)
+
+    async def handler(request):
+        return web.Response(body=body, content_type="application/rss+xml")
+
+    app = web.Application()
+    app.router.add_get("/feed/{n}", handler)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    base_url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+
+    NewsParser.shutdown_pool()
+    NewsParser.pool_type = pool_type
+    parser = NewsParser()
+    # Запуск пула (forkserver и загрузка модуля бота в нём) - не часть замера
+    await parser.parse_rss(f"{base_url}/feed/warmup")
+
+    lags = []
+    stop = asyncio.Event()
+
+    async def measure():
+        while not stop.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(0.005)
+            lags.append(time.perf_counter() - started - 0.005)
+
+    lag_task = asyncio.create_task(measure())
+    try:
+        results = await asyncio.gather(*(parser.parse_rss(f"{base_url}/feed/{n}")
+                                         for n in range(feeds)))
+    finally:
+        stop.set()
+        await lag_task
+        await parser.http.close()
+        NewsParser.shutdown_pool()
+        await runner.cleanup()
+    return results, sorted(lags)
+
+
+@pytest.fixture(autouse=True)
+def restore_pool_type():
+    pool_type = NewsParser.pool_type
+    yield
+    NewsParser.pool_type = pool_type
+
+
+def test_default_pool_is_process():
+    assert NewsParser.pool_type == 'process'
+
+
+def test_process_pool_does_not_fork_bot_threads():
+    # fork унаследовал бы блокировки потоков бота (писатель БД, профайлер)
+    assert _parser_mp_context().get_start_method() in ('forkserver', 'spawn')
+
+
+def test_process_pool_keeps_event_loop_responsive():
+    results, lags = asyncio.run(parse_with_lag('process'))
+    assert all(len(articles) == 10 for articles in results)
+    # Разбор в пуле, в loop - только скачивание и распаковка результата
+    assert lags[int(len(lags) * 0.99)] < 0.05
+    assert lags[-1] < 0.25
+
+
+def test_process_and_thread_pools_parse_the_same():
+    process, _ = asyncio.run(parse_with_lag('process', feeds=2, entries=100))
+    thread, _ = asyncio.run(parse_with_lag('thread', feeds=2, entries=100))
+    assert [[(a.title, a.link, a.source) for a in feed] for feed in process] == \
+           [[(a.title, a.link, a.source) for a in feed] for feed in thread]
@@ -0,0 +1,95 @@
+import asyncio
+import time
+
+import pytest
+
+from poll_scheduler import PollScheduler
+
+SOURCES = [{'id': n, 'name': f"Source {n}", 'url': f"https://s{n}.example.com/rss", 'type': 'rss'}
+           for n in range(3)]
+
+
+class FakeDB:
+    def __init__(self):
+        self.saved = []
+
+    async def get_active_sources(self):
+        return SOURCES
+
+    async def get_source_schedule(self):
+        return {}
+
+    async def save_source_schedule(self, states):
+        self.saved.extend(states)
+
+
+def make_scheduler(run_cycle):
+    return PollScheduler(FakeDB(), run_cycle, min_interval=60, max_interval=600,
+                         default_interval=120, jitter=0)
+
+
+def test_recorded_sources_are_rescheduled():
+    async def run():
+        async def cycle(sources):
+            await scheduler.record([{'source_id': s['id'], 'error': False, 'not_modified': True,
+                                     'published': 0} for s in sources])
+            return {'sources': len(sources)}
+
+        scheduler = make_scheduler(cycle)
+        assert (await scheduler.run_due())['sources'] == 3
+        return scheduler
+
+    scheduler = asyncio.run(run())
+    assert scheduler.pop_due() == []
+    # 304 - интервал растёт (backoff), источник снова в очереди
+    assert sorted(scheduler.pop_due(time.time() + 600)) == [0, 1, 2]
+    assert scheduler.stats['rescheduled'] == 0
+
+
+def test_failed_cycle_keeps_sources_in_queue():
+    async def run():
+        async def cycle(sources):
+            raise RuntimeError("database is locked")
+
+        scheduler = make_scheduler(cycle)
+        with pytest.raises(RuntimeError):
+            await scheduler.run_due()
+        return scheduler
+
+    scheduler = asyncio.run(run())
+    assert scheduler.pop_due() == []
+    assert sorted(scheduler.pop_due(time.time() + 120)) == [0, 1, 2]
+    assert scheduler.stats['rescheduled'] == 3
+
+
+def test_swallowed_failure_keeps_sources_in_queue():
+    async def run():
+        async def cycle(sources):
+            # Как fetch_news_job: ошибка залогирована, record() не вызван
+            return None
+
+        scheduler = make_scheduler(cycle)
+        await scheduler.run_due()
+        return scheduler
+
+    scheduler = asyncio.run(run())
+    assert sorted(scheduler.pop_due(time.time() + 120)) == [0, 1, 2]
+
+
+def test_deferred_sources_keep_their_deadline():
+    async def run():
+        async def cycle(sources):
+            scheduler.defer(0, time.time() + 500)
+            await scheduler.record([{'source_id': 1, 'error': True, 'not_modified': False,
+                                     'published': 0}])
+            raise RuntimeError("boom")
+
+        scheduler = make_scheduler(cycle)
+        with pytest.raises(RuntimeError):
+            await scheduler.run_due()
+        return scheduler
+
+    scheduler = asyncio.run(run())
+    assert scheduler.stats['rescheduled'] == 1  # Только источник 2
+    assert sorted(scheduler.pop_due(time.time() + 130)) == [1, 2]
+    assert scheduler.pop_due(time.time() + 510) == [0]
@@ -0,0 +1,64 @@
+import asyncio
+import logging
+import sqlite3
+
+from async_db import AsyncNewsDatabase
+from news_bot import NewsDatabase
+from retention import RetentionWorker
+
+
+def legacy_db(path) -> NewsDatabase:
+    # БД, созданная до auto_vacuum=INCREMENTAL: PRAGMA на непустой БД уже не действует
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE legacy (id INTEGER)")
+    conn.commit()
+    conn.close()
+    return NewsDatabase(str(path))
+
+
+def fill_old_news(db: NewsDatabase, count: int = 2000):
+    with db._conn() as conn:
+        conn.executemany(
+            "INSERT INTO published_news (source_id, title, url, posted_to_tg) "
+            "VALUES (1, ?, ?, datetime('now', '-200 days'))",
+            [('x' * 500, f"https://example.com/{n}") for n in range(count)])
+
+
+def run_worker(db: NewsDatabase, passes: int = 1, **kwargs):
+    async def run():
+        adb = AsyncNewsDatabase(db)
+        worker = RetentionWorker(adb, batch_pause=0, **kwargs)
+        try:
+            return [await worker.run_once() for _ in range(passes)]
+        finally:
+            await adb.close()
+
+    return asyncio.run(run())
+
+
+def test_legacy_db_skips_vacuum_with_single_log_line(tmp_path, caplog):
+    db = legacy_db(tmp_path / "news.db")
+    assert db.get_storage_stats()['auto_vacuum'] == 0
+    with caplog.at_level(logging.INFO, logger='retention'):
+        reports = run_worker(db, passes=3)
+    assert len([r for r in caplog.records if 'auto_vacuum' in r.getMessage()]) == 1
+    assert all('rows_before' not in report for report in reports)
+
+
+def test_legacy_db_conversion_returns_space(tmp_path):
+    db = legacy_db(tmp_path / "news.db")
+    fill_old_news(db)
+    report, = run_worker(db, convert_vacuum=True, count_rows=True)
+    assert db.get_storage_stats()['auto_vacuum'] == 2
+    assert report['pruned_published'] == 2000
+    assert report['rows_after'] == 0
+    assert report['size_after'] < report['size_before']
+
+
+def test_new_db_uses_incremental_vacuum(tmp_path):
+    db = NewsDatabase(str(tmp_path / "news.db"))
+    fill_old_news(db)
+    report, = run_worker(db)
+    assert db.get_storage_stats()['auto_vacuum'] == 2
+    assert report['size_after'] < report['size_before']
+    assert 'published_rows' not in db.get_storage_stats()
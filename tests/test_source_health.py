@@ -0,0 +1,139 @@
+import asyncio
+import time
+
+from async_db import AsyncNewsDatabase
+from news_bot import NewsDatabase
+from source_health import CLOSED, HALF_OPEN, OPEN, SourceHealth
+from url_cache import PublishedUrlCache
+
+SOURCE = 1
+
+
+def make_db(tmp_path):
+    return AsyncNewsDatabase(NewsDatabase(str(tmp_path / "news.db")), url_cache=PublishedUrlCache())
+
+
+def fail(error="timeout"):
+    return [{'source_id': SOURCE, 'fetch_error': error}]
+
+
+def ok():
+    return [{'source_id': SOURCE}]
+
+
+def run_with_health(tmp_path, scenario, **options):
+    async def run():
+        db = make_db(tmp_path)
+        try:
+            health = SourceHealth(db, **{'failure_threshold': 3, 'backoff_base': 300,
+                                         'backoff_max': 3000, 'jitter': 0, **options})
+            return await scenario(health, db)
+        finally:
+            await db.close()
+
+    return asyncio.run(run())
+
+
+def delay(health):
+    return health.retry_at(SOURCE) - time.time()
+
+
+def test_closed_open_half_open_closed(tmp_path):
+    async def scenario(health, db):
+        states = []
+        for _ in range(2):
+            assert await health.record(fail()) == []
+        states.append(health.states[SOURCE]['state'])
+
+        opened = await health.record(fail())
+        states.append(health.states[SOURCE]['state'])
+        assert [state['source_id'] for state in opened] == [SOURCE]
+        retry_at = health.retry_at(SOURCE)
+        assert not health.allow(SOURCE, now=retry_at - 1)
+        assert health.allow(SOURCE, now=retry_at)
+        states.append(health.states[SOURCE]['state'])
+
+        await health.record(ok())
+        states.append(health.states[SOURCE]['state'])
+        return states, health.states[SOURCE], health.stats
+
+    states, state, stats = run_with_health(tmp_path, scenario)
+    assert states == [CLOSED, OPEN, HALF_OPEN, CLOSED]
+    assert state['failures'] == 0 and state['opened'] == 0 and state['retry_at'] is None
+    assert stats == {'skipped': 1, 'opened': 1, 'recovered': 1}
+
+
+def test_half_open_failure_reopens_with_doubled_delay(tmp_path):
+    async def scenario(health, db):
+        for _ in range(3):
+            await health.record(fail())
+        first = delay(health)
+        assert health.allow(SOURCE, now=health.retry_at(SOURCE))
+        # Одна ошибка пробы сразу открывает цепь, не дожидаясь порога
+        assert await health.record(fail())
+        return first, delay(health), health.states[SOURCE]['state']
+
+    first, second, state = run_with_health(tmp_path, scenario)
+    assert abs(first - 300) < 5
+    assert abs(second - 600) < 5
+    assert state == OPEN
+
+
+def test_backoff_is_capped(tmp_path):
+    async def scenario(health, db):
+        delays = []
+        for _ in range(3):
+            await health.record(fail())
+        delays.append(delay(health))
+        for _ in range(6):
+            health.allow(SOURCE, now=health.retry_at(SOURCE))
+            await health.record(fail())
+            delays.append(delay(health))
+        return delays
+
+    delays = run_with_health(tmp_path, scenario)
+    expected = [300, 600, 1200, 2400, 3000, 3000, 3000]
+    assert all(abs(got - want) < 5 for got, want in zip(delays, expected)), delays
+
+
+def test_jitter_stays_within_bounds(tmp_path):
+    async def scenario(health, db):
+        delays = []
+        for _ in range(50):
+            for _ in range(3):
+                await health.record(fail())
+            delays.append(delay(health))
+            await health.record(ok())
+        return delays
+
+    delays = run_with_health(tmp_path, scenario, jitter=0.1)
+    assert all(270 - 5 < d < 330 + 5 for d in delays)
+    assert max(delays) - min(delays) > 1
+
+
+def test_success_resets_failure_count(tmp_path):
+    async def scenario(health, db):
+        await health.record(fail())
+        await health.record(fail())
+        await health.record(ok())
+        await health.record(fail())
+        await health.record(fail())
+        return health.states[SOURCE]
+
+    state = run_with_health(tmp_path, scenario)
+    assert state['state'] == CLOSED and state['failures'] == 2
+
+
+def test_state_survives_restart(tmp_path):
+    async def scenario(health, db):
+        for _ in range(3):
+            await health.record(fail("HTTP 503"))
+        restored = SourceHealth(db)
+        await restored.load()
+        return health.retry_at(SOURCE), restored
+
+    retry_at, restored = run_with_health(tmp_path, scenario)
+    assert restored.states[SOURCE]['state'] == OPEN
+    assert restored.states[SOURCE]['last_error'] == "HTTP 503"
+    assert restored.retry_at(SOURCE) == retry_at
+    assert not restored.allow(SOURCE, now=retry_at - 1)
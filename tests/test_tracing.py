@@ -0,0 +1,47 @@
+import asyncio
+import logging
+import time
+
+from tracing import Tracer, span
+
+
+async def slow_cycle(tracer: Tracer):
+    async with tracer.trace('fetch_cycle') as trace:
+        with span('fetch', source='Test'):
+            time.sleep(0.05)  # Блокирующая работа - чтобы профайлер снял семплы
+    return trace
+
+
+def test_stages_are_summarised():
+    tracer = Tracer()
+    trace = asyncio.run(slow_cycle(tracer))
+    assert trace.stages['fetch']['count'] == 1
+    assert trace.stages['fetch']['seconds'] >= 0.05
+    assert tracer.recent[-1]['name'] == 'fetch_cycle'
+
+
+def test_slow_cycle_dumps_profile(tmp_path):
+    tracer = Tracer(slow_budget=0.01, profile=True, profile_dir=str(tmp_path / "profiles"),
+                    profile_interval=0.001)
+    trace = asyncio.run(slow_cycle(tracer))
+    assert trace.profile is not None
+    assert tracer.stats == {'traces': 1, 'slow': 1, 'profiles': 1}
+
+
+def test_unwritable_profile_dir_does_not_fail_cycle(tmp_path, caplog):
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+    # Каталог внутри обычного файла создать нельзя (как read-only ФС)
+    tracer = Tracer(slow_budget=0.01, profile=True, profile_dir=str(blocker / "profiles"),
+                    profile_interval=0.001)
+    with caplog.at_level(logging.WARNING, logger='tracing'):
+        trace = asyncio.run(slow_cycle(tracer))
+    assert trace.profile is None
+    assert tracer.stats['slow'] == 1
+    assert any('Не удалось сохранить профиль' in r.getMessage() for r in caplog.records)
+
+
+def test_unwritable_trace_file_does_not_fail_cycle(tmp_path):
+    tracer = Tracer(trace_file=str(tmp_path / "missing" / "traces.jsonl"))
+    trace = asyncio.run(slow_cycle(tracer))
+    assert trace.duration is not None
@@ -0,0 +1,50 @@
+from urllib.parse import urlsplit
+
+import pytest
+
+from url_canon import canonical_url, url_key
+
+
+@pytest.mark.parametrize('url, canonical', [
+    ("http://Example.COM/news/1/", "https://example.com/news/1"),
+    ("https://example.com:443/news/1", "https://example.com/news/1"),
+    ("https://example.com:8443/news/1", "https://example.com:8443/news/1"),
+    ("https://example.com./news/1#comments", "https://example.com/news/1"),
+    ("https://example.com", "https://example.com/"),
+    ("https://example.com/a?utm_source=tg&b=2&a=1&fbclid=x", "https://example.com/a?a=1&b=2"),
+    ("https://example.com/a?ref=rss", "https://example.com/a?ref=rss"),
+    ("https://example.com/%d0%bd%D0%BE", "https://example.com/%D0%BD%D0%BE"),
+    ("https://example.com/но", "https://example.com/%D0%BD%D0%BE"),
+    ("https://example.com/%7Euser/%41", "https://example.com/~user/A"),
+    ("https://example.com/a b", "https://example.com/a%20b"),
+    # Зарезервированные символы остаются экранированными
+    ("https://example.com/a%2Fb", "https://example.com/a%2Fb"),
+    ("https://example.com/a%2fb", "https://example.com/a%2Fb"),
+    ("https://example.com/a%3Fb", "https://example.com/a%3Fb"),
+    # IPv6
+    ("https://[::1]:8443/x", "https://[::1]:8443/x"),
+    ("http://[2001:DB8::1]/x/", "https://[2001:db8::1]/x"),
+])
+def test_canonical_url(url, canonical):
+    assert canonical_url(url) == canonical
+
+
+def test_ipv6_result_is_a_valid_url():
+    parts = urlsplit(canonical_url("https://[::1]:8443/x"))
+    assert parts.hostname == '::1'
+    assert parts.port == 8443
+
+
+@pytest.mark.parametrize('url', ["ftp://example.com/file", "not a url", "https://[::1/x"])
+def test_other_urls_are_kept_as_is(url):
+    assert canonical_url(url) == url
+
+
+def test_same_article_gets_same_key():
+    assert url_key("http://example.com/news/1/?utm_medium=social") == url_key("https://EXAMPLE.com/news/1")
+    assert url_key("https://example.com/%D0%BD") == url_key("https://example.com/н")
+
+
+def test_different_resources_get_different_keys():
+    assert url_key("https://example.com/a%2Fb") != url_key("https://example.com/a/b")
+    assert url_key("https://example.com/a?x=1") != url_key("https://example.com/a?x=2")
@@ -0,0 +1,254 @@
+"""
+Трассировка циклов получения и отправки
+Tracer.trace() открывает трассу цикла, span(stage) внутри него замеряет
+стадию: fetch (загрузка источника), parse, dedup, filter (категории и
+маршрутизация), render, send, db_write. Текущая трасса передаётся через contextvars,
+поэтому span() работает в любой задаче, запущенной внутри цикла, и ничего
+не делает вне цикла. Итог цикла - одна структурированная запись (лог и
+JSONL файл); цикл дольше бюджета дополнительно сбрасывает профиль
+семплирующего профайлера (SamplingProfiler), если он включён.
+"""
+
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter as Tally, deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict, List, Optional
+
+from metrics import MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+# Вершины стеков простаивающих потоков пулов (ждут задачу) - в профиль не попадают;
+# selectors.py:select остаётся: это event loop, ждущий сеть
+IDLE_FRAMES = {'thread.py:_worker', 'threading.py:wait', 'queue.py:get'}
+
+_current: contextvars.ContextVar = contextvars.ContextVar('trace', default=None)
+
+
+class Trace:
+    """Трасса одного цикла: спаны стадий с относительным временем начала"""
+
+    def __init__(self, name: str, max_spans: int = 5000, **attrs):
+        self.name = name
+        self.attrs = attrs
+        self.started_at = time.time()
+        self.started = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.max_spans = max_spans
+        self.spans: List[Dict] = []
+        self.dropped = 0  # Спаны сверх max_spans - только в сводке по стадиям
+        self.stages: Dict[str, Dict] = {}
+        self.profile: Optional[str] = None
+
+    def add(self, stage: str, started: float, duration: float, attrs: Dict):
+        summary = self.stages.get(stage)
+        if summary is None:
+            summary = self.stages[stage] = {'count': 0, 'seconds': 0.0, 'max': 0.0}
+        summary['count'] += 1
+        summary['seconds'] += duration
+        summary['max'] = max(summary['max'], duration)
+        if len(self.spans) < self.max_spans:
+            self.spans.append({'stage': stage, 'start': round(started - self.started, 6),
+                               'duration': round(duration, 6), **attrs})
+        else:
+            self.dropped += 1
+
+    def slowest(self, count: int = 5) -> List[Dict]:
+        return sorted(self.spans, key=lambda s: s['duration'], reverse=True)[:count]
+
+    def to_dict(self, spans: bool = True) -> Dict:
+        data = {
+            'name': self.name,
+            'started_at': self.started_at,
+            'duration': round(self.duration, 6) if self.duration is not None else None,
+            **self.attrs,
+            # Стадии идут параллельно по источникам: сумма может быть больше duration
+            'stages': {stage: {**s, 'seconds': round(s['seconds'], 6), 'max': round(s['max'], 6)}
+                       for stage, s in self.stages.items()},
+            'profile': self.profile,
+        }
+        if spans:
+            data['spans'] = self.spans
+            data['dropped_spans'] = self.dropped
+        return data
+
+
+@contextmanager
+def span(stage: str, **attrs):
+    """Замерить стадию в текущей трассе (вне трассы - ничего не делает)"""
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add(stage, started, time.perf_counter() - started, attrs)
+
+
+def record(stage: str, duration: float, **attrs):
+    """Добавить уже замеренную стадию (например, разбор по кускам во время загрузки)"""
+    trace = _current.get()
+    if trace is not None:
+        trace.add(stage, time.perf_counter() - duration, duration, attrs)
+
+
+class SamplingProfiler:
+    """
+    Семплирующий профайлер без зависимостей: отдельный поток раз в interval
+    секунд снимает стеки всех потоков (sys._current_frames) и считает
+    одинаковые стеки. Результат - формат collapsed stacks
+    ("поток;файл:функция;... число"), его читают flamegraph.pl и speedscope.
+    Простаивающие потоки пулов (IDLE_FRAMES) не учитываются.
+    """
+
+    def __init__(self, interval: float = 0.01, max_depth: int = 64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples: Tally = Tally()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self.samples = Tally()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> Tally:
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        return self.samples
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                leaf = f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_code.co_name}"
+                if leaf in IDLE_FRAMES:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def dump(self, path: str):
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+    def top(self, count: int = 5) -> List[tuple]:
+        """Самые частые функции на вершине стека: [(функция, доля семплов)]"""
+        total = sum(self.samples.values())
+        leaves: Tally = Tally()
+        for stack, hits in self.samples.items():
+            leaves[stack.rsplit(';', 1)[-1]] += hits
+        return [(name, round(hits / total, 3)) for name, hits in leaves.most_common(count)] if total else []
+
+
+class Tracer:
+    """Трассы циклов: итог в лог и JSONL, история последних, профиль медленных циклов"""
+
+    def __init__(self, trace_file: Optional[str] = None, history: int = 20,
+                 slow_budget: float = 0.0, profile: bool = False, profile_dir: str = 'profiles',
+                 profile_interval: float = 0.01, metrics: Optional[MetricsRegistry] = None):
+        self.trace_file = trace_file
+        self.slow_budget = slow_budget  # Сек; 0 - без проверки
+        self.profile = profile  # Профайлер на время цикла, профиль сохраняется для медленных
+        self.profile_dir = profile_dir
+        self.profile_interval = profile_interval
+        self.recent: deque = deque(maxlen=history)
+        self.stats = {'traces': 0, 'slow': 0, 'profiles': 0}
+        self._profiling = False  # Один профайлер на процесс: вложенные/параллельные трассы без него
+        self._stage_seconds = (metrics or MetricsRegistry()).histogram(
+            'news_stage_seconds', 'Стадии циклов по трассам, сек', ['stage'])
+
+    @asynccontextmanager
+    async def trace(self, name: str, budget: Optional[float] = None, **attrs):
+        """
+        Открыть трассу цикла; спаны внутри with попадают в неё.
+        budget - бюджет времени вместо slow_budget (0 - без проверки и профиля).
+        """
+        trace = Trace(name, **attrs)
+        budget = self.slow_budget if budget is None else budget
+        token = _current.set(trace)
+        profiler = None
+        if self.profile and budget > 0 and not self._profiling:
+            self._profiling = True
+            profiler = SamplingProfiler(self.profile_interval)
+            profiler.start()
+        try:
+            yield trace
+        finally:
+            trace.duration = time.perf_counter() - trace.started
+            _current.reset(token)
+            samples = None
+            if profiler is not None:
+                samples = await asyncio.to_thread(profiler.stop)
+                self._profiling = False
+            await self._finish(trace, budget, profiler if samples else None)
+
+    async def _finish(self, trace: Trace, budget: float, profiler: Optional[SamplingProfiler]):
+        self.stats['traces'] += 1
+        for stage, summary in trace.stages.items():
+            self._stage_seconds.observe(summary['seconds'], stage=stage)
+        slow = budget > 0 and trace.duration > budget
+        if slow:
+            self.stats['slow'] += 1
+            if profiler is not None:
+                trace.profile = await asyncio.to_thread(self._dump_profile, trace, profiler)
+
+        stages = ', '.join(f"{stage} {s['seconds']:.2f}с/{s['count']}"
+                           for stage, s in sorted(trace.stages.items(),
+                                                  key=lambda item: -item[1]['seconds']))
+        if slow:
+            slowest = '; '.join(f"{s['stage']} {s.get('source') or s.get('chat') or ''} {s['duration']:.2f}с"
+                                for s in trace.slowest(3))
+            logger.warning(f"🐢 Цикл {trace.name} {trace.duration:.1f}с дольше бюджета "
+                           f"{budget:g}с: {stages}; самые долгие: {slowest}"
+                           + (f"; профиль: {trace.profile}" if trace.profile else ""))
+        else:
+            logger.debug(f"Трасса {trace.name} {trace.duration:.2f}с: {stages}")
+        self.recent.append(trace.to_dict(spans=False))
+        if self.trace_file:
+            try:
+                await asyncio.to_thread(self._append, trace.to_dict())
+            except OSError as e:
+                logger.warning(f"Не удалось записать трассу в {self.trace_file}: {e}")
+
+    def _append(self, data: Dict):
+        with open(self.trace_file, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(data, ensure_ascii=False) + '\n')
+
+    def _dump_profile(self, trace: Trace, profiler: SamplingProfiler) -> Optional[str]:
+        # Сбой записи профиля (нет прав, read-only ФС) только логируется - цикл не падает
+        stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(trace.started_at))
+        path = os.path.join(self.profile_dir, f"{trace.name}-{stamp}.folded")
+        try:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            profiler.dump(path)
+        except OSError as e:
+            logger.warning(f"Не удалось сохранить профиль {path}: {e}")
+            return None
+        self.stats['profiles'] += 1
+        logger.warning(f"Профиль медленного цикла: {path}, чаще всего: {profiler.top()}")
+        return path
+
+    def get_stats(self) -> Dict:
+        return {**self.stats, 'recent': list(self.recent)[-5:]}
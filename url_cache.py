@@ -0,0 +1,156 @@
+"""
+Быстрая проверка "уже опубликовано?" без запроса в SQLite
+Bloom фильтр по всей таблице published_news + LRU недавно проверенных URL.
+Ключ - 64-битный url_hash канонического URL (url_canon.url_key)
+"""
+
+import math
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+
+
+class BloomFilter:
+    """Bloom фильтр на bytearray с двойным хешированием"""
+
+    def __init__(self, capacity: int, fp_rate: float = 0.01):
+        self.capacity = max(1, capacity)
+        self.fp_rate = fp_rate
+        self.size = max(8, int(-self.capacity * math.log(fp_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: int):
+        # Ключ уже равномерный 64-битный хеш: hash() int'а почти бесплатен
+        # и не требует второго хеширования
+        h = hash(key) & 0xFFFFFFFFFFFFFFFF
+        h1 = h & 0xFFFFFFFF
+        h2 = (h >> 32) | 1
+        size = self.size
+        return [(h1 + i * h2) % size for i in range(self.hashes)]
+
+    def add(self, key: int):
+        bits = self.bits
+        for pos in self._positions(key):
+            bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def update(self, keys: Iterable[int]):
+        for key in keys:
+            self.add(key)
+
+    def __contains__(self, key: int) -> bool:
+        bits = self.bits
+        for pos in self._positions(key):
+            if not bits[pos >> 3] & (1 << (pos & 7)):
+                return False
+        return True
+
+    @property
+    def memory_bytes(self) -> int:
+        return len(self.bits)
+
+    def estimated_fp_rate(self) -> float:
+        """Теоретическая вероятность ложного срабатывания при текущем заполнении"""
+        return (1 - math.exp(-self.hashes * self.count / self.size)) ** self.hashes
+
+
+class PublishedUrlCache:
+    """
+    Слой перед published_news.
+    LRU знает точный ответ для недавних URL, Bloom фильтр - точное "нет"
+    для всех остальных. В БД уходят только возможные совпадения.
+    """
+
+    def __init__(self, lru_size: int = 10000, fp_rate: float = 0.01):
+        self.lru_size = lru_size
+        self.fp_rate = fp_rate
+        self.bloom: Optional[BloomFilter] = None  # None, пока не загружен из БД
+        self._lru: "OrderedDict[int, bool]" = OrderedDict()
+        self._added_while_loading: Optional[List[int]] = None
+        self.load_seconds = 0.0
+        self.stats = {
+            'checks': 0,
+            'lru_hits': 0,
+            'bloom_negatives': 0,
+            'db_checks': 0,
+            'bloom_false_positives': 0,
+        }
+
+    # ---------- загрузка ----------
+
+    def begin_load(self):
+        """Начать загрузку: добавленные за это время ключи будут доиграны в фильтр"""
+        self._added_while_loading = []
+
+    @staticmethod
+    def build_bloom(keys: Iterable[int], capacity: int, fp_rate: float) -> BloomFilter:
+        """Построить фильтр (тяжёлая операция, выполнять вне event loop)"""
+        bloom = BloomFilter(capacity, fp_rate)
+        bloom.update(keys)
+        return bloom
+
+    def finish_load(self, bloom: BloomFilter, seconds: float):
+        bloom.update(self._added_while_loading or [])
+        self._added_while_loading = None
+        self.bloom = bloom
+        self.load_seconds = seconds
+
+    # ---------- проверки ----------
+
+    def _remember(self, key: int, published: bool):
+        self._lru[key] = published
+        self._lru.move_to_end(key)
+        if len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+    def split(self, keys: List[int]) -> tuple:
+        """
+        Разделить ключи на (известно_опубликованные, точно_новые, проверить_в_БД)
+        """
+        published, fresh, unknown = set(), set(), []
+        for key in keys:
+            self.stats['checks'] += 1
+            known = self._lru.get(key)
+            if known is not None:
+                self._lru.move_to_end(key)
+                self.stats['lru_hits'] += 1
+                (published if known else fresh).add(key)
+            elif self.bloom is not None and key not in self.bloom:
+                self.stats['bloom_negatives'] += 1
+                fresh.add(key)
+            else:
+                self.stats['db_checks'] += 1
+                unknown.append(key)
+        return published, fresh, unknown
+
+    def record_db_result(self, checked: List[int], published: set):
+        """Запомнить ответ БД для ключей, которые прошли Bloom фильтр"""
+        for key in checked:
+            is_published = key in published
+            if not is_published and self.bloom is not None:
+                self.stats['bloom_false_positives'] += 1
+            self._remember(key, is_published)
+
+    def add(self, key: int):
+        """URL с этим ключом опубликован"""
+        if self.bloom is not None:
+            self.bloom.add(key)
+        if self._added_while_loading is not None:
+            self._added_while_loading.append(key)
+        self._remember(key, True)
+
+    def get_stats(self) -> Dict:
+        checks = self.stats['checks'] or 1
+        bloom_checked = self.stats['bloom_negatives'] + self.stats['bloom_false_positives']
+        return {
+            **self.stats,
+            'hit_ratio': round(1 - self.stats['db_checks'] / checks, 4),
+            'observed_fp_rate': round(self.stats['bloom_false_positives'] / bloom_checked, 4)
+            if bloom_checked else 0.0,
+            'estimated_fp_rate': round(self.bloom.estimated_fp_rate(), 6) if self.bloom else None,
+            'bloom_items': self.bloom.count if self.bloom else 0,
+            'bloom_bytes': self.bloom.memory_bytes if self.bloom else 0,
+            'lru_items': len(self._lru),
+            'load_seconds': round(self.load_seconds, 2),
+        }
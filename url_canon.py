@@ -0,0 +1,78 @@
+"""
+Канонизация URL и компактный ключ для дедупликации
+Один и тот же материал приходит с utm-метками, якорями, по http и https,
+со слешем на конце и без. Ключ дедупликации - 64-битный хеш канонического URL.
+"""
+
+import hashlib
+import re
+from urllib.parse import parse_qsl, quote, urlencode, urlsplit, urlunsplit
+
+# Параметры рекламных и почтовых систем, которые не меняют содержимое страницы.
+# Общие имена (from, ref, source) не трогаем: на части сайтов они значимы
+TRACKING_PARAMS = {
+    'fbclid', 'gclid', 'yclid', 'ysclid', 'dclid', 'msclkid', 'mc_cid', 'mc_eid',
+    '_openstat', 'ref_src',
+}
+TRACKING_PREFIXES = ('utm_',)
+
+_DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+# Незарезервированные символы (RFC 3986): их %XX и сам символ - одно и то же
+_UNRESERVED = frozenset('ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-._~')
+_ESCAPE_RE = re.compile(r'%([0-9A-Fa-f]{2})')
+
+
+def _is_tracking(name: str) -> bool:
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+
+def _normalize_escape(match: re.Match) -> str:
+    char = chr(int(match.group(1), 16))
+    return char if char in _UNRESERVED else f"%{match.group(1).upper()}"
+
+
+def _normalize_path(path: str) -> str:
+    """
+    Единое percent-кодирование пути: не-ASCII символы кодируются (%D0%BD и "н"
+    дают один ключ), экранированные незарезервированные раскрываются, а
+    зарезервированные (%2F, %3F...) остаются экранированными: a%2Fb и a/b - разные ресурсы
+    """
+    path = quote(path, safe="/:@!$&'()*+,;=-._~%")
+    return _ESCAPE_RE.sub(_normalize_escape, path)
+
+
+def canonical_url(url: str) -> str:
+    """
+    Канонический вид URL: https, хост в нижнем регистре без порта по умолчанию,
+    без якоря, трекинг-параметров и завершающего слеша, параметры отсортированы
+    """
+    url = url.strip()
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return url  # Битый URL сравниваем как есть
+    if parts.scheme.lower() not in _DEFAULT_PORTS or not parts.hostname:
+        return url
+
+    host = parts.hostname.rstrip('.')
+    if ':' in host:
+        host = f"[{host}]"  # IPv6: hostname отдаёт адрес без скобок
+    if port and port != _DEFAULT_PORTS[parts.scheme.lower()]:
+        host = f"{host}:{port}"
+    path = _normalize_path(parts.path) or '/'
+    if len(path) > 1:
+        path = path.rstrip('/')
+    query = urlencode(sorted(
+        (name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not _is_tracking(name)
+    ))
+    return urlunsplit(('https', host, path, query, ''))
+
+
+def url_key(url: str) -> int:
+    """64-битный ключ канонического URL (со знаком - влезает в SQLite INTEGER)"""
+    digest = hashlib.blake2b(canonical_url(url).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'little', signed=True)